@@ -1,3 +1,8 @@
+import time
+
+# Start of the app's imports, for the startup timings (see app/startup.py)
+started_at = time.perf_counter()
+
 from dash import Dash
 
 # Initialize the Dash app
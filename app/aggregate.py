@@ -0,0 +1,124 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from app.cache import run_cache
+from app.catalog import flatten_hyperparameters
+from app.config import AGGREGATE_QUANTILES, SEED_KEYS
+
+
+def _without_seed(flat):
+    return {key: value for key, value in flat.items() if key.rsplit('.', 1)[-1] not in SEED_KEYS}
+
+
+def get_group_hyperparameters(data):
+    """Flattened hyperparameters of a loaded run, without the keys that only set its seed."""
+    hyperparams = data['hyperparams'].iloc[0].get('hyperparameters')
+    return _without_seed(flatten_hyperparameters(hyperparams) if isinstance(hyperparams, dict) else {})
+
+
+def _group(entries):
+    groups = {}
+    for model, hyperparams, item in entries:
+        signature = json.dumps([model, hyperparams], sort_keys=True, default=str)
+        groups.setdefault(signature, (model, hyperparams, []))[2].append(item)
+
+    keys = sorted({key for _, hyperparams, _ in groups.values() for key in hyperparams})
+    differing = [
+        key for key in keys
+        if len({json.dumps(hyperparams.get(key), default=str) for _, hyperparams, _ in groups.values()}) > 1
+    ]
+    grouped = []
+    for signature, (model, hyperparams, items) in groups.items():
+        label = f"{model} ({len(items)} run{'s' if len(items) != 1 else ''})"
+        if differing:
+            label += " " + ", ".join(f"{key}={hyperparams.get(key)}" for key in differing)
+        grouped.append((signature, label, items))
+    return grouped
+
+
+def group_runs(data_list):
+    """Groups loaded runs of the same model whose hyperparameters only differ by their seed.
+
+    Returns a list of (signature, label, runs) in first-seen order. Labels name the
+    hyperparameters that tell the groups apart.
+    """
+    return _group((data['model'], get_group_hyperparameters(data), data) for data in data_list)
+
+
+def group_catalog_runs(runs):
+    """Same grouping as ``group_runs`` for catalog rows (see ``get_catalog_runs``), before they are loaded."""
+    return _group((run['model'], _without_seed(run['hyperparams'] or {}), run) for run in runs)
+
+
+def align_runs(frames, metric):
+    """Stacks ``metric`` of several runs on the union of their epochs.
+
+    Returns (epochs, values) where values has one row per run holding ``metric``, with NaN
+    at the epochs a run did not log.
+    """
+    series = []
+    for metrics_df in frames:
+        if metric not in metrics_df.columns or not pd.api.types.is_numeric_dtype(metrics_df[metric]):
+            continue
+        points = metrics_df[['epoch', metric]].dropna().drop_duplicates('epoch', keep='last')
+        series.append((points['epoch'].to_numpy(dtype=float), points[metric].to_numpy(dtype=float)))
+    if not series:
+        return None, None
+    epochs = np.unique(np.concatenate([epoch for epoch, _ in series]))
+    values = np.full((len(series), len(epochs)), np.nan)
+    for row, (epoch, metric_values) in zip(values, series):
+        row[np.searchsorted(epochs, epoch)] = metric_values
+    return epochs, values
+
+
+def aggregate_metric(frames, metric, quantiles=AGGREGATE_QUANTILES):
+    """Per-epoch count, mean, sample std and ``quantiles`` of ``metric`` across runs.
+
+    Returns a DataFrame with columns epoch, count, mean, std and one ``q<quantile>`` column
+    per quantile, or None when no run has the metric.
+    """
+    epochs, values = align_runs(frames, metric)
+    if epochs is None:
+        return None
+    present = ~np.isnan(values)
+    count = present.sum(axis=0)
+    filled = np.where(present, values, 0.0)
+    mean = filled.sum(axis=0) / count
+    squared = np.where(present, (values - mean) ** 2, 0.0).sum(axis=0)
+    std = np.sqrt(squared / np.maximum(count - 1, 1))
+    aggregate = pd.DataFrame({'epoch': epochs, 'count': count, 'mean': mean, 'std': std})
+    if quantiles:
+        # Linear interpolation between the sorted values of each epoch (NaN sort last); done by
+        # hand because np.nanquantile falls back to a Python loop over the epochs
+        ordered = np.sort(values, axis=0)
+        for q in quantiles:
+            position = q * (count - 1)
+            below = np.floor(position).astype(np.int64)
+            above = np.minimum(below + 1, count - 1)
+            low = np.take_along_axis(ordered, below[None, :], axis=0)[0]
+            high = np.take_along_axis(ordered, above[None, :], axis=0)[0]
+            aggregate[f"q{q:g}"] = low + (high - low) * (position - below)
+    return aggregate
+
+
+def get_group_aggregates(groups, metric, smoothing=None):
+    """(label, aggregate) of ``metric`` for each group of ``group_runs`` that logged it.
+
+    Aggregates are cached per group signature, version of its runs (including the pyramid
+    level they were loaded from) and ``smoothing`` of their metrics, so switching between
+    individual runs and groups does not recompute them.
+    """
+    aggregates = []
+    for signature, label, runs in groups:
+        versions = tuple((data['metrics_path'], data['metrics_size'], len(data['metrics'])) for data in runs)
+        key = (f"aggregate {metric} {signature} {smoothing}", versions)
+        aggregate = run_cache.get(key)
+        if aggregate is None:
+            aggregate = aggregate_metric([data['metrics'] for data in runs], metric)
+            if aggregate is None:
+                continue
+            run_cache.put(key, aggregate)
+        aggregates.append((label, aggregate))
+    return aggregates
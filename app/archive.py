@@ -0,0 +1,474 @@
+"""Compressed metrics files and archived model folders.
+
+Besides plain files, a logs tree can hold:
+
+- compressed run files, e.g. ``<model>/metrics/<run>.csv.gz`` or ``.csv.zst`` (the
+  latter needs zstandard);
+- whole model folders archived as ``<model>.tar`` (or ``.tar.gz``, ``.tgz``, ``.tar.bz2``,
+  ``.tar.xz``), whose members may themselves be compressed files.
+
+A file inside an archive is addressed as ``<archive path>/<member name>``. The members of
+each archive are indexed once (name, offset and size) and the index is kept next to the
+archive, so reading a run seeks straight to its member. In a gzip-compressed archive the
+read resumes from the closest decompressor checkpoint, recorded every
+``CHECKPOINT_INTERVAL`` bytes by the indexing pass and by earlier reads of the process.
+Bzip2 and xz archives have no checkpoints: bytes before the member are decompressed again
+(from the closest stream left open by a previous read). An uncompressed ``.tar`` of
+``.csv.gz`` runs gives the same compression with true random access.
+"""
+import bz2
+import gzip
+import hashlib
+import bisect
+import io
+import json
+import logging
+import lzma
+import os
+import posixpath
+import tarfile
+import tempfile
+import threading
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # .zst files are skipped without it
+    zstandard = None
+
+ARCHIVE_EXTENSIONS = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+COMPRESSED_EXTENSIONS = (".gz", ".zst")
+
+_GZIP_EXTENSIONS = (".tar.gz", ".tgz")
+
+# Idle decompression streams kept open per compressed archive
+MAX_IDLE_STREAMS = 8
+# Decompressed bytes between two checkpoints of a gzip-compressed archive (each one holds
+# about 40 KB of decompressor state)
+CHECKPOINT_INTERVAL = 4 * 1024 * 1024
+_INPUT_CHUNK = 64 * 1024
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+_streams = {}
+_streams_lock = threading.Lock()
+_checkpoints = {}
+_checkpoints_lock = threading.Lock()
+
+
+def _forget_streams():
+    # Streams opened before a fork share their file offsets with the parent: the child opens its own
+    global _streams_lock, _checkpoints_lock
+    _streams.clear()
+    _streams_lock = threading.Lock()
+    # Checkpoints hold no file: keep them, with a lock no parent thread can be holding
+    _checkpoints_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_streams)
+
+
+def get_archive_extension(name):
+    for extension in ARCHIVE_EXTENSIONS:
+        if name.endswith(extension) and len(name) > len(extension):
+            return extension
+    return None
+
+
+def get_compression(name):
+    for extension in COMPRESSED_EXTENSIONS:
+        if name.endswith(extension):
+            return extension
+    return None
+
+
+def get_file_variants(name):
+    """Names ``name`` can be stored under, plain first."""
+    extensions = [".gz", ".zst"] if zstandard is not None else [".gz"]
+    return [name] + [f"{name}{extension}" for extension in extensions]
+
+
+def list_models(base_directory):
+    """Maps the model names of a logs tree to their folder, or to their archive when there is no folder."""
+    models = {}
+    archives = {}
+    with os.scandir(base_directory) as it:
+        for entry in it:
+            if entry.name.startswith("."):
+                continue
+            if entry.is_dir():
+                models[entry.name] = entry.path
+            elif entry.is_file():
+                extension = get_archive_extension(entry.name)
+                if extension is not None:
+                    archives.setdefault(entry.name[:-len(extension)], entry.path)
+    for model, path in archives.items():
+        models.setdefault(model, path)
+    return models
+
+
+def get_model_source(base_directory, model):
+    """Folder or archive holding ``model``, or None."""
+    path = os.path.join(base_directory, model)
+    if os.path.isdir(path):
+        return path
+    for extension in ARCHIVE_EXTENSIONS:
+        if os.path.isfile(f"{path}{extension}"):
+            return f"{path}{extension}"
+    return None
+
+
+def split_member(path):
+    """(archive path, member name) of a path inside an archive, or None for a regular file."""
+    for extension in ARCHIVE_EXTENSIONS:
+        position = path.find(f"{extension}/")
+        if position > 0:
+            end = position + len(extension)
+            return path[:end], path[end + 1:]
+    return None
+
+
+def is_plain(path):
+    """Whether ``path`` is a regular uncompressed file (which can be tailed, mapped or sidecarred)."""
+    return get_compression(path) is None and split_member(path) is None
+
+
+def _index_path(archive_path):
+    directory, name = os.path.split(archive_path)
+    if os.access(directory, os.W_OK):
+        return os.path.join(directory, f".{name}.index.json")
+    digest = hashlib.sha1(os.path.abspath(archive_path).encode()).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), f"drl_archive_index_{digest}.json")
+
+
+def _build_index(archive_path, stat):
+    members = {}
+    extension = get_archive_extension(archive_path)
+    if extension in _GZIP_EXTENSIONS:
+        # Read through an _InflateStream so that the indexing pass records checkpoints
+        stream = _InflateStream(archive_path, (stat.st_size, stat.st_mtime_ns))
+        tar = tarfile.open(fileobj=stream, mode="r|")
+    else:
+        if extension in _STREAM_OPENERS:
+            logging.warning(f"{archive_path}: {extension} archives have no random access, "
+                            "reading a run decompresses the archive up to it")
+        stream = None
+        tar = tarfile.open(archive_path, "r:*")
+    try:
+        with tar:
+            for info in tar:
+                if info.isfile():
+                    members[posixpath.normpath(info.name)] = [info.offset_data, info.size]
+    finally:
+        if stream is not None:
+            stream.close()
+    index = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'members': members}
+    path = _index_path(archive_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.warning(f"Could not store the member index of {archive_path}: {e}")
+    return index
+
+
+def _relative_members(archive_path, members):
+    """Maps member paths relative to the archived model folder to member names.
+
+    Archives may hold the model folder itself (``<model>/metrics/...``) or only its
+    content (``metrics/...``).
+    """
+    model = os.path.basename(archive_path)[:-len(get_archive_extension(archive_path))]
+    relative = {}
+    for name in members:
+        parts = name.split("/")
+        if len(parts) > 1 and parts[0] == model:
+            parts = parts[1:]
+        relative.setdefault("/".join(parts), name)
+    return relative
+
+
+def _get_index(archive_path):
+    stat = os.stat(archive_path)
+    stamp = (stat.st_size, stat.st_mtime_ns)
+    with _indexes_lock:
+        cached = _indexes.get(archive_path)
+        if cached is not None and cached[0] == stamp:
+            return cached
+        index = None
+        try:
+            with open(_index_path(archive_path)) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            pass
+        if index is None or (index.get('size'), index.get('mtime_ns')) != stamp:
+            index = _build_index(archive_path, stat)
+        members = index['members']
+        _indexes[archive_path] = (stamp, members, _relative_members(archive_path, members))
+        return _indexes[archive_path]
+
+
+def get_archive_index(archive_path):
+    """{member name: [data offset, size]} of the files of an archive, indexed once per version of it."""
+    return _get_index(archive_path)[1]
+
+
+def scan_archive(archive_path, kind, suffix):
+    """Maps base names of the ``kind`` files ending with ``suffix`` in an archive to their (size, mtime)."""
+    mtime = os.stat(archive_path).st_mtime
+    _, index, relative_members = _get_index(archive_path)
+    entries = {}
+    prefix = f"{kind}/"
+    for relative, name in relative_members.items():
+        if not relative.startswith(prefix) or "/" in relative[len(prefix):]:
+            continue
+        filename = relative[len(prefix):]
+        for variant in get_file_variants(suffix):
+            if filename.endswith(variant) and len(filename) > len(variant):
+                entries.setdefault(filename[:-len(variant)], (index[name][1], mtime))
+                break
+    return entries
+
+
+def get_run_file(base_directory, model, kind, filename):
+    """Path of ``<model>/<kind>/<filename>`` in a logs tree, or None when it is missing.
+
+    That is the file itself, a compressed copy of it or the matching member of the model archive.
+    """
+    source = get_model_source(base_directory, model)
+    if source is None:
+        return None
+    if os.path.isdir(source):
+        for variant in get_file_variants(filename):
+            path = os.path.join(source, kind, variant)
+            if os.path.isfile(path):
+                return path
+        return None
+    relative = _get_index(source)[2]
+    for variant in get_file_variants(f"{kind}/{filename}"):
+        if variant in relative:
+            return f"{source}/{relative[variant]}"
+    return None
+
+
+def stat_file(path):
+    """(mtime_ns, size) of a file; archive members take the mtime of their archive."""
+    member = split_member(path)
+    if member is None:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    archive_path, name = member
+    index = get_archive_index(archive_path)
+    if name not in index:
+        raise FileNotFoundError(path)
+    return os.stat(archive_path).st_mtime_ns, index[name][1]
+
+
+def _decompress(data, name):
+    compression = get_compression(name)
+    if compression == ".gz":
+        return gzip.decompress(data)
+    if compression == ".zst":
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is required to read {name}")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return data
+
+
+def _get_checkpoint(archive_path, stamp, offset):
+    """(file position, decompressed offset, decompressor) of the last checkpoint at or before ``offset``."""
+    with _checkpoints_lock:
+        entry = _checkpoints.get(archive_path)
+        if entry is None or entry[0] != stamp:
+            return None
+        position = bisect.bisect_right(entry[1], offset, key=lambda checkpoint: checkpoint[1])
+        return entry[1][position - 1] if position else None
+
+
+def _record_checkpoint(archive_path, stamp, position, offset, inflate):
+    with _checkpoints_lock:
+        entry = _checkpoints.get(archive_path)
+        if entry is None or entry[0] != stamp:
+            entry = _checkpoints[archive_path] = (stamp, [])
+        if offset - (entry[1][-1][1] if entry[1] else 0) >= CHECKPOINT_INTERVAL:
+            entry[1].append((position, offset, inflate.copy()))
+
+
+class _InflateStream:
+    """Forward-only reader of the decompressed content of a gzip file, started at a checkpoint.
+
+    Records a checkpoint (a copy of its decompressor and the file position it stopped at)
+    every ``CHECKPOINT_INTERVAL`` decompressed bytes past the last known one.
+    """
+
+    def __init__(self, path, stamp, checkpoint=None):
+        self._path = path
+        self._stamp = stamp
+        self._file = open(path, "rb")
+        if checkpoint is None:
+            self._inflate = zlib.decompressobj(31)
+            self._offset = 0
+        else:
+            position, self._offset, inflate = checkpoint
+            self._file.seek(position)
+            self._inflate = inflate.copy()
+        # Decompressed bytes from self._offset, of which the first self._consumed were read
+        self._buffer = bytearray()
+        self._consumed = 0
+
+    def tell(self):
+        return self._offset + self._consumed
+
+    def _fill(self):
+        del self._buffer[:self._consumed]
+        self._offset += self._consumed
+        self._consumed = 0
+        chunk = self._file.read(_INPUT_CHUNK)
+        if not chunk:
+            return False
+        self._buffer += self._inflate.decompress(chunk)
+        # Concatenated gzip members; trailing zeros are padding
+        while self._inflate.eof and self._inflate.unused_data.strip(b"\0"):
+            rest = self._inflate.unused_data
+            self._inflate = zlib.decompressobj(31)
+            self._buffer += self._inflate.decompress(rest)
+        _record_checkpoint(self._path, self._stamp, self._file.tell(), self._offset + len(self._buffer), self._inflate)
+        return True
+
+    def seek(self, offset):
+        if offset < self.tell():
+            raise ValueError("cannot seek backwards in a compressed stream")
+        while self._offset + len(self._buffer) < offset:
+            self._consumed = len(self._buffer)
+            if not self._fill():
+                raise EOFError(f"{self._path} ends before offset {offset}")
+        self._consumed = offset - self._offset
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) - self._consumed < size:
+            if not self._fill():
+                break
+        end = len(self._buffer) if size < 0 else min(self._consumed + size, len(self._buffer))
+        data = bytes(self._buffer[self._consumed:end])
+        self._consumed = end
+        return data
+
+    def drain(self):
+        """Decompresses the rest of the file, recording its checkpoints."""
+        while self._fill():
+            self._consumed = len(self._buffer)
+
+    def close(self):
+        self._file.close()
+
+
+_STREAM_OPENERS = {
+    ".tar.gz": _InflateStream,
+    ".tgz": _InflateStream,
+    ".tar.bz2": lambda path, stamp, checkpoint: bz2.open(path, "rb"),
+    ".tar.xz": lambda path, stamp, checkpoint: lzma.open(path, "rb"),
+}
+
+
+def record_checkpoints(archive_path):
+    """Makes the members of a gzip-compressed archive randomly accessible in this process.
+
+    Checkpoints only live in memory: when the member index was loaded from disk, this
+    decompresses the archive once to record them (from the last checkpoint already
+    recorded, if any). Other archives are left alone.
+    """
+    if get_archive_extension(archive_path) not in _GZIP_EXTENSIONS:
+        return
+    stamp = _get_index(archive_path)[0]
+    stream = _InflateStream(archive_path, stamp, _get_checkpoint(archive_path, stamp, float("inf")))
+    try:
+        stream.drain()
+    finally:
+        stream.close()
+
+
+def _read_stream(archive_path, stamp, opener, offset, size):
+    """Reads ``size`` bytes at ``offset`` of the decompressed stream of an archive.
+
+    Seeking forward in a compressed stream decompresses everything in between, so reads of
+    the same archive take turns and start from whichever is closest before ``offset``: an
+    idle stream left by a previous read or a checkpoint. Reading the members of an archive
+    in order decompresses it only once.
+    """
+    with _streams_lock:
+        lock, idle = _streams.setdefault(archive_path, (threading.Lock(), []))
+    with lock:
+        for entry in [entry for entry in idle if entry[0] != stamp]:
+            idle.remove(entry)
+            entry[1].close()
+        behind = [entry for entry in idle if entry[1].tell() <= offset]
+        entry = max(behind, key=lambda entry: entry[1].tell(), default=None)
+        checkpoint = _get_checkpoint(archive_path, stamp, offset)
+        if entry is None or (checkpoint is not None and checkpoint[1] > entry[1].tell()):
+            entry = (stamp, opener(archive_path, stamp, checkpoint))
+        else:
+            idle.remove(entry)
+        try:
+            entry[1].seek(offset)
+            data = entry[1].read(size)
+        except Exception:
+            entry[1].close()
+            raise
+        idle.append(entry)
+        while len(idle) > MAX_IDLE_STREAMS:
+            idle.pop(0)[1].close()
+    return data
+
+
+def read_member(archive_path, name):
+    """Decompressed content of one archive member, read without extracting the others."""
+    stamp, index, _ = _get_index(archive_path)
+    if name not in index:
+        raise FileNotFoundError(f"{archive_path}/{name}")
+    offset, size = index[name]
+    opener = _STREAM_OPENERS.get(get_archive_extension(archive_path))
+    if opener is None:
+        with open(archive_path, "rb") as f:
+            f.seek(offset)
+            data = f.read(size)
+    else:
+        data = _read_stream(archive_path, stamp, opener, offset, size)
+    return _decompress(data, name)
+
+
+def get_read_groups(paths):
+    """Splits ``paths`` into groups of positions, each to be read in order by a single task.
+
+    Members of a compressed archive are grouped in archive order, so that they are read in
+    one pass over its stream; every other file is a group of its own.
+    """
+    groups = []
+    streams = {}
+    for position, path in enumerate(paths):
+        member = split_member(path) if path else None
+        if member is None or get_archive_extension(member[0]) not in _STREAM_OPENERS:
+            groups.append([position])
+        else:
+            streams.setdefault(member[0], []).append(position)
+    for archive_path, positions in streams.items():
+        index = get_archive_index(archive_path)
+        positions.sort(key=lambda position: index.get(split_member(paths[position])[1], [0])[0])
+        groups.append(positions)
+    return groups
+
+
+def open_file(path):
+    """Binary stream of the decompressed content of a file or archive member."""
+    member = split_member(path)
+    if member is not None:
+        return io.BytesIO(read_member(*member))
+    compression = get_compression(path)
+    if compression == ".gz":
+        return gzip.open(path, "rb")
+    if compression == ".zst":
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is required to read {path}")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"))
+    return open(path, "rb")
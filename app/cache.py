@@ -0,0 +1,180 @@
+import logging
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from app.archive import stat_file
+from app.config import FIGURE_CACHE_MAX_BYTES, RUN_CACHE_MAX_BYTES, SHARED_CACHE_DIR, SHARED_CACHE_MAX_BYTES
+
+try:
+    import diskcache
+except ImportError:  # Caches stay private to each process without it
+    diskcache = None
+
+# Values worth sharing between processes; anything else (e.g. memory-mapped pyramids) stays local
+_SHAREABLE = (pd.DataFrame, pd.Series, dict, list)
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+
+def file_stamp(path):
+    """Returns the (path, mtime_ns, size) key identifying the current content of a file or archive member."""
+    return (path,) + stat_file(path)
+
+
+def estimate_size(value):
+    """Approximate in-memory size of a cached value, in bytes."""
+    if isinstance(value, pd.DataFrame):
+        # Only text columns need their values inspected; memory_usage(deep=True) builds a Series per call
+        size = value.index.memory_usage()
+        for column, dtype in value.dtypes.items():
+            if pd.api.types.is_string_dtype(dtype) and not isinstance(dtype, pd.CategoricalDtype):
+                size += value[column].memory_usage(index=False, deep=True)
+            else:
+                size += value[column].array.nbytes
+        return int(size)
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def get_shared_store():
+    """diskcache store shared by every process serving the app, or None when not configured."""
+    global _shared_store
+    if not SHARED_CACHE_DIR or diskcache is None:
+        return None
+    with _shared_store_lock:
+        # SQLite connections must not cross fork(): reopen the store in each process
+        if _shared_store is None or _shared_store[0] != os.getpid():
+            store = diskcache.Cache(
+                SHARED_CACHE_DIR, size_limit=SHARED_CACHE_MAX_BYTES, eviction_policy='least-recently-used'
+            )
+            _shared_store = (os.getpid(), store)
+        return _shared_store[1]
+
+
+class FileCache:
+    """Thread-safe LRU cache of values parsed from files, bounded by a memory budget.
+
+    Entries are keyed by (path, mtime, size) so a modified file is parsed again while
+    unchanged files are served from memory. Stale versions of a file are dropped as soon
+    as a newer one is stored: keys sharing their first item are versions of one value.
+    With ``replace_versions=False`` the cache is a plain LRU, for values that have several
+    current variants (e.g. figures at different zoom ranges).
+
+    With a ``shared_namespace``, DataFrames and JSON-like values are also written to the
+    shared store (see ``get_shared_store``), where local misses are looked up before the
+    value is computed again, so that worker processes reuse each other's work.
+    """
+
+    def __init__(self, max_bytes, shared_namespace=None, replace_versions=True):
+        self.max_bytes = max_bytes
+        self.shared_namespace = shared_namespace
+        self.replace_versions = replace_versions
+        self._entries = OrderedDict()
+        self._current = {}
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.shared_hits = 0
+
+    def _shared_store(self):
+        return get_shared_store() if self.shared_namespace is not None else None
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        store = self._shared_store()
+        if store is None:
+            return None
+        try:
+            value = store.get((self.shared_namespace,) + tuple(key))
+        except Exception as e:
+            logging.warning(f"Shared cache lookup failed: {e}")
+            return None
+        if value is not None:
+            with self._lock:
+                self.shared_hits += 1
+            self.put(key, value, share=False)
+        return value
+
+    def put(self, key, value, size=None, share=True):
+        store = self._shared_store() if share and isinstance(value, _SHAREABLE) else None
+        if store is not None:
+            try:
+                store.set((self.shared_namespace,) + tuple(key), value)
+            except Exception as e:
+                logging.warning(f"Could not share cache entry {key[0]}: {e}")
+        size = estimate_size(value) if size is None else size
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            elif self.replace_versions:
+                previous = self._current.get(key[0])
+                if previous is not None and previous in self._entries:
+                    self._drop(previous)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            if self.replace_versions:
+                self._current[key[0]] = key
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        _, size = self._entries.pop(key)
+        self.current_bytes -= size
+        if self._current.get(key[0]) == key:
+            del self._current[key[0]]
+
+    def get_or_load(self, path, loader):
+        """Returns ``loader(path)``, parsing the file only if it is not cached in its current state."""
+        key = file_stamp(path)
+        value = self.get(key)
+        if value is None:
+            value = loader(path)
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._current.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'shared_hits': self.shared_hits,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+
+# Process-wide caches shared by every callback
+run_cache = FileCache(RUN_CACHE_MAX_BYTES, shared_namespace="runs")
+# Rendered figures (as dicts), keyed by metric, plot mode, version of the plotted runs, zoom range and smoothing
+figure_cache = FileCache(FIGURE_CACHE_MAX_BYTES, shared_namespace="figures", replace_versions=False)
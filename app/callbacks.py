@@ -1,45 +1,405 @@
 from dash import html, dcc, dash
-from dash.dependencies import Input, Output, State
-import plotly.express as px
+from dash.dependencies import Input, Output, State, ALL, MATCH
+from dash.exceptions import PreventUpdate
+import dash_bootstrap_components as dbc
 import os
-import pandas as pd
 import logging
-from app.utils import get_model_folders, get_metrics_files, load_and_combine_data
+from app.config import (
+    BACKGROUND_CALLBACKS, BASE_DIRECTORY, COMPRESS_RESPONSES, DEFAULT_PLOTTED_METRICS, LOG_FILE, SHARED_CACHE_DIR,
+    SMOOTHING_WINDOWS, WARMUP, WATCH_LOGS
+)
+from app.compression import install_compression, install_json_engine
+from app.instrumentation import install_metrics_endpoint, instrumented
+from app.logging_config import configure_logging
+from app.watcher import get_watcher, start_watcher
 from app import app
-import json
-from dash import callback_context
-
+from app.startup import LazyModule, get_startup_gauges, install_startup_timing, record_startup, start_warmup
+import time
+import uuid
+from dash import callback_context, no_update, Patch
+
+# pandas, numpy and plotly figures are only imported on first use (or by the startup warm-up)
+pd = LazyModule("pandas")
+aggregate = LazyModule("app.aggregate")
+cache = LazyModule("app.cache")
+downsample = LazyModule("app.downsample")
+figures = LazyModule("app.figures")
+query = LazyModule("app.query")
+smoothing = LazyModule("app.smoothing")
+summary = LazyModule("app.summary")
+tail = LazyModule("app.tail")
+utils = LazyModule("app.utils")
+
+
+
+# Configure logging (queued, written by a background thread)
+configure_logging(LOG_FILE)
+
+def get_process_gauges():
+    """Extra gauges exposed on /metrics next to the callback statistics."""
+    gauges = [(f"drl_run_cache_{key}", value) for key, value in cache.run_cache.stats().items()]
+    gauges.extend((f"drl_figure_cache_{key}", value) for key, value in cache.figure_cache.stats().items())
+    watcher = get_watcher(BASE_DIRECTORY)
+    if watcher is not None:
+        gauges.append(("drl_watched_runs", watcher.run_count()))
+    gauges.extend(get_startup_gauges())
+    return gauges
+
+
+def build_filter_control(entry):
+    """Filter input for one hyperparameter key, from its summary in RunTable.describe()."""
+    key = entry['key']
+    if entry['kind'] == 'numeric':
+        control = dbc.InputGroup([
+            dbc.InputGroupText("Min"),
+            dbc.Input(
+                id={'type': 'hp-filter-min', 'key': key},
+                placeholder=str(entry['min']),
+                type="number",
+                size="sm",
+                debounce=True,
+                persistence=True,
+                persistence_type="session",
+            ),
+            dbc.InputGroupText("Max"),
+            dbc.Input(
+                id={'type': 'hp-filter-max', 'key': key},
+                placeholder=str(entry['max']),
+                type="number",
+                size="sm",
+                debounce=True,
+                persistence=True,
+                persistence_type="session",
+            ),
+        ], className="mb-2", size="sm")
+    else:
+        control = dcc.Dropdown(
+            id={'type': 'hp-filter-values', 'key': key},
+            options=[{'label': str(v), 'value': v} for v in entry['values']],
+            multi=True,
+            placeholder="Any",
+            persistence=True,
+            persistence_type="session",
+            className="mb-2",
+        )
+    return dbc.Col([html.Label(key, className="fw-bold"), control], md=2, xs=6, className="mb-3")
+
+
+def get_filters(range_ids, range_mins, range_maxs, value_set_ids, value_sets, missing_policy):
+    """Query filters for the filter controls that were filled in; empty controls match everything."""
+    filters = []
+    for range_id, min_value, max_value in zip(range_ids, range_mins, range_maxs):
+        if min_value is not None or max_value is not None:
+            filters.append({'key': range_id['key'], 'op': 'range', 'min': min_value, 'max': max_value,
+                            'missing': missing_policy})
+    for value_set_id, values in zip(value_set_ids, value_sets):
+        if values:
+            filters.append({'key': value_set_id['key'], 'op': 'in', 'values': values, 'missing': missing_policy})
+    return filters
+
+
+def get_plot_runs(data_list):
+    return [(utils.get_run_identifier(data['model'], data['metrics_file']), data['metrics']) for data in data_list]
+
+
+def get_last_epoch(metrics_df):
+    last_epoch = metrics_df['epoch'].max() if len(metrics_df) else None
+    return None if pd.isna(last_epoch) else last_epoch.item()
+
+
+def get_plot_state_runs(data_list):
+    return [
+        {
+            'identifier': identifier,
+            'model': data['model'],
+            'metrics_file': data['metrics_file'],
+            'path': data['metrics_path'],
+            'offset': data['metrics_size'],
+            'last_epoch': get_last_epoch(metrics_df),
+            'metrics': figures.get_metric_columns([(identifier, metrics_df)]),
+        }
+        for data, (identifier, metrics_df) in zip(data_list, get_plot_runs(data_list))
+    ]
+
+
+def get_plot_state(data_list, metric_columns):
+    """Describes the plotted runs: the metrics each has and how far its metrics file was read."""
+    return {
+        'token': uuid.uuid4().hex,
+        'runs': get_plot_state_runs(data_list),
+        'metrics': metric_columns,
+    }
+
+
+def get_state_metric_columns(state_runs):
+    metric_columns = []
+    for run in state_runs:
+        metric_columns.extend(metric for metric in run['metrics'] if metric not in metric_columns)
+    return metric_columns
+
+
+def get_trace_order(plot_state, metric):
+    """Identifiers of the plotted runs that have ``metric``, in the trace order of a new figure."""
+    return [run['identifier'] for run in plot_state['runs'] if metric in run['metrics']]
+
+
+def get_metric_selection(metric_columns, selected_metrics):
+    """Options of the metric picker, and its value: the picked metrics that still exist, or the first few."""
+    options = [{'label': metric, 'value': metric} for metric in metric_columns]
+    picked = [metric for metric in selected_metrics or [] if metric in metric_columns]
+    return options, picked or metric_columns[:DEFAULT_PLOTTED_METRICS]
+
+
+def get_hyperparameter_rows(state_runs):
+    """Flattened hyperparameters of the plotted runs, from the run table of their models."""
+    models = sorted({run['model'] for run in state_runs})
+    table = query.get_run_table(BASE_DIRECTORY, models)
+    return table.rows([(run['model'], run['metrics_file']) for run in state_runs])
+
+
+def get_hyperparameter_columns(frame, differing):
+    """DataTable columns and header/cell styles, highlighting hyperparameters that differ across runs."""
+    columns = []
+    for column in frame.columns:
+        spec = {'id': column, 'name': query.RUN_COLUMNS.get(column, column)}
+        if pd.api.types.is_numeric_dtype(frame[column]) and not pd.api.types.is_bool_dtype(frame[column]):
+            spec['type'] = 'numeric'
+        columns.append(spec)
+    style_header = [
+        {'if': {'column_id': key}, 'backgroundColor': '#ffe8a1', 'fontWeight': 'bold'} for key in differing
+    ]
+    style_data = [{'if': {'column_id': key}, 'backgroundColor': '#fff8e1'} for key in differing]
+    return columns, style_header, style_data
+
+
+def get_smoothing(method, window_index):
+    """[method, window] of the smoothing controls, or None to plot the logged values."""
+    if not method or method == 'none' or window_index is None:
+        return None
+    window = SMOOTHING_WINDOWS[min(max(int(window_index), 0), len(SMOOTHING_WINDOWS) - 1)]
+    return [method, window] if window > 1 else None
+
+
+def get_smoothed_metrics(data, metric, smooth):
+    return smoothing.smooth_run(data, metric, *smooth) if smooth else data['metrics']
+
 
+def load_plot_runs(run_keys, x_range=None, smooth=None):
+    """Loads runs to plot: long runs as the pyramid level fit for ``x_range``, or every row when smoothed.
+
+    Smoothing a min/max envelope would change the curve with each zoom level, so smoothed
+    runs are smoothed over their logged rows and only decimated afterwards.
+    """
+    return utils.load_runs(run_keys, BASE_DIRECTORY, overview=not smooth, x_range=x_range)
 
-# Configure logging
-logging.basicConfig(
-    filename='app.log',
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-)
 
-BASE_DIRECTORY = "../reinforcement_learning_project_IABD/logs"
+def build_metric_plot(data_list, runs, metric, aggregate_mode, x_range=None, smooth=None):
+    """Figure of ``metric`` as a dict: one trace per run, or one band per group of seeds.
 
-
-def check_hyperparameter(param_name, value, min_value, max_value):
-    if value is None:
-        print(f"problem with {param_name} {value}")
-        return True  # Skip if the hyperparameter is missing
-    if min_value is not None and value < min_value:
-        return False
-    if max_value is not None and value > max_value:
+    With ``smooth`` ([method, window]) each run is smoothed before it is decimated or
+    aggregated. Figures are cached per plotted runs and version of their metrics.
+    """
+    identifiers = tuple(identifier for identifier, _ in runs)
+    versions = tuple((data['metrics_path'], data['metrics_size'], len(data['metrics'])) for data in data_list)
+    smooth = tuple(smooth) if smooth else None
+    key = (f"figure {metric} {aggregate_mode} {identifiers}", versions, x_range, smooth)
+    figure = cache.figure_cache.get(key)
+    if figure is None:
+        if smooth:
+            for data in data_list:
+                data['metrics'] = get_smoothed_metrics(data, metric, smooth)
+            smoothed = dict(get_plot_runs(data_list))
+            runs = [(identifier, smoothed[identifier]) for identifier in identifiers]
+        if aggregate_mode == 'runs':
+            fig = figures.build_metric_figure(runs, metric, x_range)
+        else:
+            aggregates = aggregate.get_group_aggregates(aggregate.group_runs(data_list), metric, smooth)
+            fig = figures.build_aggregate_figure(aggregates, metric, aggregate_mode, x_range)
+        figure = fig.to_dict()
+        cache.figure_cache.put(key, figure)
+    return figure
+
+
+def build_plot_item(metric):
+    """Empty graph of ``metric``; its own callback renders the figure once the graph is mounted.
+
+    The store next to it records how the rendered figure was built (plot state token,
+    aggregation mode and trace order), so that later updates can patch it.
+    """
+    return html.Div([
+        dcc.Graph(
+            id={'type': 'metric-graph', 'metric': metric},
+            figure={'layout': {'title': {'text': f"{metric} over Epochs"}, 'height': 400}}
+        ),
+        dcc.Store(id={'type': 'metric-traces', 'metric': metric}),
+    ], className="plot-item")
+
+
+def patch_output(plot_state, run_keys):
+    """Plot state for a new set of runs, loading only the runs that were not plotted yet.
+
+    Returns no_update when the runs did not change, and None when no run is left.
+    """
+    wanted = [utils.get_run_identifier(*key) for key in run_keys]
+    plotted = {run['identifier'] for run in plot_state['runs']}
+    removed = [run for run in plot_state['runs'] if run['identifier'] not in wanted]
+    data_list = utils.load_runs(
+        [key for key in run_keys if utils.get_run_identifier(*key) not in plotted], BASE_DIRECTORY, overview=True
+    )
+    if not removed and not data_list:
+        return no_update
+
+    state_runs = [run for run in plot_state['runs'] if run['identifier'] in wanted] + get_plot_state_runs(data_list)
+    if not state_runs:
+        return None
+
+    # Keep the token: live tail positions and rendered figures of the runs still plotted stay valid
+    return {**plot_state, 'runs': state_runs, 'metrics': get_state_metric_columns(state_runs)}
+
+
+def patch_plots(plot_state, rendered):
+    """Figure patches turning each rendered graph of individual runs into the runs of ``plot_state``.
+
+    ``rendered`` holds the metric-traces store of every graph (None while it renders). Only
+    runs missing from a graph are loaded; traces of removed runs are deleted in place.
+    Returns the figure patches and the updated stores.
+    """
+    runs_by_identifier = {run['identifier']: run for run in plot_state['runs']}
+    missing = []
+    for traces in rendered:
+        if traces:
+            missing.extend(
+                identifier for identifier in get_trace_order(plot_state, traces['metric'])
+                if identifier not in traces['traces'] and identifier not in missing
+            )
+    smooth = any(traces.get('smoothing') for traces in rendered if traces)
+    data_list = load_plot_runs(
+        [(runs_by_identifier[i]['model'], runs_by_identifier[i]['metrics_file']) for i in missing], smooth=smooth
+    )
+    added = {utils.get_run_identifier(data['model'], data['metrics_file']): data for data in data_list}
+
+    figure_patches, updates = [], []
+    for traces in rendered:
+        if not traces:
+            figure_patches.append(no_update)
+            updates.append(no_update)
+            continue
+        metric = traces['metric']
+        kept = [identifier for identifier in traces['traces'] if identifier in runs_by_identifier]
+        new = [
+            identifier for identifier in get_trace_order(plot_state, metric)
+            if identifier not in traces['traces'] and identifier in added
+        ]
+        if len(kept) == len(traces['traces']) and not new:
+            figure_patches.append(no_update)
+            updates.append(no_update)
+            continue
+        figure_patch = Patch()
+        for trace_index in reversed(range(len(traces['traces']))):
+            if traces['traces'][trace_index] not in runs_by_identifier:
+                del figure_patch['data'][trace_index]
+        for identifier in new:
+            metrics_df = get_smoothed_metrics(added[identifier], metric, traces.get('smoothing'))
+            figure_patch['data'].append(figures.build_metric_trace(identifier, metrics_df, metric))
+        figure_patches.append(figure_patch)
+        updates.append({**traces, 'traces': kept + new})
+    return figure_patches, updates
+
+
+def needs_render(traces, plot_state, aggregate_mode):
+    """Whether a rendered graph must be rebuilt rather than patched to show ``plot_state``."""
+    if traces is None:
         return False
-    return True
+    if traces['token'] != plot_state['token'] or traces['aggregate'] != aggregate_mode:
+        return True
+    # Bands of grouped seeds depend on every run of their group
+    return aggregate_mode != 'runs' and traces['traces'] != get_trace_order(plot_state, traces['metric'])
+
+
+def get_tail_positions(plot_state, tail_offsets):
+    """Maps each plotted metrics file to the [byte offset, last epoch] already shown."""
+    positions = {run['path']: [run['offset'], run['last_epoch']] for run in plot_state['runs']}
+    if tail_offsets and tail_offsets.get('token') == plot_state['token']:
+        positions.update(tail_offsets['positions'])
+    return positions
+
+
+def get_background_callback_options(interval=None):
+    """Extra ``app.callback`` arguments running a callback as a Dash background job, when enabled.
+
+    Jobs are queued in a diskcache store next to the shared cache, so no broker is needed.
+    ``interval`` is how often the browser polls for the result, in milliseconds (Dash's
+    default when None).
+    """
+    if not BACKGROUND_CALLBACKS:
+        return {}
+    if cache.get_shared_store() is None:
+        logging.warning("Background callbacks need DRL_SHARED_CACHE_DIR and diskcache; running them inline")
+        return {}
+    try:
+        import diskcache
+        from dash import DiskcacheManager
+        manager = DiskcacheManager(diskcache.Cache(os.path.join(SHARED_CACHE_DIR, "jobs")))
+    except ImportError as e:
+        logging.warning(f"Background callbacks unavailable ({e}); running them inline")
+        return {}
+    options = {'background': True, 'manager': manager}
+    if interval is not None:
+        options['interval'] = interval
+    return options
+
 
 def register_callbacks(app):
-    # First callback: Update model folder options
+    if WATCH_LOGS:
+        start_watcher(BASE_DIRECTORY)
+    install_json_engine()
+    install_metrics_endpoint(app.server, get_process_gauges)
+    if COMPRESS_RESPONSES:
+        # Registered last so that it runs first: /metrics records the compressed sizes
+        install_compression(app.server)
+    install_startup_timing(app.server)
+
+    # First callback: Update model folder options whenever the watched logs tree changed
     @app.callback(
-        Output('model-folder-selector', 'options'),
-        [Input('refresh-button', 'n_clicks')]  # Changed to use refresh button instead
+        [
+            Output('model-folder-selector', 'options'),
+            Output('watch-version', 'data'),
+            Output('watch-status', 'children')
+        ],
+        [Input('watch-interval', 'n_intervals')],
+        [State('watch-version', 'data')]
     )
-    def update_model_folder_options(n_clicks):
-        models = get_model_folders(BASE_DIRECTORY)
-        return [{'label': model, 'value': model} for model in models]
+    @instrumented
+    def update_model_folder_options(n_intervals, known_version):
+        watcher = get_watcher(BASE_DIRECTORY)
+        if watcher is None:
+            # Not watched: only list the folders once per page load
+            if known_version is not None:
+                raise PreventUpdate
+            models = utils.get_model_folders(BASE_DIRECTORY)
+            return [{'label': model, 'value': model} for model in models], 0, f"{len(models)} models"
+
+        version = watcher.version
+        if version == known_version:
+            raise PreventUpdate
+        models = watcher.models()
+        status = f"{len(models)} models, {watcher.run_count()} runs ({watcher.mode} watcher)"
+        if known_version is not None:
+            status += f", updated at {time.strftime('%H:%M:%S')}"
+        return [{'label': model, 'value': model} for model in models], version, status
+
+    @app.callback(
+        Output('hyperparameter-filters', 'children'),
+        [Input('model-folder-selector', 'value')]
+    )
+    @instrumented
+    def update_filter_controls(selected_model_folders):
+        if not selected_model_folders:
+            return html.P("Select model folders to filter their runs by hyperparameters.", className="text-muted mb-0")
+        summary = query.get_run_table(BASE_DIRECTORY, selected_model_folders).describe()
+        if not summary:
+            return html.P("No hyperparameters found for the selected model folders.", className="text-muted mb-0")
+        return dbc.Row([build_filter_control(entry) for entry in summary])
 
     @app.callback(
         Output('metrics-file-selector', 'options'),
@@ -48,27 +408,18 @@ def register_callbacks(app):
             Input('apply-filters-button', 'n_clicks')
         ],
         [
-            State('alpha-min', 'value'),
-            State('alpha-max', 'value'),
-            State('batch_size-min', 'value'),
-            State('batch_size-max', 'value'),
-            State('gamma-min', 'value'),
-            State('gamma-max', 'value'),
-            State('num_episodes-min', 'value'),
-            State('num_episodes-max', 'value'),
-            State('replay_capacity-min-test', 'value'),
-            State('replay_capacity-max', 'value'),
-            State('start_epsilon-min', 'value'),
-            State('start_epsilon-max', 'value')
+            State({'type': 'hp-filter-min', 'key': ALL}, 'value'),
+            State({'type': 'hp-filter-max', 'key': ALL}, 'value'),
+            State({'type': 'hp-filter-min', 'key': ALL}, 'id'),
+            State({'type': 'hp-filter-values', 'key': ALL}, 'value'),
+            State({'type': 'hp-filter-values', 'key': ALL}, 'id'),
+            State('hp-missing-policy', 'value')
         ]
     )
+    @instrumented
     def update_metrics_file_options(selected_model_folders, n_clicks,
-                                    alpha_min, alpha_max,
-                                    batch_size_min, batch_size_max,
-                                    gamma_min, gamma_max,
-                                    num_episodes_min, num_episodes_max,
-                                    replay_capacity_min, replay_capacity_max,
-                                    start_epsilon_min, start_epsilon_max):
+                                    range_mins, range_maxs, range_ids,
+                                    value_sets, value_set_ids, missing_policy):
         # Determine which input triggered the callback
         ctx = callback_context
         if not ctx.triggered:
@@ -80,74 +431,15 @@ def register_callbacks(app):
         if not selected_model_folders:
             return []
 
-        # Initialize an empty set for metrics files
-        metrics_files = set()
-
-        logging.info("All input values:")
-        logging.info(f"Model folders: {selected_model_folders}")
-        logging.info(f"Alpha: {alpha_min} - {alpha_max}")
-        logging.info(f"Batch size: {batch_size_min} - {batch_size_max}")
-        logging.info(f"Gamma: {gamma_min} - {gamma_max}")
-        logging.info(f"Num episodes: {num_episodes_min} - {num_episodes_max}")
-        logging.info(f"Replay capacity: {replay_capacity_min} - {replay_capacity_max}")
-        logging.info(f"Start epsilon: {start_epsilon_min} - {start_epsilon_max}")
-
-        # Iterate over selected model folders
-        for model_folder in selected_model_folders:
-            model_path = os.path.join(BASE_DIRECTORY, model_folder)
-            metrics_dir = os.path.join(model_path, "metrics")
-            hyperparams_dir = os.path.join(model_path, "hyperparameters")
-            if os.path.exists(metrics_dir):
-                # Get list of metrics files in this model folder
-                metrics_files_in_model = [
-                    os.path.splitext(f)[0]  # Base name without extension
-                    for f in os.listdir(metrics_dir)
-                    if f.endswith(".csv")
-                ]
-
-                if trigger_id == 'apply-filters-button' and os.path.exists(hyperparams_dir):
-                    # Apply hyperparameter filters
-                    for base_name in metrics_files_in_model:
-                        hyperparams_file = os.path.join(hyperparams_dir, f"{base_name}_hyperparameters.json")
-                        if os.path.exists(hyperparams_file):
-                            try:
-                                with open(hyperparams_file, 'r') as json_file:
-                                    hyperparams_data = json.load(json_file)
-                                    # Access the nested hyperparameters dictionary
-                                    hyperparams = hyperparams_data.get('hyperparameters', {})
-                                satisfies_thresholds = True
-
-                                # Check each hyperparameter
-                                if not check_hyperparameter('alpha', hyperparams.get('alpha'),
-                                                            alpha_min, alpha_max):
-                                    satisfies_thresholds = False
-                                if not check_hyperparameter('batch_size', hyperparams.get('batch_size'),
-                                                            batch_size_min, batch_size_max):
-                                    satisfies_thresholds = False
-                                if not check_hyperparameter('gamma', hyperparams.get('gamma'),
-                                                            gamma_min, gamma_max):
-                                    satisfies_thresholds = False
-                                if not check_hyperparameter('num_episodes', hyperparams.get('num_episodes'),
-                                                            num_episodes_min, num_episodes_max):
-                                    satisfies_thresholds = False
-                                if not check_hyperparameter('replay_capacity', hyperparams.get('replay_capacity'),
-                                                            replay_capacity_min, replay_capacity_max):
-                                    satisfies_thresholds = False
-                                if not check_hyperparameter('start_epsilon', hyperparams.get('start_epsilon'),
-                                                            start_epsilon_min, start_epsilon_max):
-                                    satisfies_thresholds = False
-
-                                if satisfies_thresholds:
-                                    # Add this metrics file to the set
-                                    metrics_files.add(base_name)
-                            except Exception as e:
-                                print(f"Error reading {hyperparams_file}: {e}")
-                        else:
-                            print(
-                                f"Hyperparameters file not found for metrics file '{base_name}' in model '{model_folder}'")
-                else:
-                    # Do not apply hyperparameter filters
-                    metrics_files.update(metrics_files_in_model)
+        table = query.get_run_table(BASE_DIRECTORY, selected_model_folders)
+        if trigger_id != 'apply-filters-button':
+            # Do not apply hyperparameter filters
+            metrics_files = set(table.runs['metrics_file'])
+        else:
+            filters = get_filters(range_ids, range_mins, range_maxs, value_set_ids, value_sets, missing_policy)
+            logging.info(f"Model folders: {selected_model_folders}")
+            logging.info(f"Filters: {filters}")
+            metrics_files = set(table.select(filters)['metrics_file'])
 
         # Return sorted list of metrics files
         metrics_files = sorted(list(metrics_files))
@@ -159,85 +451,303 @@ def register_callbacks(app):
     @app.callback(
         [
             Output('hyperparameters-container', 'children'),
-            Output('plots-container', 'children')
+            Output('plot-state', 'data'),
+            Output('metric-selector', 'options'),
+            Output('metric-selector', 'value')
         ],
         [
             Input('model-folder-selector', 'value'),
             Input('metrics-file-selector', 'value')
         ],
-        prevent_initial_call=True
+        [
+            State('plot-state', 'data'),
+            State('metric-selector', 'value')
+        ],
+        prevent_initial_call=True,
+        # Heavy comparisons run as jobs so that they do not hold a server worker
+        **get_background_callback_options()
     )
-    def update_output(selected_models, selected_metrics_files):
+    @instrumented
+    def update_output(selected_models, selected_metrics_files, plot_state, selected_metrics):
+        # Figures are rendered separately, one callback per picked metric (see render_metric_plot),
+        # and hyperparameters one table page at a time (see update_hyperparameters_table)
         if not selected_models or not selected_metrics_files:
-            return html.Div(), html.Div("Please select model folders and metrics files.")
+            return None, None, [], no_update
 
         try:
-            data_list = load_and_combine_data(selected_models, selected_metrics_files, BASE_DIRECTORY)
+            if plot_state:
+                # Only add or remove what changed since the previous selection
+                run_keys = [(model, f) for model in selected_models for f in selected_metrics_files]
+                patched = patch_output(plot_state, run_keys)
+                if patched is no_update:
+                    return no_update, no_update, no_update, no_update
+                if patched is not None:
+                    return (None, patched, *get_metric_selection(patched['metrics'], selected_metrics))
+
+            data_list = utils.load_and_combine_data(
+                selected_models, selected_metrics_files, BASE_DIRECTORY, overview=True
+            )
+            logging.debug(f"Run cache: {cache.run_cache.stats()}")
 
             if not data_list:
-                return html.Div(), html.Div("No data available for selected models and metrics files.")
-
-            # Process hyperparameters
-            hyperparams_components = []
-            all_metrics_df = []
+                return "No data available for selected models and metrics files.", None, [], no_update
 
-            for data in data_list:
-                metrics_df = data['metrics']
-                hyperparams_df = data['hyperparams']
-                model = data['model']
-                metrics_file = data['metrics_file']
-
-                # Create hyperparameters display
-                hyperparams_html = html.Div([
-                    html.H3(f"Hyperparameters for {model} - {metrics_file}"),
-                    html.Ul([
-                        html.Li(f"{k}: {v}")
-                        for k, v in hyperparams_df.iloc[0].items()
-                    ])
-                ], className="mb-4")
-                hyperparams_components.append(hyperparams_html)
-
-                # Prepare metrics data
-                metrics_df['identifier'] = f"{model} - {metrics_file}"
-                all_metrics_df.append(metrics_df)
-
-            # Combine all metrics data
-            plot_data = pd.concat(all_metrics_df, ignore_index=True)
-            plot_data['timestamp'] = pd.to_datetime(plot_data['timestamp'], errors='coerce')
-
-            metric_columns = [
-                col for col in plot_data.columns
-                if col not in ['epoch', 'identifier', 'model', 'metrics_file', 'timestamp']
-            ]
-
-            plots = []
-            for metric in metric_columns:
-                fig = px.line(
-                    plot_data,
-                    x='epoch',  # Set x-axis to epoch
-                    y=metric,  # Set y-axis to the metric column
-                    color='identifier',  # Different lines for different models/metrics files
-                    title=f"{metric} over Epochs",
-                    labels={'epoch': 'Epoch', metric: metric}  # Labels for x and y axes
-                )
-                # Make the figure smaller to fit two columns
-                fig.update_layout(
-                    height=400,  # Adjust this value as needed
-                    margin=dict(l=40, r=40, t=40, b=40)
-                )
-                plots.append(
-                    html.Div(
-                        dcc.Graph(figure=fig),
-                        className="plot-item"
-                    )
-                )
-
-            return html.Div(hyperparams_components), html.Div(plots, className="plot-grid")
+            metric_columns = figures.get_metric_columns(get_plot_runs(data_list))
+            plot_state = get_plot_state(data_list, metric_columns)
+            return (None, plot_state, *get_metric_selection(metric_columns, selected_metrics))
         except Exception as e:
             logging.error(f"Error in update_output: {str(e)}")
-            return html.Div(f"Error: {str(e)}"), html.Div()
+            return f"Error: {str(e)}", None, [], no_update
+
+    @app.callback(
+        [
+            Output('hyperparameters-table', 'data'),
+            Output('hyperparameters-table', 'columns'),
+            Output('hyperparameters-table', 'page_current'),
+            Output('hyperparameters-table', 'page_count'),
+            Output('hyperparameters-table', 'style_header_conditional'),
+            Output('hyperparameters-table', 'style_data_conditional')
+        ],
+        [
+            Input('plot-state', 'data'),
+            Input('hyperparameters-table', 'page_current'),
+            Input('hyperparameters-table', 'page_size'),
+            Input('hyperparameters-table', 'sort_by'),
+            Input('hyperparameters-table', 'filter_query')
+        ],
+        prevent_initial_call=True
+    )
+    @instrumented
+    def update_hyperparameters_table(plot_state, page_current, page_size, sort_by, filter_query):
+        # Only the visible page of the (sorted, filtered) runs is sent to the browser
+        if not plot_state:
+            return [], [], 0, 1, [], []
+        frame, differing = get_hyperparameter_rows(plot_state['runs'])
+        triggered = callback_context.triggered_prop_ids
+        if 'plot-state.data' in triggered:
+            columns, style_header, style_data = get_hyperparameter_columns(frame, differing)
+        else:
+            # Paging, sorting and filtering keep the columns the browser already has
+            columns = style_header = style_data = no_update
+        frame = query.sort_frame(query.filter_frame(frame, query.parse_filter_query(filter_query)), sort_by)
+        # New runs, sort or filter start over from the first page
+        if 'hyperparameters-table.page_current' not in triggered:
+            page_current = 0
+        records, page_current, page_count = query.get_page(frame, page_current, page_size or 1)
+        return records, columns, page_current, page_count, style_header, style_data
+
+    @app.callback(
+        [
+            Output('plots-container', 'children'),
+            Output({'type': 'metric-graph', 'metric': ALL}, 'figure', allow_duplicate=True),
+            Output({'type': 'metric-traces', 'metric': ALL}, 'data', allow_duplicate=True)
+        ],
+        [
+            Input('plot-state', 'data'),
+            Input('metric-selector', 'value'),
+            Input('aggregate-mode', 'value')
+        ],
+        [
+            State({'type': 'metric-traces', 'metric': ALL}, 'data'),
+            State({'type': 'metric-traces', 'metric': ALL}, 'id')
+        ],
+        prevent_initial_call=True
+    )
+    @instrumented
+    def update_plots(plot_state, selected_metrics, aggregate_mode, rendered, graph_ids):
+        unchanged = [no_update] * len(graph_ids)
+        if not plot_state:
+            return html.Div("Please select model folders and metrics files."), unchanged, unchanged
+        aggregate_mode = aggregate_mode or 'runs'
+        picked = [metric for metric in selected_metrics or [] if metric in plot_state['metrics']]
+        shown = [graph_id['metric'] for graph_id in graph_ids]
+        if shown != picked or any(needs_render(traces, plot_state, aggregate_mode) for traces in rendered):
+            # New graphs: each one renders itself as soon as it is mounted
+            if not picked:
+                return html.Div("Pick metrics to plot."), unchanged, unchanged
+            return [build_plot_item(metric) for metric in picked], unchanged, unchanged
+        if aggregate_mode != 'runs':
+            raise PreventUpdate
+        figure_patches, updates = patch_plots(plot_state, rendered)
+        return no_update, figure_patches, updates
 
+    @app.callback(
+        [
+            Output({'type': 'metric-graph', 'metric': MATCH}, 'figure'),
+            Output({'type': 'metric-traces', 'metric': MATCH}, 'data')
+        ],
+        [
+            Input({'type': 'metric-graph', 'metric': MATCH}, 'relayoutData'),
+            Input('smoothing-method', 'value'),
+            Input('smoothing-window', 'value')
+        ],
+        [
+            State({'type': 'metric-graph', 'metric': MATCH}, 'id'),
+            State({'type': 'metric-traces', 'metric': MATCH}, 'data'),
+            State('plot-state', 'data'),
+            State('tail-offsets', 'data'),
+            State('aggregate-mode', 'value')
+        ],
+        # Loading and decimating the runs of a metric is as heavy as a full update; zooming
+        # re-renders too, so the result is polled for more often
+        **get_background_callback_options(interval=200)
+    )
+    @instrumented
+    def render_metric_plot(relayout_data, smoothing_method, smoothing_window, graph_id, traces, plot_state,
+                           tail_offsets, aggregate_mode):
+        # Runs when the graph is mounted, when the smoothing changes, and again on zoom to
+        # re-decimate only the visible epochs (or the whole run when the axes are reset)
+        if not plot_state:
+            raise PreventUpdate
+        metric = graph_id['metric']
+        smooth = get_smoothing(smoothing_method, smoothing_window)
+        triggered = callback_context.triggered_id
+        if triggered is None or not traces:
+            x_range = None
+            traces = {
+                'metric': metric,
+                'token': plot_state['token'],
+                'aggregate': aggregate_mode or 'runs',
+                'traces': get_trace_order(plot_state, metric),
+                'smoothing': smooth,
+            }
+        elif triggered in ('smoothing-method', 'smoothing-window'):
+            # Only runs not smoothed with these settings yet are computed
+            if smooth == traces.get('smoothing'):
+                raise PreventUpdate
+            x_range = None
+            traces = {**traces, 'smoothing': smooth}
+        else:
+            x_range = downsample.parse_x_range(relayout_data)
+            if x_range is False:
+                raise PreventUpdate
+        trace_order = traces['traces']
+        state_runs = [run for run in plot_state['runs'] if run['identifier'] in trace_order]
+        data_list = load_plot_runs([(run['model'], run['metrics_file']) for run in state_runs], x_range,
+                                   traces.get('smoothing'))
+
+        # Stop at the epochs already shown so that live updates keep appending after them
+        positions = get_tail_positions(plot_state, tail_offsets)
+        loaded = {}
+        for data, (identifier, metrics_df) in zip(data_list, get_plot_runs(data_list)):
+            last_epoch = positions.get(data['metrics_path'], [None, None])[1]
+            if last_epoch is not None:
+                metrics_df = metrics_df[metrics_df['epoch'] <= last_epoch]
+            loaded[identifier] = metrics_df
+            data['metrics'] = metrics_df
+        # Keep the trace order of the plotted figure
+        runs = [(identifier, loaded[identifier]) for identifier in trace_order if identifier in loaded]
+        return build_metric_plot(data_list, runs, metric, traces['aggregate'], x_range, traces.get('smoothing')), traces
 
+    @app.callback(
+        Output('live-interval', 'disabled'),
+        Input('live-mode-switch', 'value')
+    )
+    @instrumented
+    def toggle_live_mode(live_mode):
+        return not live_mode
+
+    @app.callback(
+        [
+            Output({'type': 'metric-graph', 'metric': ALL}, 'extendData'),
+            Output('tail-offsets', 'data')
+        ],
+        Input('live-interval', 'n_intervals'),
+        State({'type': 'metric-traces', 'metric': ALL}, 'data'),
+        State('plot-state', 'data'),
+        State('tail-offsets', 'data'),
+        prevent_initial_call=True
+    )
+    @instrumented
+    def extend_live_plots(n_intervals, rendered, plot_state, tail_offsets):
+        if not plot_state:
+            raise PreventUpdate
+
+        # Parse only the rows appended to each plotted metrics file since the last tick
+        positions = get_tail_positions(plot_state, tail_offsets)
+        appended = {}
+        for run in plot_state['runs']:
+            offset, last_epoch = positions[run['path']]
+            try:
+                rows, offset = tail.read_appended_rows(run['path'], offset)
+            except Exception as e:
+                logging.error(f"Error tailing {run['path']}: {str(e)}")
+                continue
+            if rows is not None and last_epoch is not None:
+                rows = rows[rows['epoch'] > last_epoch]
+            if rows is not None and len(rows):
+                appended[run['identifier']] = rows
+                last_epoch = get_last_epoch(rows)
+            positions[run['path']] = [offset, last_epoch]
+
+        extend_data = []
+        for traces in rendered:
+            # Graphs still rendering pick the new rows up themselves; bands of grouped seeds
+            # and smoothed runs are only recomputed on the next full update
+            if not traces or traces['aggregate'] != 'runs' or traces.get('smoothing'):
+                extend_data.append(no_update)
+                continue
+            metric = traces['metric']
+            xs, ys, trace_indices = [], [], []
+            for trace_index, identifier in enumerate(traces['traces']):
+                rows = appended.get(identifier)
+                if rows is None or metric not in rows.columns:
+                    continue
+                points = downsample.sample_run(rows, metric)
+                xs.append(points['epoch'].tolist())
+                ys.append(points[metric].tolist())
+                trace_indices.append(trace_index)
+            extend_data.append([{'x': xs, 'y': ys}, trace_indices] if trace_indices else no_update)
+
+        return extend_data, {'token': plot_state['token'], 'positions': positions}
+
+    @app.callback(
+        Output('sweep-collapse', 'is_open'),
+        Input('sweep-toggle', 'n_clicks'),
+        State('sweep-collapse', 'is_open'),
+        prevent_initial_call=True
+    )
+    @instrumented
+    def toggle_sweep_overview(n_clicks, is_open):
+        return not is_open
+
+    @app.callback(
+        [
+            Output('sweep-graph', 'figure'),
+            Output('sweep-metric', 'options'),
+            Output('sweep-metric', 'value'),
+            Output('sweep-x', 'options'),
+            Output('sweep-x', 'value')
+        ],
+        [
+            Input('sweep-collapse', 'is_open'),
+            Input('model-folder-selector', 'value'),
+            Input('sweep-metric', 'value'),
+            Input('sweep-stat', 'value'),
+            Input('sweep-view', 'value'),
+            Input('sweep-x', 'value')
+        ],
+        prevent_initial_call=True
+    )
+    @instrumented
+    def update_sweep_view(is_open, selected_models, metric, stat, view, x_key):
+        # Only computed while the overview is open: summarizing a new sweep reads every metrics file once
+        if not is_open or not selected_models:
+            raise PreventUpdate
+        try:
+            summaries = summary.get_run_summaries(BASE_DIRECTORY, selected_models)
+            metrics = summary.get_summary_metrics(summaries)
+            # Hyperparameters that take a single value tell the runs apart no better than none
+            keys = [key for key in summary.get_summary_keys(summaries) if summaries[key].nunique(dropna=False) > 1]
+            if not metrics:
+                return {'layout': {'title': {'text': "No summarized runs"}, 'height': 500}}, [], None, [], None
+            metric = metric if metric in metrics else metrics[0]
+            x_key = x_key if x_key in keys else (keys[0] if keys else None)
+            fig = figures.build_sweep_figure(summaries, f"{metric}:{stat}", keys, view, x_key)
+        except Exception as e:
+            logging.error(f"Error in update_sweep_view: {str(e)}")
+            raise PreventUpdate
+        return fig, metrics, metric, keys, x_key
 
     # Callback for collapse functionality
     @app.callback(
@@ -245,7 +755,11 @@ def register_callbacks(app):
         [Input("collapse-button", "n_clicks")],
         [State("collapse", "is_open")],
     )
+    @instrumented
     def toggle_collapse(n_clicks, is_open):
         if n_clicks:
             return not is_open
-        return is_open
\ No newline at end of file
+        return is_open
+    record_startup('callbacks_registered')
+    if WARMUP:
+        start_warmup(BASE_DIRECTORY)
@@ -0,0 +1,266 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from app.config import CATALOG_PATH, CATALOG_REFRESH_INTERVAL
+from app.archive import get_run_file, open_file
+from app.watcher import HYPERPARAMS_SUFFIX, get_watcher, scan_model
+
+CATALOG_FILENAME = ".run_catalog.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    model TEXT NOT NULL,
+    metrics_file TEXT NOT NULL,
+    metrics_size INTEGER NOT NULL,
+    metrics_mtime REAL NOT NULL,
+    hyperparams_size INTEGER,
+    hyperparams_mtime REAL,
+    hyperparams TEXT,
+    hyperparams_error TEXT,
+    PRIMARY KEY (model, metrics_file)
+)
+"""
+
+# Per-run summary scalars (see app/summary.py), valid while the metrics file keeps its size and mtime
+_SUMMARY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS summaries (
+    model TEXT NOT NULL,
+    metrics_file TEXT NOT NULL,
+    metrics_size INTEGER NOT NULL,
+    metrics_mtime REAL NOT NULL,
+    summary TEXT NOT NULL,
+    PRIMARY KEY (model, metrics_file)
+)
+"""
+
+# Bumped whenever the runs or hyperparameters of a model change, so that tables derived from
+# them (see app/query.py) know when to rebuild, whichever process refreshed the catalog
+_GENERATION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS generations (
+    model TEXT PRIMARY KEY,
+    generation INTEGER NOT NULL
+)
+"""
+
+_refresh_lock = threading.Lock()
+_last_refresh = {}
+
+
+def flatten_hyperparameters(hyperparams, prefix=""):
+    """Flattens nested hyperparameter dicts into a single level with dotted keys."""
+    flat = {}
+    for key, value in hyperparams.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_hyperparameters(value, prefix=f"{name}."))
+        else:
+            flat[name] = value
+    return flat
+
+
+def get_catalog_path(base_directory):
+    """Returns the SQLite file backing the catalog of ``base_directory``."""
+    if CATALOG_PATH:
+        return CATALOG_PATH
+    path = os.path.join(base_directory, CATALOG_FILENAME)
+    if os.access(base_directory, os.W_OK) or os.access(path, os.W_OK):
+        return path
+    # Logs root is read-only (e.g. a mounted share): keep the index locally instead
+    digest = hashlib.sha1(os.path.abspath(base_directory).encode()).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), f"drl_run_catalog_{digest}.sqlite")
+
+
+def _connect(base_directory):
+    conn = sqlite3.connect(get_catalog_path(base_directory), timeout=30)
+    conn.execute(_SCHEMA)
+    conn.execute(_SUMMARY_SCHEMA)
+    conn.execute(_GENERATION_SCHEMA)
+    return conn
+
+
+def _read_hyperparameters(path):
+    """Returns (flattened hyperparameters as JSON text, error message)."""
+    try:
+        with open_file(path) as json_file:
+            hyperparams_data = json.load(json_file)
+        hyperparams = flatten_hyperparameters(hyperparams_data.get('hyperparameters', {}))
+        return json.dumps(hyperparams, sort_keys=True), None
+    except Exception as e:
+        return None, str(e)
+
+
+def _refresh_model(conn, base_directory, model, watcher=None):
+    if watcher is not None:
+        metrics = watcher.metrics_files(model)
+        hyperparams = watcher.hyperparameters_files(model)
+    else:
+        metrics = scan_model(base_directory, model, "metrics")
+        hyperparams = scan_model(base_directory, model, "hyperparameters")
+
+    known = {
+        row[0]: row[1:]
+        for row in conn.execute(
+            "SELECT metrics_file, metrics_size, metrics_mtime, hyperparams_size, hyperparams_mtime "
+            "FROM runs WHERE model = ?", (model,)
+        )
+    }
+
+    removed = [(model, base_name) for base_name in known if base_name not in metrics]
+    conn.executemany("DELETE FROM runs WHERE model = ? AND metrics_file = ?", removed)
+    conn.executemany("DELETE FROM summaries WHERE model = ? AND metrics_file = ?", removed)
+    changed = bool(removed)
+
+    for base_name, (metrics_size, metrics_mtime) in metrics.items():
+        hp_size, hp_mtime = hyperparams.get(base_name, (None, None))
+        previous = known.get(base_name)
+        if previous == (metrics_size, metrics_mtime, hp_size, hp_mtime):
+            continue
+        if previous is not None and previous[2:] == (hp_size, hp_mtime):
+            # Only the metrics CSV changed (e.g. a run still training): keep parsed hyperparameters
+            conn.execute(
+                "UPDATE runs SET metrics_size = ?, metrics_mtime = ? WHERE model = ? AND metrics_file = ?",
+                (metrics_size, metrics_mtime, model, base_name)
+            )
+            continue
+        hp_json, hp_error = None, None
+        if hp_size is not None:
+            hp_path = get_run_file(base_directory, model, "hyperparameters", f"{base_name}{HYPERPARAMS_SUFFIX}")
+            hp_json, hp_error = _read_hyperparameters(hp_path) if hp_path else (None, "missing file")
+        conn.execute(
+            "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (model, base_name, metrics_size, metrics_mtime, hp_size, hp_mtime, hp_json, hp_error)
+        )
+        changed = True
+
+    if changed:
+        conn.execute(
+            "INSERT INTO generations VALUES (?, 1) ON CONFLICT (model) DO UPDATE SET generation = generation + 1",
+            (model,)
+        )
+
+
+def refresh_catalog(base_directory, models, force=False):
+    """Brings the catalog rows of ``models`` up to date with the files on disk.
+
+    Only hyperparameter files whose size or mtime changed since the last scan are re-read.
+    When the logs tree is watched, file listings come from the watcher and a model is only
+    refreshed after the watcher saw it change. Otherwise a model folder is rescanned at most
+    once every ``CATALOG_REFRESH_INTERVAL`` seconds unless ``force`` is set.
+    """
+    watcher = get_watcher(base_directory)
+    with _refresh_lock:
+        if watcher is not None:
+            marks = {model: ('watch', watcher.model_version(model)) for model in models}
+            stale = [model for model in models if force or _last_refresh.get((base_directory, model)) != marks[model]]
+        else:
+            now = time.monotonic()
+            marks = {model: ('scan', now) for model in models}
+            stale = [
+                model for model in models
+                if force or _last_refresh.get((base_directory, model), ('scan', float('-inf')))[1]
+                <= now - CATALOG_REFRESH_INTERVAL
+            ]
+        if not stale:
+            return
+        conn = _connect(base_directory)
+        try:
+            with conn:
+                for model in stale:
+                    _refresh_model(conn, base_directory, model, watcher)
+        finally:
+            conn.close()
+        for model in stale:
+            _last_refresh[(base_directory, model)] = marks[model]
+
+
+def get_catalog_runs(base_directory, models):
+    """Returns one dict per run of ``models``, ordered by model then metrics file.
+
+    ``hyperparams`` is the flattened hyperparameters dict, or None when the JSON file is
+    missing or unreadable (``hyperparams_error`` then holds the reason, if any).
+    """
+    models = list(models)
+    if not models:
+        return []
+    refresh_catalog(base_directory, models)
+    conn = _connect(base_directory)
+    try:
+        placeholders = ", ".join("?" for _ in models)
+        rows = conn.execute(
+            "SELECT model, metrics_file, metrics_size, metrics_mtime, hyperparams, hyperparams_error "
+            f"FROM runs WHERE model IN ({placeholders}) ORDER BY model, metrics_file",
+            models
+        ).fetchall()
+    finally:
+        conn.close()
+    return [
+        {
+            'model': model,
+            'metrics_file': metrics_file,
+            'metrics_size': metrics_size,
+            'metrics_mtime': metrics_mtime,
+            'hyperparams': json.loads(hp_json) if hp_json is not None else None,
+            'hyperparams_error': hp_error,
+        }
+        for model, metrics_file, metrics_size, metrics_mtime, hp_json, hp_error in rows
+    ]
+
+
+def get_catalog_generation(base_directory, models):
+    """Generation of each of ``models``: changes whenever one of their runs is added, removed,
+    renamed or has its hyperparameters file changed, but not when only metrics files grow.
+    """
+    models = list(models)
+    if not models:
+        return ()
+    refresh_catalog(base_directory, models)
+    conn = _connect(base_directory)
+    try:
+        placeholders = ", ".join("?" for _ in models)
+        generations = dict(conn.execute(
+            f"SELECT model, generation FROM generations WHERE model IN ({placeholders})", models
+        ))
+    finally:
+        conn.close()
+    return tuple(generations.get(model, 0) for model in models)
+
+
+def get_catalog_summaries(base_directory, models):
+    """Stored summaries of the runs of ``models`` that are still current, keyed by (model, metrics file).
+
+    Call after ``get_catalog_runs`` so that the catalog knows the current size and mtime
+    of each metrics file.
+    """
+    models = list(models)
+    if not models:
+        return {}
+    conn = _connect(base_directory)
+    try:
+        placeholders = ", ".join("?" for _ in models)
+        rows = conn.execute(
+            "SELECT r.model, r.metrics_file, s.summary FROM runs r JOIN summaries s "
+            "ON s.model = r.model AND s.metrics_file = r.metrics_file "
+            "AND s.metrics_size = r.metrics_size AND s.metrics_mtime = r.metrics_mtime "
+            f"WHERE r.model IN ({placeholders})",
+            models
+        ).fetchall()
+    finally:
+        conn.close()
+    return {(model, metrics_file): json.loads(summary) for model, metrics_file, summary in rows}
+
+
+def store_catalog_summaries(base_directory, rows):
+    """Stores (model, metrics file, metrics size, metrics mtime, summary JSON) rows."""
+    if not rows:
+        return
+    conn = _connect(base_directory)
+    try:
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?, ?)", rows)
+    finally:
+        conn.close()
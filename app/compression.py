@@ -0,0 +1,68 @@
+import gzip
+
+import plotly.io
+from flask import request
+
+from app.config import COMPRESS_LEVEL, COMPRESS_MIN_BYTES, JSON_ENGINE
+
+try:
+    import brotli
+except ImportError:  # Only gzip is offered then
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json", "application/javascript", "text/javascript", "text/css", "text/html", "text/plain",
+}
+
+
+def get_encodings():
+    """Content encodings the server can produce, preferred first."""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def choose_encoding(accept_encoding):
+    """Best encoding of ``get_encodings()`` allowed by an Accept-Encoding header, or None."""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                continue
+        accepted[name.strip().lower()] = quality
+    for encoding in get_encodings():
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+def compress(data, encoding, level=COMPRESS_LEVEL):
+    if encoding == "br":
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level)
+
+
+def install_json_engine(engine=JSON_ENGINE):
+    """Selects the JSON engine Dash serializes callback responses with (plotly's, which uses orjson when installed)."""
+    plotly.io.json.config.default_engine = engine
+
+
+def install_compression(server, min_bytes=COMPRESS_MIN_BYTES):
+    """Compresses the server's JSON, script and style responses for clients that accept it."""
+    @server.after_request
+    def compress_response(response):
+        if (response.status_code != 200 or response.direct_passthrough
+                or "Content-Encoding" in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+        encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+        if encoding is None:
+            return response
+        data = response.get_data()
+        if len(data) < min_bytes:
+            return response
+        response.set_data(compress(data, encoding))
+        response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        return response
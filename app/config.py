@@ -0,0 +1,100 @@
+import os
+
+# Root of the training logs: one folder per model with metrics/ and hyperparameters/
+BASE_DIRECTORY = os.environ.get("DRL_LOGS_DIR", "../reinforcement_learning_project_IABD/logs")
+
+# Run catalog (SQLite index of every run under BASE_DIRECTORY)
+# Defaults to a hidden file in the logs root; falls back to the temp dir when that is read-only
+CATALOG_PATH = os.environ.get("DRL_CATALOG_PATH")
+# Minimum number of seconds between two rescans of the same model folder
+CATALOG_REFRESH_INTERVAL = float(os.environ.get("DRL_CATALOG_REFRESH_INTERVAL", "5"))
+
+# Parsed-run cache (process wide, LRU), in bytes of DataFrame memory
+RUN_CACHE_MAX_BYTES = int(os.environ.get("DRL_RUN_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+# Rendered figure cache (process wide, LRU), in bytes
+FIGURE_CACHE_MAX_BYTES = int(os.environ.get("DRL_FIGURE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Production serving (wsgi.py): diskcache directory shared by the worker processes of a host,
+# used as a second level for the run and figure caches and as the background callback queue
+SHARED_CACHE_DIR = os.environ.get("DRL_SHARED_CACHE_DIR")
+SHARED_CACHE_MAX_BYTES = int(os.environ.get("DRL_SHARED_CACHE_MAX_BYTES", str(4 * 1024 * 1024 * 1024)))
+# Run full plot updates and per-metric plot renders as Dash background callbacks (needs
+# SHARED_CACHE_DIR, diskcache, multiprocess and psutil)
+BACKGROUND_CALLBACKS = os.environ.get("DRL_BACKGROUND_CALLBACKS", "0") == "1"
+
+# Store parsed metrics compactly: float64 metrics as float32 and integer columns (e.g. epoch)
+# in the smallest integer type that holds them
+DOWNCAST_METRICS = os.environ.get("DRL_DOWNCAST_METRICS", "0") == "1"
+
+# Worker pool used to read the files of the selected runs ("thread" or "process");
+# 1 worker loads runs serially in the callback thread
+LOAD_WORKERS = int(os.environ.get("DRL_LOAD_WORKERS", str(min(32, os.cpu_count() or 1))))
+LOAD_EXECUTOR = os.environ.get("DRL_LOAD_EXECUTOR", "thread")
+
+# Server-side decimation of plotted traces: "minmax" (keeps every peak and dip) or "lttb"
+POINTS_PER_TRACE = int(os.environ.get("DRL_POINTS_PER_TRACE", "2000"))
+DOWNSAMPLE_METHOD = os.environ.get("DRL_DOWNSAMPLE_METHOD", "minmax")
+# Metrics files at least this large (in bytes) are plotted from pre-aggregated pyramids
+# (see app/pyramid.py) instead of being parsed in full
+PYRAMID_MIN_BYTES = int(os.environ.get("DRL_PYRAMID_MIN_BYTES", str(32 * 1024 * 1024)))
+
+# Smoothing of plotted metrics (EMA, rolling mean or rolling median over a window of logged points),
+# applied to each run before decimation; the slider steps through these windows
+SMOOTHING_WINDOWS = [
+    int(w) for w in os.environ.get("DRL_SMOOTHING_WINDOWS", "2,5,10,20,50,100,200,500,1000").split(",") if w
+]
+SMOOTHING_WINDOW = int(os.environ.get("DRL_SMOOTHING_WINDOW", "10"))
+
+# Cross-seed aggregation: runs whose hyperparameters only differ by these keys (matched on the
+# last component of dotted keys) are grouped, and these quantiles are computed across them
+SEED_KEYS = [k for k in os.environ.get("DRL_SEED_KEYS", "seed,random_seed").split(",") if k]
+AGGREGATE_QUANTILES = [float(q) for q in os.environ.get("DRL_AGGREGATE_QUANTILES", "0.25,0.5,0.75").split(",") if q]
+
+# Per-run summaries of the sweep view: mean of the last N logged values, and metrics where lower is
+# better (matched as substrings of the metric name; every other metric is maximized)
+SUMMARY_LAST_N = int(os.environ.get("DRL_SUMMARY_LAST_N", "10"))
+SUMMARY_MINIMIZE = [m for m in os.environ.get("DRL_SUMMARY_MINIMIZE", "loss,error,regret,cost").lower().split(",") if m]
+
+# Polling period of the live tail mode, in milliseconds
+LIVE_INTERVAL_MS = int(os.environ.get("DRL_LIVE_INTERVAL_MS", "5000"))
+
+# Background watcher of the logs tree (inotify through watchdog when installed, polling otherwise)
+WATCH_LOGS = os.environ.get("DRL_WATCH_LOGS", "1") == "1"
+WATCH_POLL_INTERVAL = float(os.environ.get("DRL_WATCH_POLL_INTERVAL", "10"))
+# With inotify, the whole tree is still rescanned this often (seconds, 0 to never): files written
+# from another host over NFS or other network filesystems produce no events
+WATCH_RESCAN_INTERVAL = float(os.environ.get("DRL_WATCH_RESCAN_INTERVAL", "60"))
+# How often the browser asks whether the watched tree changed, in milliseconds
+WATCH_UI_INTERVAL_MS = int(os.environ.get("DRL_WATCH_UI_INTERVAL_MS", "3000"))
+
+# Metrics plotted by default when runs are selected (more can be picked in the metric selector)
+DEFAULT_PLOTTED_METRICS = int(os.environ.get("DRL_DEFAULT_PLOTTED_METRICS", "4"))
+
+# Rows per page of the hyperparameter table (pages are sorted, filtered and sent by the server)
+HYPERPARAMETER_PAGE_SIZE = int(os.environ.get("DRL_HYPERPARAMETER_PAGE_SIZE", "25"))
+
+# Plot runs longer than this many rows with WebGL (scattergl) traces instead of SVG
+WEBGL_MIN_POINTS = int(os.environ.get("DRL_WEBGL_MIN_POINTS", "100000"))
+# Send trace arrays as base64 typed arrays instead of JSON number lists
+BINARY_ARRAYS = os.environ.get("DRL_BINARY_ARRAYS", "1") == "1"
+
+# Compression of server responses (gzip, or brotli when installed) larger than this many bytes.
+# Base64 typed arrays barely shrink further past level 1, which is several times faster
+COMPRESS_RESPONSES = os.environ.get("DRL_COMPRESS_RESPONSES", "1") == "1"
+COMPRESS_MIN_BYTES = int(os.environ.get("DRL_COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_LEVEL = int(os.environ.get("DRL_COMPRESS_LEVEL", "1"))
+# JSON encoder of callback responses: "orjson", "json" or "auto" (orjson when installed)
+JSON_ENGINE = os.environ.get("DRL_JSON_ENGINE", "auto")
+
+# Startup warm-up: a background thread imports the data modules, refreshes the run catalog and
+# loads this many of the most recently modified runs into the run cache
+WARMUP = os.environ.get("DRL_WARMUP", "1") == "1"
+WARMUP_RUNS = int(os.environ.get("DRL_WARMUP_RUNS", "10"))
+
+# Instrumentation: fraction of callback calls profiled with cProfile, and where the profiles go
+PROFILE_SAMPLE_RATE = float(os.environ.get("DRL_PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.environ.get("DRL_PROFILE_DIR", "profiles")
+# Also profile requests sent with an X-Profile-Callback header (off by default: any client could
+# then force profiling and fill PROFILE_DIR)
+PROFILE_BY_HEADER = os.environ.get("DRL_PROFILE_HEADER", "0") == "1"
+LOG_FILE = os.environ.get("DRL_LOG_FILE", "app.log")
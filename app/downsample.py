@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+from app.config import DOWNSAMPLE_METHOD, POINTS_PER_TRACE
+
+
+def minmax_indices(y, n_out):
+    """Indices of the first, last, minimum and maximum point of ``n_out // 2`` equal-count buckets."""
+    n = len(y)
+    if n <= n_out or n_out < 4:
+        return np.arange(n)
+    n_buckets = n_out // 2
+    size = -(-n // n_buckets)
+    n_buckets = -(-n // size)
+    padded_low = np.full(n_buckets * size, np.inf)
+    padded_high = np.full(n_buckets * size, -np.inf)
+    padded_low[:n] = y
+    padded_high[:n] = y
+    offsets = np.arange(n_buckets) * size
+    low = offsets + padded_low.reshape(n_buckets, size).argmin(axis=1)
+    high = offsets + padded_high.reshape(n_buckets, size).argmax(axis=1)
+    return np.unique(np.concatenate(([0, n - 1], low, high)))
+
+
+def lttb_indices(x, y, n_out):
+    """Indices kept by Largest-Triangle-Three-Buckets decimation of the series (x, y)."""
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    x = x.astype(float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+
+def sample_run(metrics_df, metric, x_range=None, max_points=POINTS_PER_TRACE, method=DOWNSAMPLE_METHOD):
+    """Returns the ``epoch`` and ``metric`` rows of a run to plot, at most about ``max_points``.
+
+    With ``x_range`` only the visible epochs (plus one point on each side, so the line
+    reaches the plot edges) are decimated, which gives full fidelity once zoomed in far enough.
+    """
+    plot_df = metrics_df[['epoch', metric]].dropna()
+    if not plot_df['epoch'].is_monotonic_increasing:
+        plot_df = plot_df.sort_values('epoch', kind='stable')
+    x = plot_df['epoch'].to_numpy()
+
+    if x_range is not None:
+        start = max(int(np.searchsorted(x, x_range[0], side='left')) - 1, 0)
+        end = min(int(np.searchsorted(x, x_range[1], side='right')) + 1, len(x))
+        plot_df, x = plot_df.iloc[start:end], x[start:end]
+
+    if len(plot_df) <= max_points or not pd.api.types.is_numeric_dtype(plot_df[metric]):
+        return plot_df
+    y = plot_df[metric].to_numpy(dtype=float)
+    if method == "lttb":
+        indices = lttb_indices(x, y, max_points)
+    else:
+        indices = minmax_indices(y, max_points)
+    return plot_df.iloc[indices]
+
+
+def parse_x_range(relayout_data):
+    """Extracts the zoomed epoch range from a graph's ``relayoutData``.
+
+    Returns (x0, x1), None when the x axis was reset to autorange, or False when the
+    event did not change the x axis.
+    """
+    if not relayout_data:
+        return False
+    if relayout_data.get('xaxis.autorange'):
+        return None
+    if 'xaxis.range[0]' in relayout_data and 'xaxis.range[1]' in relayout_data:
+        return relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']
+    if 'xaxis.range' in relayout_data:
+        return tuple(relayout_data['xaxis.range'])
+    return False
@@ -0,0 +1,206 @@
+import base64
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.colors import DEFAULT_PLOTLY_COLORS, unlabel_rgb
+
+from app.config import BINARY_ARRAYS, POINTS_PER_TRACE, WEBGL_MIN_POINTS
+from app.downsample import minmax_indices, sample_run
+
+META_COLUMNS = ['epoch', 'identifier', 'model', 'metrics_file', 'timestamp']
+
+# numpy dtypes plotly.js can decode from base64 typed arrays
+_TYPED_ARRAY_CODES = {
+    'int8': 'i1', 'uint8': 'u1', 'int16': 'i2', 'uint16': 'u2',
+    'int32': 'i4', 'uint32': 'u4', 'float32': 'f4', 'float64': 'f8',
+}
+
+
+def encode_array(values):
+    """Encodes a numeric array as a plotly.js typed array spec, or a plain list otherwise."""
+    arr = np.asarray(values)
+    if not BINARY_ARRAYS:
+        return arr.tolist()
+    if arr.dtype.kind == 'b':
+        arr = arr.astype(np.uint8)
+    elif arr.dtype.kind in 'iu' and arr.dtype.itemsize == 8:
+        # No 64-bit integer typed arrays in the browser
+        fits = len(arr) == 0 or (arr.min() >= np.iinfo(np.int32).min and arr.max() <= np.iinfo(np.int32).max)
+        arr = arr.astype(np.int32) if fits else arr.astype(np.float64)
+    code = _TYPED_ARRAY_CODES.get(arr.dtype.name)
+    if code is None:
+        return arr.tolist()
+    arr = np.ascontiguousarray(arr, dtype=arr.dtype.newbyteorder('<'))
+    return {'dtype': code, 'bdata': base64.b64encode(arr.tobytes()).decode('ascii')}
+
+
+def get_metric_columns(runs):
+    """Metric columns found across ``runs`` (a list of (identifier, metrics DataFrame)), in first-seen order."""
+    metric_columns = []
+    for _, metrics_df in runs:
+        metric_columns.extend(
+            col for col in metrics_df.columns
+            if col not in META_COLUMNS and col not in metric_columns
+        )
+    return metric_columns
+
+
+def build_metric_trace(identifier, metrics_df, metric, x_range=None, webgl=None):
+    """Decimated line trace of one run's ``metric`` over epochs."""
+    if webgl is None:
+        webgl = len(metrics_df) > WEBGL_MIN_POINTS
+    trace_class = go.Scattergl if webgl else go.Scatter
+    points = sample_run(metrics_df, metric, x_range)
+    return trace_class(
+        x=encode_array(points['epoch'].to_numpy()),
+        y=encode_array(points[metric].to_numpy()),
+        mode='lines',
+        name=identifier,
+        legendgroup=identifier,
+        hovertemplate=f"identifier={identifier}<br>Epoch=%{{x}}<br>{metric}=%{{y}}<extra></extra>",
+    )
+
+
+def build_metric_figure(runs, metric, x_range=None):
+    """Line plot of ``metric`` over epochs with one decimated trace per run.
+
+    Traces are built straight from each run's columns; runs longer than
+    ``WEBGL_MIN_POINTS`` rows switch the figure to WebGL rendering.
+    """
+    runs = [(identifier, metrics_df) for identifier, metrics_df in runs if metric in metrics_df.columns]
+    use_webgl = any(len(metrics_df) > WEBGL_MIN_POINTS for _, metrics_df in runs)
+    traces = [
+        build_metric_trace(identifier, metrics_df, metric, x_range, webgl=use_webgl)
+        for identifier, metrics_df in runs
+    ]
+
+    return _layout_figure(go.Figure(data=traces), metric, 'identifier', x_range)
+
+
+def _layout_figure(fig, metric, legend_title, x_range=None):
+    # Make the figure smaller to fit two columns
+    fig.update_layout(
+        title=f"{metric} over Epochs",
+        xaxis_title='Epoch',
+        yaxis_title=metric,
+        legend_title_text=legend_title,
+        height=400,  # Adjust this value as needed
+        margin=dict(l=40, r=40, t=40, b=40),
+        uirevision=metric  # Keep the user's zoom when the figure is re-rendered
+    )
+    if x_range is not None:
+        fig.update_xaxes(range=list(x_range))
+    return fig
+
+
+def get_band_columns(aggregate, band):
+    """(center, low, high) columns of an aggregate drawn as ``band``: "std" or "quantile"."""
+    if band == "quantile":
+        quantiles = [col for col in aggregate.columns if col.startswith('q')]
+        if quantiles:
+            center = 'q0.5' if 'q0.5' in quantiles else 'mean'
+            return aggregate[center], aggregate[quantiles[0]], aggregate[quantiles[-1]]
+    return aggregate['mean'], aggregate['mean'] - aggregate['std'], aggregate['mean'] + aggregate['std']
+
+
+def build_aggregate_traces(label, aggregate, metric, band, color, x_range=None, max_points=POINTS_PER_TRACE):
+    """Center line of a group of runs plus the band around it, as three traces."""
+    center, low, high = get_band_columns(aggregate, band)
+    x = aggregate['epoch'].to_numpy()
+    center, low, high = center.to_numpy(), low.to_numpy(), high.to_numpy()
+    start, end = 0, len(x)
+    if x_range is not None:
+        start = max(int(np.searchsorted(x, x_range[0], side='left')) - 1, 0)
+        end = min(int(np.searchsorted(x, x_range[1], side='right')) + 1, len(x))
+    x, center, low, high = x[start:end], center[start:end], low[start:end], high[start:end]
+    if len(x) > max_points:
+        # Keep the extremes of the line and of both edges of the band
+        indices = np.unique(np.concatenate([minmax_indices(series, max_points // 3) for series in (center, low, high)]))
+        x, center, low, high = x[indices], center[indices], low[indices], high[indices]
+
+    name = "median" if band == "quantile" and 'q0.5' in aggregate.columns else "mean"
+    fill = "rgba({}, {}, {}, 0.2)".format(*unlabel_rgb(color))
+    return [
+        go.Scatter(x=encode_array(x), y=encode_array(high), mode='lines', line=dict(width=0), legendgroup=label,
+                   showlegend=False, hoverinfo='skip'),
+        go.Scatter(x=encode_array(x), y=encode_array(low), mode='lines', line=dict(width=0), legendgroup=label,
+                   showlegend=False, hoverinfo='skip', fill='tonexty', fillcolor=fill),
+        go.Scatter(
+            x=encode_array(x),
+            y=encode_array(center),
+            mode='lines',
+            line=dict(color=color),
+            name=label,
+            legendgroup=label,
+            hovertemplate=f"group={label}<br>Epoch=%{{x}}<br>{name} {metric}=%{{y}}<extra></extra>",
+        ),
+    ]
+
+
+def build_aggregate_figure(aggregates, metric, band, x_range=None):
+    """One line and one shaded band per group of runs (see app.aggregate.group_runs)."""
+    traces = []
+    for i, (label, aggregate) in enumerate(aggregates):
+        color = DEFAULT_PLOTLY_COLORS[i % len(DEFAULT_PLOTLY_COLORS)]
+        traces.extend(build_aggregate_traces(label, aggregate, metric, band, color, x_range))
+    return _layout_figure(go.Figure(data=traces), metric, 'group', x_range)
+
+
+def build_traces_figure(traces, metric, legend_title):
+    """Figure dict of ``metric`` from trace dicts built separately (see app/report.py)."""
+    layout = _layout_figure(go.Figure(), metric, legend_title).to_dict()['layout']
+    return {'data': traces, 'layout': layout}
+
+
+def _is_numeric(values):
+    return pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values)
+
+
+def _sweep_dimension(values, label):
+    """Parallel coordinates axis of one column: numeric as is, anything else as categories."""
+    if _is_numeric(values):
+        return dict(label=label, values=encode_array(values.to_numpy(dtype=float)))
+    labels = values.astype(str).where(values.notna(), "(missing)")
+    categories = sorted(labels.unique())
+    codes = labels.map({category: i for i, category in enumerate(categories)}).to_numpy()
+    return dict(label=label, values=encode_array(codes), tickvals=list(range(len(categories))), ticktext=categories)
+
+
+def build_sweep_figure(summaries, score, keys, view, x_key=None):
+    """Hyperparameters of many runs against one summary score (see app.summary).
+
+    ``view`` is "parcoords" (one axis per key in ``keys`` then the score, lines colored by
+    score) or "scatter" (the score over the ``x_key`` hyperparameter, one trace per model).
+    """
+    summaries = summaries[summaries[score].notna()]
+    if view == "scatter" and x_key is not None:
+        traces = []
+        for i, (model, runs) in enumerate(summaries.groupby('@model', sort=True, observed=True)):
+            x = runs[x_key]
+            traces.append(go.Scattergl(
+                x=encode_array(x.to_numpy()) if _is_numeric(x) else x.astype(str).tolist(),
+                y=encode_array(runs[score].to_numpy(dtype=float)),
+                mode='markers',
+                name=model,
+                marker=dict(color=DEFAULT_PLOTLY_COLORS[i % len(DEFAULT_PLOTLY_COLORS)], size=7, opacity=0.7),
+                text=runs['@metrics_file'].tolist(),
+                hovertemplate=f"%{{text}}<br>{x_key}=%{{x}}<br>{score}=%{{y}}<extra>{model}</extra>",
+            ))
+        fig = go.Figure(data=traces)
+        fig.update_layout(xaxis_title=x_key, yaxis_title=score, legend_title_text='model')
+    else:
+        dimensions = [_sweep_dimension(summaries[key], key) for key in keys]
+        dimensions.append(_sweep_dimension(summaries[score], score))
+        fig = go.Figure(go.Parcoords(
+            dimensions=dimensions,
+            line=dict(color=encode_array(summaries[score].to_numpy(dtype=float)), colorscale='Viridis',
+                      showscale=True),
+        ))
+    fig.update_layout(
+        title=f"{score} across {len(summaries)} runs",
+        height=500,
+        margin=dict(l=60, r=40, t=60, b=40),
+        uirevision=score,
+    )
+    return fig
@@ -0,0 +1,167 @@
+import contextvars
+import cProfile
+import functools
+import os
+import random
+import threading
+import time
+
+from dash.exceptions import PreventUpdate
+from flask import Response, g, has_request_context, request
+
+from app.config import PROFILE_DIR, PROFILE_BY_HEADER, PROFILE_SAMPLE_RATE
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 3e5, 1e6, 3e6, 1e7, 3e7, 1e8)
+IO_COUNTERS = ('files_read', 'bytes_parsed', 'rows_loaded', 'memory_bytes')
+
+# Set with a truthy value to profile one specific request regardless of the sampling rate
+# (only honored when DRL_PROFILE_HEADER=1)
+PROFILE_HEADER = "X-Profile-Callback"
+
+_current_io = contextvars.ContextVar("callback_io", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.count += 1
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(list(self.buckets) + ['+Inf'], self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {self.total}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class CallbackMetrics:
+    """Process-wide per-callback latency, I/O and response size statistics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.durations = {}
+        self.response_sizes = {}
+        self.counters = {}
+
+    def record_call(self, name, duration, io, error):
+        with self._lock:
+            self.durations.setdefault(name, Histogram(DURATION_BUCKETS)).observe(duration)
+            counters = self.counters.setdefault(name, dict.fromkeys(IO_COUNTERS + ('errors',), 0))
+            for key, value in io.items():
+                counters[key] += value
+            counters['errors'] += int(error)
+
+    def record_response(self, name, size):
+        with self._lock:
+            self.response_sizes.setdefault(name, Histogram(SIZE_BUCKETS)).observe(size)
+
+    def render(self, extra_gauges=()):
+        """Prometheus text exposition of every metric."""
+        with self._lock:
+            lines = [
+                "# HELP drl_callback_duration_seconds Time spent in each Dash callback.",
+                "# TYPE drl_callback_duration_seconds histogram",
+            ]
+            for name, histogram in sorted(self.durations.items()):
+                lines.extend(histogram.render("drl_callback_duration_seconds", f'callback="{name}"'))
+            lines += [
+                "# HELP drl_callback_response_bytes Serialized size of each callback response.",
+                "# TYPE drl_callback_response_bytes histogram",
+            ]
+            for name, histogram in sorted(self.response_sizes.items()):
+                lines.extend(histogram.render("drl_callback_response_bytes", f'callback="{name}"'))
+            for counter in IO_COUNTERS + ('errors',):
+                lines.append(f"# TYPE drl_callback_{counter}_total counter")
+                for name, counters in sorted(self.counters.items()):
+                    lines.append(f'drl_callback_{counter}_total{{callback="{name}"}} {counters[counter]}')
+        for name, value in extra_gauges:
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+callback_metrics = CallbackMetrics()
+
+
+def record_io(files_read=0, bytes_parsed=0, rows_loaded=0, memory_bytes=0):
+    """Adds file activity to the statistics of the callback running in this context, if any.
+
+    ``memory_bytes`` is the in-memory size of the loaded rows.
+    """
+    io = _current_io.get()
+    if io is not None:
+        io['files_read'] += files_read
+        io['bytes_parsed'] += bytes_parsed
+        io['rows_loaded'] += rows_loaded
+        io['memory_bytes'] += memory_bytes
+
+
+def _should_profile():
+    if PROFILE_BY_HEADER and has_request_context() and request.headers.get(PROFILE_HEADER):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def instrumented(func):
+    """Records the duration, file activity and response size of a Dash callback."""
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        io = dict.fromkeys(IO_COUNTERS, 0)
+        token = _current_io.set(io)
+        if has_request_context():
+            g.instrumented_callback = name
+        profiler = cProfile.Profile() if _should_profile() else None
+        error = False
+        start = time.perf_counter()
+        try:
+            if profiler is not None:
+                return profiler.runcall(func, *args, **kwargs)
+            return func(*args, **kwargs)
+        except PreventUpdate:
+            raise
+        except Exception:
+            error = True
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            _current_io.reset(token)
+            callback_metrics.record_call(name, duration, io, error)
+            if profiler is not None:
+                os.makedirs(PROFILE_DIR, exist_ok=True)
+                profiler.dump_stats(os.path.join(PROFILE_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-"
+                                                              f"{int(duration * 1000)}ms.prof"))
+
+    return wrapper
+
+
+def install_metrics_endpoint(server, extra_gauges=lambda: ()):
+    """Serves the callback statistics at /metrics and records callback response sizes."""
+
+    @server.after_request
+    def record_response_size(response):
+        name = g.get('instrumented_callback')
+        if name is not None and not response.direct_passthrough:
+            callback_metrics.record_response(name, response.calculate_content_length() or 0)
+        return response
+
+    @server.route("/metrics")
+    def metrics():
+        return Response(callback_metrics.render(extra_gauges()), mimetype="text/plain; version=0.0.4")
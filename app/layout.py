@@ -1,18 +1,21 @@
-from dash import html, dcc
+from dash import html, dcc, dash_table
 import dash_bootstrap_components as dbc
+from app.config import (
+    HYPERPARAMETER_PAGE_SIZE, LIVE_INTERVAL_MS, SMOOTHING_WINDOW, SMOOTHING_WINDOWS, WATCH_UI_INTERVAL_MS
+)
+
+
+def get_window_index(window):
+    """Position of the smoothing slider closest to ``window`` points."""
+    return min(range(len(SMOOTHING_WINDOWS)), key=lambda i: abs(SMOOTHING_WINDOWS[i] - window))
+
 
 layout = dbc.Container([
-    # Header with title and refresh button
+    # Header with title and logs tree status
     dbc.Row([
         dbc.Col([
             html.H1("Model Metrics Visualizer", className="text-center mb-4"),
-            dbc.Button(
-                "Refresh Model List",
-                id="refresh-button",
-                color="primary",
-                className="mb-4 d-block mx-auto",
-                n_clicks=0
-            ),
+            html.P(id="watch-status", className="text-muted text-center small mb-4"),
         ], width=12)
     ]),
 
@@ -20,6 +23,14 @@ layout = dbc.Container([
     dcc.Loading(
         id="loading",
         type="circle",
+        # Only spin for full reloads, not for live updates or zoom re-renders of the graphs
+        target_components={
+            "model-folder-selector": "options",
+            "metrics-file-selector": "options",
+            "hyperparameters-container": "children",
+            "sweep-graph": "figure",
+            "plots-container": "children",
+        },
         children=[
             # Selectors Section
             dbc.Row([
@@ -62,179 +73,25 @@ layout = dbc.Container([
                     dbc.Card([
                         dbc.CardHeader("Hyperparameter Filters"),
                         dbc.CardBody([
+                            # One control per hyperparameter key found in the selected model folders
+                            html.Div(
+                                html.P("Select model folders to filter their runs by hyperparameters.",
+                                       className="text-muted mb-0"),
+                                id="hyperparameter-filters"
+                            ),
                             dbc.Row([
-                                # Alpha Input Fields
-                                dbc.Col([
-                                    html.Label("Alpha", className="fw-bold"),
-                                    dbc.InputGroup([
-                                        dbc.InputGroupText("Min"),
-                                        dbc.Input(
-                                            id="alpha-min",
-                                            placeholder="0.0",
-                                            type="number",
-                                            min=0.0,
-                                            max=1.0,
-                                            step=0.01,
-                                            value=0.0,
-                                            size="sm",
-                                        ),
-                                        dbc.InputGroupText("Max"),
-                                        dbc.Input(
-                                            id="alpha-max",
-                                            placeholder="1.0",
-                                            type="number",
-                                            min=0.0,
-                                            max=1.0,
-                                            step=0.01,
-                                            value=1.0,
-                                            size="sm",
-                                        ),
-                                    ], className="mb-2", size="sm"),
-                                ], md=2, xs=6, className="mb-3"),
-
-                                # Batch Size Input Fields
-                                dbc.Col([
-                                    html.Label("Batch Size", className="fw-bold"),
-                                    dbc.InputGroup([
-                                        dbc.InputGroupText("Min"),
-                                        dbc.Input(
-                                            id="batch_size-min",
-                                            placeholder="1",
-                                            type="number",
-                                            min=1,
-                                            max=1024,
-                                            step=1,
-                                            value=1,
-                                            size="sm",
-                                        ),
-                                        dbc.InputGroupText("Max"),
-                                        dbc.Input(
-                                            id="batch_size-max",
-                                            placeholder="1024",
-                                            type="number",
-                                            min=1,
-                                            max=1024,
-                                            step=1,
-                                            value=1024,
-                                            size="sm",
-                                        ),
-                                    ], className="mb-2", size="sm"),
-                                ], md=2, xs=6, className="mb-3"),
-
-                                # Gamma Input Fields
-                                dbc.Col([
-                                    html.Label("Gamma", className="fw-bold"),
-                                    dbc.InputGroup([
-                                        dbc.InputGroupText("Min"),
-                                        dbc.Input(
-                                            id="gamma-min",
-                                            placeholder="0.0",
-                                            type="number",
-                                            min=0.0,
-                                            max=1.0,
-                                            step=0.01,
-                                            value=0.0,
-                                            size="sm",
-                                        ),
-                                        dbc.InputGroupText("Max"),
-                                        dbc.Input(
-                                            id="gamma-max",
-                                            placeholder="1.0",
-                                            type="number",
-                                            min=0.0,
-                                            max=1.0,
-                                            step=0.01,
-                                            value=1.0,
-                                            size="sm",
-                                        ),
-                                    ], className="mb-2", size="sm"),
-                                ], md=2, xs=6, className="mb-3"),
-
-                                # Num Episodes Input Fields
-                                dbc.Col([
-                                    html.Label("Num Episodes", className="fw-bold"),
-                                    dbc.InputGroup([
-                                        dbc.InputGroupText("Min"),
-                                        dbc.Input(
-                                            id="num_episodes-min",
-                                            placeholder="1",
-                                            type="number",
-                                            min=1,
-                                            max=1000000,
-                                            step=1,
-                                            value=1,
-                                            size="sm",
-                                        ),
-                                        dbc.InputGroupText("Max"),
-                                        dbc.Input(
-                                            id="num_episodes-max",
-                                            placeholder="1000000",
-                                            type="number",
-                                            min=1,
-                                            max=1000000,
-                                            step=1,
-                                            value=1000000,
-                                            size="sm",
-                                        ),
-                                    ], className="mb-2", size="sm"),
-                                ], md=2, xs=6, className="mb-3"),
-
-                                # Replay Capacity Input Fields
-                                dbc.Col([
-                                    html.Label("Replay Capacity", className="fw-bold"),
-                                    dbc.InputGroup([
-                                        dbc.InputGroupText("Min"),
-                                        dbc.Input(
-                                            id="replay_capacity-min-test",
-                                            placeholder="1",
-                                            type="number",
-                                            value=1,
-                                            size="sm",
-                                            debounce=True,  # Add debouncing
-                                            persistence=True,  # Add persistence
-                                            persistence_type="local",
-                                        ),
-                                        dbc.InputGroupText("Max"),
-                                        dbc.Input(
-                                            id="replay_capacity-max",
-                                            placeholder="1000",
-                                            type="number",
-                                            value=1000,
-                                            size="sm",
-                                            debounce=True,  # Add debouncing
-                                            persistence=True,  # Add persistence
-                                            persistence_type="local",
-                                        ),
-                                    ], className="mb-2", size="sm"),
-                                ], md=2, xs=6, className="mb-3"),
-
-                                # Start Epsilon Input Fields
                                 dbc.Col([
-                                    html.Label("Start Epsilon", className="fw-bold"),
-                                    dbc.InputGroup([
-                                        dbc.InputGroupText("Min"),
-                                        dbc.Input(
-                                            id="start_epsilon-min",
-                                            placeholder="0.0",
-                                            type="number",
-                                            min=0.0,
-                                            max=1.0,
-                                            value=0.0,
-                                            size="sm",
-                                        ),
-                                        dbc.InputGroupText("Max"),
-                                        dbc.Input(
-                                            id="start_epsilon-max",
-                                            placeholder="1.0",
-                                            type="number",
-                                            min=0.0,
-                                            max=1.0,
-                                            step=0.01,
-                                            value=1.0,
-                                            size="sm",
-                                        ),
-                                    ], className="mb-2", size="sm"),
-                                ], md=2, xs=6, className="mb-3"),
+                                    html.Label("Runs without a filtered hyperparameter", className="fw-bold"),
+                                    dbc.RadioItems(
+                                        id="hp-missing-policy",
+                                        options=[
+                                            {"label": "Exclude", "value": "exclude"},
+                                            {"label": "Include", "value": "include"},
+                                        ],
+                                        value="exclude",
+                                        inline=True,
+                                    ),
+                                ], className="mt-3"),
                             ]),
                             dbc.Button(
                                 "Apply Filters",
@@ -247,23 +104,161 @@ layout = dbc.Container([
                 ], width=12)
             ], className="mb-4"),
 
+            # Sweep Overview Section: summary scores of every run of the selected model folders
+            dbc.Row([
+                dbc.Col([
+                    dbc.Card([
+                        dbc.CardHeader(
+                            dbc.Button("Sweep Overview", id="sweep-toggle", color="link", className="p-0")
+                        ),
+                        dbc.Collapse(
+                            dbc.CardBody([
+                                dbc.Row([
+                                    dbc.Col(dcc.Dropdown(id="sweep-metric", placeholder="Metric"), md=3),
+                                    dbc.Col(
+                                        dcc.Dropdown(
+                                            id="sweep-stat",
+                                            options=[
+                                                {"label": "Best value", "value": "best"},
+                                                {"label": "Final value", "value": "final"},
+                                                {"label": "Mean of last values", "value": "last_mean"},
+                                                {"label": "Area under curve", "value": "auc"},
+                                                {"label": "Epoch of best value", "value": "best_epoch"},
+                                            ],
+                                            value="best",
+                                            clearable=False,
+                                        ),
+                                        md=3
+                                    ),
+                                    dbc.Col(
+                                        dbc.RadioItems(
+                                            id="sweep-view",
+                                            options=[
+                                                {"label": "Parallel coordinates", "value": "parcoords"},
+                                                {"label": "Scatter", "value": "scatter"},
+                                            ],
+                                            value="parcoords",
+                                            inline=True,
+                                        ),
+                                        md=3
+                                    ),
+                                    dbc.Col(dcc.Dropdown(id="sweep-x", placeholder="Hyperparameter (scatter)"), md=3),
+                                ], className="mb-3", align="center"),
+                                dcc.Graph(id="sweep-graph", figure={"layout": {"height": 500}}),
+                            ]),
+                            id="sweep-collapse",
+                            is_open=False,
+                        ),
+                    ])
+                ], width=12)
+            ], className="mb-4"),
+
             # Results Section
             dbc.Row([
                 # Hyperparameters Section
                 dbc.Col([
                     dbc.Card([
                         dbc.CardHeader("Model Hyperparameters"),
-                        dbc.CardBody(
-                            html.Div(id="hyperparameters-container")
-                        )
+                        dbc.CardBody([
+                            html.Div(id="hyperparameters-container"),
+                            # One row per plotted run; hyperparameters that differ across runs are highlighted
+                            dash_table.DataTable(
+                                id="hyperparameters-table",
+                                columns=[],
+                                data=[],
+                                page_action="custom",
+                                page_current=0,
+                                page_size=HYPERPARAMETER_PAGE_SIZE,
+                                sort_action="custom",
+                                sort_mode="multi",
+                                sort_by=[],
+                                filter_action="custom",
+                                filter_query="",
+                                style_table={"overflowX": "auto", "minWidth": "100%"},
+                                style_cell={"textAlign": "left", "minWidth": "80px", "maxWidth": "240px",
+                                            "overflow": "hidden", "textOverflow": "ellipsis"},
+                                style_header={"fontWeight": "bold"},
+                                fixed_columns={"headers": True, "data": 2},
+                            ),
+                        ])
                     ], className="mb-4")
                 ], width=12),
 
                 # Plots Section
                 dbc.Col([
                     dbc.Card([
-                        dbc.CardHeader("Performance Metrics"),
+                        dbc.CardHeader(
+                            dbc.Row([
+                                dbc.Col("Performance Metrics"),
+                                dbc.Col(
+                                    # Plot each run, or one line and band per group of seeds
+                                    dbc.RadioItems(
+                                        id="aggregate-mode",
+                                        options=[
+                                            {"label": "Runs", "value": "runs"},
+                                            {"label": "Seeds: mean ± std", "value": "std"},
+                                            {"label": "Seeds: median & quantiles", "value": "quantile"},
+                                        ],
+                                        value="runs",
+                                        inline=True,
+                                        persistence=True,
+                                        persistence_type="session",
+                                    ),
+                                    width="auto"
+                                ),
+                                dbc.Col(
+                                    dbc.Switch(
+                                        id="live-mode-switch",
+                                        label="Live tail",
+                                        value=False,
+                                        className="mb-0"
+                                    ),
+                                    width="auto"
+                                ),
+                            ], align="center")
+                        ),
                         dbc.CardBody([
+                            # Only the picked metrics are plotted, each graph rendering on its own
+                            dcc.Dropdown(
+                                id="metric-selector",
+                                options=[],
+                                multi=True,
+                                placeholder="Select metrics to plot",
+                                persistence=True,
+                                persistence_type="session",
+                                className="mb-3"
+                            ),
+                            # Smoothing of each run, computed by the server before decimation
+                            dbc.Row([
+                                dbc.Col(
+                                    dbc.RadioItems(
+                                        id="smoothing-method",
+                                        options=[
+                                            {"label": "Raw", "value": "none"},
+                                            {"label": "EMA", "value": "ema"},
+                                            {"label": "Rolling mean", "value": "mean"},
+                                            {"label": "Rolling median", "value": "median"},
+                                        ],
+                                        value="none",
+                                        inline=True,
+                                        persistence=True,
+                                        persistence_type="session",
+                                    ),
+                                    width="auto"
+                                ),
+                                dbc.Col(
+                                    dcc.Slider(
+                                        id="smoothing-window",
+                                        min=0,
+                                        max=len(SMOOTHING_WINDOWS) - 1,
+                                        step=None,
+                                        marks={i: str(window) for i, window in enumerate(SMOOTHING_WINDOWS)},
+                                        value=get_window_index(SMOOTHING_WINDOW),
+                                        persistence=True,
+                                        persistence_type="session",
+                                    )
+                                ),
+                            ], align="center", className="mb-3"),
                             html.Div(
                                 id="plots-container",
                                 className="plot-grid"
@@ -275,6 +270,16 @@ layout = dbc.Container([
         ]
     ),
 
+    # Asks the server whether the logs tree changed (new models or runs)
+    dcc.Interval(id="watch-interval", interval=WATCH_UI_INTERVAL_MS),
+    dcc.Store(id="watch-version"),
+
+    # Live tail mode: polls the plotted metrics files for appended rows
+    dcc.Interval(id="live-interval", interval=LIVE_INTERVAL_MS, disabled=True),
+    # Runs currently plotted, and how far each metrics file has been read
+    dcc.Store(id="plot-state"),
+    dcc.Store(id="tail-offsets"),
+
     # Footer with additional information
     dbc.Row([
         dbc.Col([
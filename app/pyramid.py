@@ -0,0 +1,391 @@
+"""Multi-resolution pre-aggregated views of long metrics files.
+
+A pyramid stores, for buckets of 16, 256 and 4096 consecutive rows of a metrics CSV, the
+first and last epoch of the bucket and, per numeric metric, the count and sum of the
+non-missing values (their mean is sum / count), the minimum and maximum with the epochs
+they were reached at, and the last value. Each level is an append-only file of float64
+records in ``<model>/metrics/.columnar/<run>.pyramid/``, so only the level that gets
+plotted is read, and rows appended to the CSV are folded into the existing buckets
+without re-reading the rest of the file.
+
+Pyramids are updated under a file lock shared by every server process. Level files are
+only ever appended to or replaced as a whole, never rewritten in place, since other
+processes may have them memory-mapped.
+"""
+import contextlib
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from app.config import POINTS_PER_TRACE
+from app.figures import META_COLUMNS
+from app.sidecar import SIDECAR_DIRNAME, read_metrics
+from app.tail import read_appended_rows
+
+FACTORS = (16, 256, 4096)
+STATS = ('count', 'sum', 'min', 'max', 'min_epoch', 'max_epoch', 'last')
+PYRAMID_EXTENSION = ".pyramid"
+
+_FORMAT_VERSION = 2
+_META_FILENAME = "meta.json"
+_LOCK_FILENAME = "lock"
+# Bytes hashed at each end of the folded part of the CSV, to tell a rewritten file from a grown one
+_DIGEST_BYTES = 4096
+# Record layout: epoch_first, epoch_last, then one block of len(metrics) columns per stat
+_EPOCH_FIRST, _EPOCH_LAST = 0, 1
+
+_path_locks = {}
+_path_locks_guard = threading.Lock()
+
+
+def pyramid_dir(csv_path):
+    metrics_dir, filename = os.path.split(csv_path)
+    base_name = os.path.splitext(filename)[0]
+    return os.path.join(metrics_dir, SIDECAR_DIRNAME, f"{base_name}{PYRAMID_EXTENSION}")
+
+
+def _stat_columns(stat, n_metrics):
+    start = 2 + STATS.index(stat) * n_metrics
+    return slice(start, start + n_metrics)
+
+
+def _raw_records(epoch, values):
+    """One single-row bucket per row, so that raw rows fold exactly like coarser buckets."""
+    n, n_metrics = values.shape
+    present = ~np.isnan(values)
+    records = np.empty((n, 2 + len(STATS) * n_metrics))
+    records[:, _EPOCH_FIRST] = epoch
+    records[:, _EPOCH_LAST] = epoch
+    records[:, _stat_columns('count', n_metrics)] = present
+    records[:, _stat_columns('sum', n_metrics)] = np.where(present, values, 0.0)
+    for stat in ('min', 'max', 'last'):
+        records[:, _stat_columns(stat, n_metrics)] = values
+    for stat in ('min_epoch', 'max_epoch'):
+        records[:, _stat_columns(stat, n_metrics)] = np.where(present, epoch[:, None], np.nan)
+    return records
+
+
+def _fold(records, ratio, n_metrics):
+    """Merges every ``ratio`` consecutive records into one; a trailing incomplete group is left out."""
+    n = len(records) // ratio
+    width = records.shape[1]
+    groups = np.asarray(records[:n * ratio]).reshape(n, ratio, width)
+
+    def column(stat):
+        return groups[:, :, _stat_columns(stat, n_metrics)]
+
+    def pick(values, indices):
+        return np.take_along_axis(values, indices[:, None, :], axis=1)[:, 0, :]
+
+    folded = np.empty((n, width))
+    folded[:, _EPOCH_FIRST] = groups[:, 0, _EPOCH_FIRST]
+    folded[:, _EPOCH_LAST] = groups[:, -1, _EPOCH_LAST]
+    count = column('count').sum(axis=1)
+    empty = count == 0
+    folded[:, _stat_columns('count', n_metrics)] = count
+    folded[:, _stat_columns('sum', n_metrics)] = column('sum').sum(axis=1)
+
+    lowest = np.nan_to_num(column('min'), nan=np.inf).argmin(axis=1)
+    highest = np.nan_to_num(column('max'), nan=-np.inf).argmax(axis=1)
+    present = column('count') > 0
+    latest = ratio - 1 - present[:, ::-1, :].argmax(axis=1)
+    for stat, indices in (('min', lowest), ('min_epoch', lowest), ('max', highest), ('max_epoch', highest),
+                          ('last', latest)):
+        folded[:, _stat_columns(stat, n_metrics)] = np.where(empty, np.nan, pick(column(stat), indices))
+    return folded
+
+
+class Pyramid:
+    """Bucketed summaries of the numeric metrics of one metrics CSV, at every level of ``FACTORS``.
+
+    ``offset`` is the number of bytes of the CSV already folded in and ``digest`` a hash of
+    their first and last bytes. Records are persisted in ``directory``; when it is None
+    (read-only logs tree) the pyramid only lives in memory.
+    """
+
+    def __init__(self, csv_path, metrics, directory=None, usable=True):
+        self.csv_path = csv_path
+        self.metrics = list(metrics)
+        self.directory = directory
+        self.usable = usable
+        self.offset = 0
+        self.mtime_ns = None
+        self.digest = None
+        self.width = 2 + len(STATS) * len(self.metrics)
+        self.levels = [np.empty((0, self.width)) for _ in FACTORS]
+        # Rows not part of a complete bucket of the finest level yet
+        self.pending = np.empty((0, self.width))
+
+    @property
+    def columns(self):
+        return ['epoch'] + self.metrics
+
+    @property
+    def row_count(self):
+        return len(self.levels[0]) * FACTORS[0] + len(self.pending)
+
+    @property
+    def last_epoch(self):
+        for records in (self.pending, self.levels[0]):
+            if len(records):
+                return float(records[-1, _EPOCH_LAST])
+        return None
+
+    def __sizeof__(self):
+        arrays = [self.pending] + [records for records in self.levels if not isinstance(records, np.memmap)]
+        return object.__sizeof__(self) + sum(records.nbytes for records in arrays)
+
+    def _level_path(self, factor):
+        return os.path.join(self.directory, f"L{factor}.f8")
+
+    def _append_records(self, level, records):
+        current = self.levels[level]
+        if self.directory is None:
+            self.levels[level] = np.concatenate([current, records])
+            return
+        path = self._level_path(FACTORS[level])
+        with open(path, "ab") as f:
+            # Drop records written by an update that never got to save its metadata
+            f.truncate(len(current) * self.width * 8)
+            f.write(np.ascontiguousarray(records, dtype='<f8').tobytes())
+        self.levels[level] = _map_level(path, len(current) + len(records), self.width)
+
+    def write_levels(self, directory):
+        """Persists every level to new files in ``directory``, replacing the previous ones."""
+        # Without metadata, a pyramid interrupted before save() is rebuilt rather than misread
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.join(directory, _META_FILENAME))
+        self.directory = directory
+        for level, factor in enumerate(FACTORS):
+            path = self._level_path(factor)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(np.ascontiguousarray(self.levels[level], dtype='<f8').tobytes())
+            os.replace(tmp_path, path)
+            self.levels[level] = _map_level(path, len(self.levels[level]), self.width)
+        self.save()
+
+    def append(self, epoch, values):
+        """Folds rows (sorted by epoch, values as a rows x metrics array) into every level."""
+        raw = np.concatenate([self.pending, _raw_records(epoch, values)])
+        n_metrics = len(self.metrics)
+        for level, factor in enumerate(FACTORS):
+            if level == 0:
+                ratio, source = factor, raw
+            else:
+                ratio = factor // FACTORS[level - 1]
+                source = self.levels[level - 1][len(self.levels[level]) * ratio:]
+            folded = _fold(source, ratio, n_metrics)
+            if level == 0:
+                self.pending = raw[len(folded) * ratio:]
+            if len(folded):
+                self._append_records(level, folded)
+
+    def extend(self, rows):
+        """Folds rows parsed from the end of the CSV; returns False when they do not fit this pyramid."""
+        if not self.usable or 'epoch' not in rows.columns or not set(self.metrics) <= set(rows.columns):
+            return False
+        last_epoch = self.last_epoch
+        if last_epoch is not None:
+            rows = rows[rows['epoch'] > last_epoch]
+        try:
+            epoch = rows['epoch'].to_numpy(dtype=float)
+            values = rows[self.metrics].to_numpy(dtype=float)
+        except (TypeError, ValueError):
+            return False
+        if np.isnan(epoch).any() or (np.diff(epoch) < 0).any():
+            return False
+        self.append(epoch, values)
+        return True
+
+    def save(self):
+        if self.directory is None:
+            return
+        meta = {
+            'version': _FORMAT_VERSION,
+            'metrics': self.metrics,
+            'usable': self.usable,
+            'offset': self.offset,
+            'mtime_ns': self.mtime_ns,
+            'digest': self.digest,
+            'counts': [len(records) for records in self.levels],
+            'pending': self.pending.tolist(),
+        }
+        path = os.path.join(self.directory, _META_FILENAME)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def open(cls, csv_path):
+        """Loads the persisted pyramid of ``csv_path``; None when there is none or it is unreadable."""
+        directory = pyramid_dir(csv_path)
+        try:
+            with open(os.path.join(directory, _META_FILENAME)) as f:
+                meta = json.load(f)
+            if meta.get('version') != _FORMAT_VERSION:
+                return None
+            pyramid = cls(csv_path, meta['metrics'], directory, meta['usable'])
+            pyramid.offset = meta['offset']
+            pyramid.mtime_ns = meta['mtime_ns']
+            pyramid.digest = meta['digest']
+            pyramid.levels = [
+                _map_level(pyramid._level_path(factor), count, pyramid.width)
+                for factor, count in zip(FACTORS, meta['counts'])
+            ]
+            pyramid.pending = np.array(meta['pending'], dtype=float).reshape(-1, pyramid.width)
+            return pyramid
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _tail_records(self, level):
+        """Records of ``level`` followed by the finer records and raw rows it does not cover yet."""
+        pieces = [self.levels[level]]
+        covered = len(self.levels[level]) * FACTORS[level]
+        for finer in range(level - 1, -1, -1):
+            pieces.append(self.levels[finer][covered // FACTORS[finer]:])
+            covered = len(self.levels[finer]) * FACTORS[finer]
+        pieces.append(self.pending)
+        return np.concatenate(pieces)
+
+    def frame(self, x_range=None, max_points=POINTS_PER_TRACE):
+        """Min/max envelope of every metric at the coarsest level that still fills ``max_points``.
+
+        Each bucket contributes two rows at its first and last epoch holding its minimum and
+        maximum, in the order they were reached. Returns None when no level has enough buckets
+        in ``x_range`` (the raw rows are small enough, or needed, to plot at full fidelity).
+        """
+        if not self.usable:
+            return None
+        for level in range(len(FACTORS) - 1, -1, -1):
+            records = self.levels[level]
+            if x_range is not None:
+                start = np.searchsorted(records[:, _EPOCH_LAST], x_range[0], side='left')
+                end = np.searchsorted(records[:, _EPOCH_FIRST], x_range[1], side='right')
+                visible = end - start
+            else:
+                visible = len(records)
+            if 2 * visible >= max_points:
+                break
+        else:
+            return None
+
+        records = self._tail_records(level)
+        if x_range is not None:
+            # Keep one bucket on each side so that lines reach the plot edges
+            start = max(int(np.searchsorted(records[:, _EPOCH_LAST], x_range[0], side='left')) - 1, 0)
+            end = min(int(np.searchsorted(records[:, _EPOCH_FIRST], x_range[1], side='right')) + 1, len(records))
+            records = records[start:end]
+
+        n_metrics = len(self.metrics)
+        lows = records[:, _stat_columns('min', n_metrics)]
+        highs = records[:, _stat_columns('max', n_metrics)]
+        low_first = records[:, _stat_columns('min_epoch', n_metrics)] <= records[:, _stat_columns('max_epoch', n_metrics)]
+        first = np.where(low_first, lows, highs)
+        second = np.where(low_first, highs, lows)
+        envelope = pd.DataFrame(np.stack([first, second], axis=1).reshape(-1, n_metrics), columns=self.metrics)
+        envelope.insert(0, 'epoch', records[:, [_EPOCH_FIRST, _EPOCH_LAST]].reshape(-1))
+        return envelope
+
+
+def _map_level(path, count, width):
+    if count == 0:
+        return np.empty((0, width))
+    return np.memmap(path, dtype='<f8', mode='r', shape=(count, width))
+
+
+def _path_lock(csv_path):
+    with _path_locks_guard:
+        return _path_locks.setdefault(csv_path, threading.Lock())
+
+
+@contextlib.contextmanager
+def _locked(csv_path):
+    """Serializes updates of the pyramid of ``csv_path`` across threads and server processes."""
+    with _path_lock(csv_path):
+        directory = pyramid_dir(csv_path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            lock_file = open(os.path.join(directory, _LOCK_FILENAME), "a")
+        except OSError:
+            # Read-only logs tree: pyramids only live in each process's memory
+            yield
+            return
+        with lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+
+def _content_digest(csv_path, offset):
+    """Hash of the first and last ``_DIGEST_BYTES`` of the first ``offset`` bytes of a file."""
+    with open(csv_path, "rb") as f:
+        head = f.read(min(offset, _DIGEST_BYTES))
+        start = max(offset - _DIGEST_BYTES, 0)
+        f.seek(start)
+        tail = f.read(offset - start)
+    return hashlib.sha1(head + tail).hexdigest()
+
+
+def build_pyramid(csv_path):
+    """Builds the pyramid of ``csv_path`` from scratch, persisting it when its directory is writable."""
+    stat = os.stat(csv_path)
+    metrics_df = read_metrics(csv_path)
+    metrics = [
+        col for col in metrics_df.columns
+        if col not in META_COLUMNS and pd.api.types.is_numeric_dtype(metrics_df[col])
+    ]
+    epoch = metrics_df['epoch'].to_numpy(dtype=float) if 'epoch' in metrics_df.columns else None
+    # Buckets follow file order, which only matches epoch order for sorted, complete epochs
+    usable = epoch is not None and bool(metrics) and not np.isnan(epoch).any() and not (np.diff(epoch) < 0).any()
+
+    pyramid = Pyramid(csv_path, metrics, None, usable)
+    pyramid.offset = stat.st_size
+    pyramid.mtime_ns = stat.st_mtime_ns
+    pyramid.digest = _content_digest(csv_path, stat.st_size)
+    if usable:
+        pyramid.append(epoch, metrics_df[metrics].to_numpy(dtype=float))
+    directory = pyramid_dir(csv_path)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        pyramid.write_levels(directory)
+    except OSError as e:
+        logging.warning(f"Keeping the pyramid of {csv_path} in memory only: {e}")
+        pyramid.directory = None
+    return pyramid
+
+
+def load_pyramid(csv_path):
+    """Returns the pyramid of ``csv_path`` up to date with the file.
+
+    The persisted pyramid is reused as long as the CSV only grew: the appended rows are
+    parsed on their own and folded in. It is rebuilt when missing, when the CSV shrank, or
+    when the bytes it was built from changed (a file rewritten with the same or a larger size).
+    """
+    with _locked(csv_path):
+        stat = os.stat(csv_path)
+        pyramid = Pyramid.open(csv_path)
+        if pyramid is None or stat.st_size < pyramid.offset:
+            return build_pyramid(csv_path)
+        if (pyramid.offset, pyramid.mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+            return pyramid
+        if _content_digest(csv_path, pyramid.offset) != pyramid.digest:
+            return build_pyramid(csv_path)
+        if stat.st_size > pyramid.offset:
+            rows, offset = read_appended_rows(csv_path, pyramid.offset)
+            if rows is not None and not pyramid.extend(rows):
+                return build_pyramid(csv_path)
+            pyramid.offset = offset
+            pyramid.digest = _content_digest(csv_path, offset)
+        pyramid.mtime_ns = stat.st_mtime_ns
+        try:
+            pyramid.save()
+        except OSError as e:
+            logging.warning(f"Could not persist the pyramid of {csv_path}: {e}")
+        return pyramid
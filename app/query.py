@@ -0,0 +1,237 @@
+import operator
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+from app.catalog import get_catalog_generation, get_catalog_runs
+
+MISSING_POLICIES = ("exclude", "include", "only")
+
+# Distinct values listed for a non-numeric hyperparameter in the filter UI
+MAX_CATEGORIES = 50
+
+# Columns of the hyperparameter table identifying each run; "@" keeps them apart from hyperparameter keys
+RUN_COLUMNS = {'@model': 'model', '@metrics_file': 'metrics_file'}
+
+_COMPARISONS = {'eq': operator.eq, 'ne': operator.ne, 'lt': operator.lt, 'le': operator.le,
+                'gt': operator.gt, 'ge': operator.ge}
+_OPERATOR_ALIASES = {'=': 'eq', '!=': 'ne', '<': 'lt', '<=': 'le', '>': 'gt', '>=': 'ge'}
+_FILTER_CLAUSE = re.compile(r"\s*\{(?P<column>[^}]+)\}\s+(?P<operator>is\s+\w+|\S+)\s*(?P<value>.*?)\s*$")
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+class RunTable:
+    """Columnar view of the hyperparameters of every catalogued run of some model folders.
+
+    Rows follow the catalog order (model, metrics file); there is one column per flattened
+    hyperparameter key found in any run, with missing values as NA.
+    """
+
+    def __init__(self, runs):
+        self.runs = pd.DataFrame(
+            [(run['model'], run['metrics_file']) for run in runs],
+            columns=['model', 'metrics_file']
+        )
+        # Runs whose hyperparameters file is missing or unreadable never match a filter
+        self.readable = np.array([run['hyperparams'] is not None for run in runs], dtype=bool)
+        values = pd.DataFrame.from_records([run['hyperparams'] or {} for run in runs], index=self.runs.index)
+        self.values = values.apply(normalize_column)
+        self._index = {key: i for i, key in enumerate(zip(self.runs['model'], self.runs['metrics_file']))}
+        self._rows = None
+
+    def __len__(self):
+        return len(self.runs)
+
+    def describe(self):
+        """One entry per key: numeric keys get their observed min/max, others their distinct values."""
+        summary = []
+        for key in sorted(self.values.columns):
+            column = self.values[key]
+            present = column.dropna()
+            entry = {'key': key, 'count': len(present)}
+            if pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column):
+                entry.update(kind='numeric', min=present.min().item() if len(present) else None,
+                             max=present.max().item() if len(present) else None)
+            else:
+                entry.update(kind='categorical', values=sorted(present.unique().tolist(), key=str)[:MAX_CATEGORIES])
+            summary.append(entry)
+        return summary
+
+    def mask(self, filters):
+        """Boolean mask of the runs matching every filter.
+
+        Each filter is a dict with a ``key``, an ``op`` ('range' with ``min``/``max``,
+        'eq' with ``value`` or 'in' with ``values``) and a ``missing`` policy: 'exclude'
+        (default) drops runs without the key, 'include' keeps them and 'only' keeps just them.
+        """
+        mask = self.readable.copy()
+        for predicate in filters:
+            column = self.values.get(predicate['key'])
+            if column is None:
+                column = pd.Series(pd.NA, index=self.values.index, dtype=object)
+            present = column.notna().to_numpy()
+
+            op = predicate.get('op', 'range')
+            if op == 'range':
+                match = np.ones(len(column), dtype=bool)
+                numeric = pd.to_numeric(column, errors='coerce')
+                if predicate.get('min') is not None:
+                    match = match & (numeric >= predicate['min']).fillna(False).to_numpy(dtype=bool)
+                if predicate.get('max') is not None:
+                    match = match & (numeric <= predicate['max']).fillna(False).to_numpy(dtype=bool)
+            elif op == 'eq':
+                match = (column == predicate['value']).fillna(False).to_numpy(dtype=bool)
+            elif op == 'in':
+                match = column.isin(predicate['values']).to_numpy(dtype=bool)
+            else:
+                raise ValueError(f"Unknown filter operation {op!r}")
+
+            missing = predicate.get('missing', 'exclude')
+            if missing == 'include':
+                match = match | ~present
+            elif missing == 'only':
+                match = ~present
+            else:
+                match = match & present
+            mask = mask & match
+        return mask
+
+    def select(self, filters):
+        """The (model, metrics file) rows matching ``filters``."""
+        return self.runs[self.mask(filters)]
+
+    def rows(self, run_keys):
+        """Hyperparameters of the (model, metrics file) runs in ``run_keys``, in that order.
+
+        Returns (frame, differing): the frame has the ``RUN_COLUMNS`` then one column per
+        key some of these runs have, with the keys whose value is not the same for every run
+        (``differing``) first. The last selection is kept, as pages of it are asked in a row.
+        """
+        run_keys = tuple(tuple(key) for key in run_keys)
+        cached = self._rows
+        if cached is not None and cached[0] == run_keys:
+            return cached[1], cached[2]
+        positions = [self._index[key] for key in run_keys if key in self._index]
+        values = self.values.iloc[positions].dropna(axis=1, how='all')
+        differing = [key for key in values.columns if values[key].nunique(dropna=False) > 1]
+        frame = pd.concat([
+            self.runs.iloc[positions].rename(columns={v: k for k, v in RUN_COLUMNS.items()}),
+            values[differing + [key for key in values.columns if key not in differing]],
+        ], axis=1).reset_index(drop=True)
+        self._rows = (run_keys, frame, differing)
+        return frame, differing
+
+
+def parse_filter_query(filter_query):
+    """(column, operator, value) of each clause of a DataTable ``filter_query``.
+
+    Relational operators are normalized to eq/ne/lt/le/gt/ge; "contains", "datestartswith"
+    and "is blank" are kept. Values stay strings, quotes removed.
+    """
+    clauses = []
+    for part in (filter_query or "").split(" && "):
+        match = _FILTER_CLAUSE.match(part)
+        if match is None:
+            continue
+        op = match['operator'].lower()
+        if op.startswith('is'):
+            op = "is " + op.split()[-1]
+        else:
+            # DataTable prefixes operators with s (string), i (case-insensitive) or c (case-sensitive)
+            if op[:1] in 'sic' and (op[1:] in _COMPARISONS or op[1:] in _OPERATOR_ALIASES
+                                    or op[1:] in ('contains', 'datestartswith')):
+                op = op[1:]
+            op = _OPERATOR_ALIASES.get(op, op)
+        value = match['value']
+        if len(value) > 1 and value[0] == value[-1] and value[0] in "'\"`":
+            value = value[1:-1].replace("\\" + value[0], value[0])
+        clauses.append((match['column'], op, value))
+    return clauses
+
+
+def filter_frame(frame, clauses):
+    """Rows of ``frame`` matching every clause of ``parse_filter_query``; unknown columns match nothing.
+
+    Numbers compare numerically in numeric columns and as text elsewhere; "contains" ignores case.
+    """
+    mask = np.ones(len(frame), dtype=bool)
+    for column, op, value in clauses:
+        if column not in frame.columns:
+            return frame.iloc[:0]
+        values = frame[column]
+        if op in ('is blank', 'is nil'):
+            match = values.isna()
+        elif op in ('contains', 'datestartswith'):
+            text = values.astype(str)
+            if op == 'contains':
+                match = text.str.contains(value, case=False, regex=False)
+            else:
+                match = text.str.startswith(value)
+            match = match & values.notna()
+        elif op in _COMPARISONS:
+            number = pd.to_numeric(pd.Series([value]), errors='coerce')[0]
+            if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values) \
+                    and not pd.isna(number):
+                match = _COMPARISONS[op](values, number)
+            else:
+                match = _COMPARISONS[op](values.astype(str), value) & values.notna()
+            match = match.fillna(False)
+        else:
+            continue
+        mask &= match.to_numpy(dtype=bool)
+    return frame[mask]
+
+
+def sort_frame(frame, sort_by):
+    """``frame`` sorted by a DataTable ``sort_by`` list; missing values last."""
+    sort_by = [entry for entry in sort_by or [] if entry['column_id'] in frame.columns]
+    if not sort_by:
+        return frame
+    return frame.sort_values(
+        [entry['column_id'] for entry in sort_by],
+        ascending=[entry['direction'] == 'asc' for entry in sort_by],
+        na_position='last',
+        kind='stable',
+        # Columns mixing strings with other values are compared as text
+        key=lambda column: column.astype(str).where(column.notna()) if column.dtype == object else column,
+    )
+
+
+def get_page(frame, page_current, page_size):
+    """Records of page ``page_current`` (clamped to the last one) and the page count."""
+    page_count = max(-(-len(frame) // page_size), 1)
+    page_current = min(max(page_current or 0, 0), page_count - 1)
+    page = frame.iloc[page_current * page_size:(page_current + 1) * page_size]
+    records = page.astype(object).where(page.notna(), None).to_dict('records')
+    return records, page_current, page_count
+
+
+def normalize_column(column):
+    """Makes lists and dicts comparable, and numeric-looking columns numeric."""
+    if column.dtype == object:
+        column = column.map(lambda v: repr(v) if isinstance(v, (list, dict)) else v)
+        present = column.dropna()
+        if len(present) and all(
+            isinstance(v, (int, float)) and not isinstance(v, bool) for v in present
+        ):
+            return pd.to_numeric(column)
+    return column
+
+
+def get_run_table(base_directory, models):
+    """Returns the RunTable of ``models``, rebuilt only when their catalog rows changed."""
+    models = tuple(models)
+    generation = get_catalog_generation(base_directory, models)
+    key = (base_directory, models)
+    with _tables_lock:
+        cached = _tables.get(key)
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+    table = RunTable(get_catalog_runs(base_directory, models))
+    with _tables_lock:
+        _tables[key] = (generation, table)
+    return table
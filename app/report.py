@@ -0,0 +1,271 @@
+"""Headless export of comparison reports.
+
+Builds the per-metric figures of the dashboard for a selection of runs, without starting the
+server, and writes them as one self-contained HTML file (plotly.js inlined, plus the
+hyperparameters of the runs) or as one image per metric (needs kaleido)::
+
+    python report.py --models ppo dqn --query "{learning_rate} < 0.001" --aggregate std --output weekly.html
+
+Runs are selected by model folder, metrics file name and a hyperparameter query written like
+the filter row of the hyperparameter table. The work streams through a process pool: each
+task loads a few runs (or groups of seeds), then returns only their decimated traces, which
+are spooled to disk per metric. Each figure is then assembled and written on its own, so
+memory does not grow with the number of runs in the report.
+"""
+import argparse
+import collections
+import html
+import importlib.util
+import json
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import plotly.io as pio
+from plotly.colors import DEFAULT_PLOTLY_COLORS
+from plotly.offline import get_plotlyjs
+
+from app import aggregate, figures, query
+from app.cache import run_cache
+from app.catalog import get_catalog_runs
+from app.config import BASE_DIRECTORY, LOAD_WORKERS, SMOOTHING_WINDOW
+from app.smoothing import SMOOTHING_METHODS, smooth_run
+from app.utils import get_model_folders, get_run_identifier, load_runs
+
+IMAGE_FORMATS = ("png", "svg", "pdf", "jpeg", "webp")
+AGGREGATE_MODES = ("runs", "std", "quantile")
+
+# Runs (or groups of seeds) loaded by one task of the pool
+CHUNK_SIZE = 8
+
+
+def select_runs(base_directory, models=None, metrics_files=None, filter_query=None):
+    """Catalog rows (see ``get_catalog_runs``) of the runs matching the selection, in catalog order.
+
+    ``filter_query`` uses the syntax of the hyperparameter table filters, e.g.
+    ``{optimizer.lr} < 0.001 && {env} contains cart``; runs whose hyperparameters cannot
+    be read never match it.
+    """
+    models = sorted(models or get_model_folders(base_directory))
+    runs = get_catalog_runs(base_directory, models)
+    if metrics_files:
+        metrics_files = set(metrics_files)
+        runs = [run for run in runs if run['metrics_file'] in metrics_files]
+    if filter_query:
+        frame, _ = query.get_run_table(base_directory, models).rows(
+            [(run['model'], run['metrics_file']) for run in runs if run['hyperparams'] is not None]
+        )
+        frame = query.filter_frame(frame, query.parse_filter_query(filter_query))
+        selected = set(zip(frame['@model'], frame['@metrics_file']))
+        runs = [run for run in runs if (run['model'], run['metrics_file']) in selected]
+    return runs
+
+
+def _add_traces(traces, metric, built):
+    traces.setdefault(metric, []).extend(trace.to_plotly_json() for trace in built)
+
+
+def build_run_traces(run_keys, base_directory, metrics=None, smoothing=None):
+    """Decimated trace of each metric of each run, as {metric: [trace dict]} in run order.
+
+    Runs in the workers of ``export_report``: the loaded runs are dropped from the run cache
+    before returning, so a worker only ever holds one chunk of runs.
+    """
+    traces = {}
+    try:
+        for data in load_runs(run_keys, base_directory, overview=not smoothing):
+            identifier = get_run_identifier(data['model'], data['metrics_file'])
+            columns = figures.get_metric_columns([(identifier, data['metrics'])])
+            for metric in [metric for metric in metrics if metric in columns] if metrics else columns:
+                metrics_df = smooth_run(data, metric, *smoothing) if smoothing else data['metrics']
+                # Decimated traces are light: SVG renders them better in saved pages and images
+                _add_traces(traces, metric, [figures.build_metric_trace(identifier, metrics_df, metric, webgl=False)])
+    finally:
+        run_cache.clear()
+    return traces
+
+
+def build_group_traces(groups, base_directory, band, metrics=None, smoothing=None):
+    """Aggregate traces of each metric of groups of seeds, as {metric: [trace dict]} in group order.
+
+    ``groups`` holds (position, label, run keys): the position of a group picks its color.
+    """
+    traces = {}
+    try:
+        for position, label, run_keys in groups:
+            data_list = load_runs(run_keys, base_directory, overview=not smoothing)
+            columns = figures.get_metric_columns([(None, data['metrics']) for data in data_list])
+            color = DEFAULT_PLOTLY_COLORS[position % len(DEFAULT_PLOTLY_COLORS)]
+            for metric in [metric for metric in metrics if metric in columns] if metrics else columns:
+                frames = [smooth_run(data, metric, *smoothing) if smoothing else data['metrics'] for data in data_list]
+                result = aggregate.aggregate_metric(frames, metric)
+                if result is not None:
+                    _add_traces(traces, metric, figures.build_aggregate_traces(label, result, metric, band, color))
+            run_cache.clear()
+    finally:
+        run_cache.clear()
+    return traces
+
+
+def _ordered_results(executor, func, tasks, in_flight):
+    """Results of ``func`` over ``tasks`` in task order, with at most ``in_flight`` tasks pending."""
+    if executor is None:
+        for task in tasks:
+            yield func(*task)
+        return
+    pending = collections.deque()
+    for task in tasks:
+        pending.append(executor.submit(func, *task))
+        if len(pending) >= in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _read_spool(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def _write_image(spool_path, metric, legend_title, path, image_format):
+    figure = figures.build_traces_figure(_read_spool(spool_path), metric, legend_title)
+    pio.write_image(figure, path, format=image_format, validate=False)
+    return path
+
+
+def _file_name(metric):
+    return re.sub(r"[^\w.-]+", "_", metric).strip("_") or "metric"
+
+
+def _runs_table(base_directory, runs):
+    """HTML table of the hyperparameters of ``runs``, the ones that differ first."""
+    models = sorted({run['model'] for run in runs})
+    frame, _ = query.get_run_table(base_directory, models).rows([(run['model'], run['metrics_file']) for run in runs])
+    frame = frame.rename(columns=query.RUN_COLUMNS)
+    return frame.to_html(index=False, na_rep="", border=0, classes="runs")
+
+
+def _write_html(output, title, subtitle, table, spools, legend_title):
+    with open(output, "w", encoding="utf-8") as out:
+        out.write(
+            f"<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n<title>{html.escape(title)}</title>\n"
+            "<style>body{font-family:sans-serif;margin:2em} .runs{border-collapse:collapse;font-size:small}"
+            " .runs td,.runs th{padding:2px 8px;border-bottom:1px solid #ddd;text-align:left}</style>\n"
+            f"<script type=\"text/javascript\">{get_plotlyjs()}</script>\n</head>\n<body>\n"
+            f"<h1>{html.escape(title)}</h1>\n<p>{html.escape(subtitle)}</p>\n"
+        )
+        for metric, spool_path in spools.items():
+            figure = figures.build_traces_figure(_read_spool(spool_path), metric, legend_title)
+            out.write(pio.to_html(figure, include_plotlyjs=False, full_html=False, validate=False))
+            out.write("\n")
+        out.write(f"<h2>Runs</h2>\n{table}\n</body>\n</html>\n")
+
+
+def export_report(base_directory, runs, output, image_format="html", aggregate_mode="runs", metrics=None,
+                  smoothing=None, title="Training report", workers=LOAD_WORKERS, chunk_size=CHUNK_SIZE):
+    """Writes the figures of each metric of ``runs`` (catalog rows) to ``output``.
+
+    ``output`` is an HTML file, or a directory of one ``<metric>.<image_format>`` file per
+    metric. ``smoothing`` is None or (method, window). Returns the number of figures written.
+    """
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    in_flight = 2 * max(workers, 1)
+    run_keys = [(run['model'], run['metrics_file']) for run in runs]
+    if aggregate_mode == "runs":
+        legend_title = "identifier"
+        tasks = [(chunk, base_directory, metrics, smoothing) for chunk in _chunks(run_keys, chunk_size)]
+        func = build_run_traces
+    else:
+        legend_title = "group"
+        groups = [
+            (position, label, [(run['model'], run['metrics_file']) for run in group_runs])
+            for position, (_, label, group_runs) in enumerate(aggregate.group_catalog_runs(runs))
+        ]
+        tasks = [(chunk, base_directory, aggregate_mode, metrics, smoothing) for chunk in _chunks(groups, chunk_size)]
+        func = build_group_traces
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="drl_report_") as spool_dir:
+            # One file of trace lines per metric, in the order metrics are first found
+            spools = {}
+            handles = {}
+            try:
+                for traces in _ordered_results(executor, func, tasks, in_flight):
+                    for metric, metric_traces in traces.items():
+                        if metric not in handles:
+                            spools[metric] = os.path.join(spool_dir, f"{len(spools)}.jsonl")
+                            handles[metric] = open(spools[metric], "w", encoding="utf-8")
+                        for trace in metric_traces:
+                            handles[metric].write(json.dumps(trace) + "\n")
+            finally:
+                for handle in handles.values():
+                    handle.close()
+            if metrics:
+                spools = {metric: spools[metric] for metric in metrics if metric in spools}
+
+            if image_format == "html":
+                subtitle = f"{len(runs)} runs of {', '.join(sorted({run['model'] for run in runs}))}"
+                if smoothing:
+                    subtitle += f", {smoothing[0]} smoothing over {smoothing[1]} points"
+                _write_html(output, title, subtitle, _runs_table(base_directory, runs), spools, legend_title)
+            else:
+                os.makedirs(output, exist_ok=True)
+                tasks = [
+                    (spool_path, metric, legend_title, os.path.join(output, f"{_file_name(metric)}.{image_format}"),
+                     image_format)
+                    for metric, spool_path in spools.items()
+                ]
+                for _ in _ordered_results(executor, _write_image, tasks, in_flight):
+                    pass
+            return len(spools)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the metric plots of selected runs without starting the dashboard.")
+    parser.add_argument("logs_dir", nargs="?", default=BASE_DIRECTORY)
+    parser.add_argument("--models", nargs="+", help="model folders (default: all)")
+    parser.add_argument("--runs", nargs="+", help="metrics file names, without extension (default: all)")
+    parser.add_argument("--query", help='hyperparameter filter, e.g. "{lr} < 0.001 && {env} contains cart"')
+    parser.add_argument("--metrics", nargs="+", help="metrics to plot (default: all)")
+    parser.add_argument("--aggregate", choices=AGGREGATE_MODES, default="runs",
+                        help="plot each run, or groups of seeds as mean ± std or median & quantiles")
+    parser.add_argument("--smoothing", choices=SMOOTHING_METHODS)
+    parser.add_argument("--window", type=int, default=SMOOTHING_WINDOW, help="smoothing window, in logged points")
+    parser.add_argument("--format", choices=("html",) + IMAGE_FORMATS, default="html")
+    parser.add_argument("--output", help="HTML file or image directory (default: report.html or report/)")
+    parser.add_argument("--title", default="Training report")
+    parser.add_argument("--workers", type=int, default=LOAD_WORKERS)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="runs or seed groups per task")
+    args = parser.parse_args(argv)
+
+    if args.format != "html" and importlib.util.find_spec("kaleido") is None:
+        parser.error("kaleido is required to export images")
+    if args.query and not query.parse_filter_query(args.query):
+        parser.error(f"could not parse the query {args.query!r}")
+    if not os.path.isdir(args.logs_dir):
+        parser.error(f"{args.logs_dir} is not a directory")
+
+    start = time.perf_counter()
+    runs = select_runs(args.logs_dir, args.models, args.runs, args.query)
+    if not runs:
+        print("No run matches the selection")
+        return 1
+    output = args.output or ("report.html" if args.format == "html" else "report")
+    smoothing = (args.smoothing, args.window) if args.smoothing else None
+    count = export_report(args.logs_dir, runs, output, args.format, args.aggregate, args.metrics, smoothing,
+                          args.title, max(1, args.workers), max(1, args.chunk_size))
+    print(f"{count} figures of {len(runs)} runs written to {output} in {time.perf_counter() - start:.1f}s")
+    return 0 if count else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
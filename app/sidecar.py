@@ -0,0 +1,176 @@
+"""Typed columnar sidecars for metrics CSVs.
+
+Each ``<model>/metrics/<run>.csv`` can have an Arrow IPC copy in
+``<model>/metrics/.columnar/<run>.arrow`` with timestamps already parsed. Sidecars are
+memory-mapped on read, and are rewritten whenever the CSV they were built from changes.
+
+Bulk-convert an existing logs tree with::
+
+    python -m app.sidecar [logs_dir] [--force] [--workers N]
+"""
+import argparse
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from app.archive import is_plain, open_file
+from app.config import BASE_DIRECTORY, LOAD_WORKERS
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # Sidecars are optional: everything falls back to the CSVs
+    pa = None
+
+SIDECAR_DIRNAME = ".columnar"
+SIDECAR_EXTENSION = ".arrow"
+
+_SIDECAR_ERRORS = (OSError,) if pa is None else (OSError, pa.ArrowException)
+
+_SOURCE_SIZE = b"source_size"
+_SOURCE_MTIME = b"source_mtime_ns"
+
+
+def sidecar_path(csv_path):
+    metrics_dir, filename = os.path.split(csv_path)
+    base_name = os.path.splitext(filename)[0]
+    return os.path.join(metrics_dir, SIDECAR_DIRNAME, f"{base_name}{SIDECAR_EXTENSION}")
+
+
+def _parse_csv(csv_path):
+    metrics_df = pd.read_csv(csv_path)
+    if 'timestamp' in metrics_df.columns:
+        metrics_df['timestamp'] = pd.to_datetime(metrics_df['timestamp'], errors='coerce')
+    return metrics_df
+
+
+def write_sidecar(csv_path, metrics_df=None):
+    """Writes the sidecar of ``csv_path`` and returns the typed DataFrame it contains."""
+    if pa is None:
+        raise RuntimeError("pyarrow is required to write columnar sidecars")
+    stat = os.stat(csv_path)
+    if metrics_df is None:
+        metrics_df = _parse_csv(csv_path)
+    table = pa.Table.from_pandas(metrics_df, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        _SOURCE_SIZE: str(stat.st_size).encode(),
+        _SOURCE_MTIME: str(stat.st_mtime_ns).encode(),
+    })
+
+    path = sidecar_path(csv_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+    return metrics_df
+
+
+def _open_sidecar(csv_path):
+    """Returns (memory-mapped table, is_fresh), or (None, False) when there is no sidecar."""
+    path = sidecar_path(csv_path)
+    if pa is None or not os.path.exists(path):
+        return None, False
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    metadata = table.schema.metadata or {}
+    stat = os.stat(csv_path)
+    is_fresh = (
+        metadata.get(_SOURCE_SIZE) == str(stat.st_size).encode()
+        and metadata.get(_SOURCE_MTIME) == str(stat.st_mtime_ns).encode()
+    )
+    return table, is_fresh
+
+
+def read_metrics(csv_path):
+    """Reads a metrics CSV, through its sidecar when one exists.
+
+    A stale sidecar is regenerated from the CSV; without a sidecar the CSV is parsed as is.
+    Compressed and archived CSVs are always parsed from their stream, as their sidecar
+    would take more room than they save.
+    """
+    if not is_plain(csv_path):
+        with open_file(csv_path) as f:
+            return pd.read_csv(f)
+    try:
+        table, is_fresh = _open_sidecar(csv_path)
+    except _SIDECAR_ERRORS as e:
+        logging.warning(f"Ignoring unreadable sidecar for {csv_path}: {e}")
+        table, is_fresh = None, False
+    if table is None:
+        return pd.read_csv(csv_path)
+    if not is_fresh:
+        try:
+            return write_sidecar(csv_path)
+        except OSError as e:
+            logging.warning(f"Could not regenerate sidecar for {csv_path}: {e}")
+            return _parse_csv(csv_path)
+    # Numeric columns without nulls are wrapped around the mapped buffers without copying
+    return table.to_pandas(split_blocks=True)
+
+
+def is_sidecar_fresh(csv_path):
+    try:
+        return _open_sidecar(csv_path)[1]
+    except _SIDECAR_ERRORS:
+        return False
+
+
+def _convert(csv_path, force):
+    if not force and is_sidecar_fresh(csv_path):
+        return csv_path, False, None
+    try:
+        write_sidecar(csv_path)
+        return csv_path, True, None
+    except Exception as e:
+        return csv_path, False, str(e)
+
+
+def find_metrics_csvs(base_directory):
+    csv_paths = []
+    for model_folder in sorted(os.listdir(base_directory)):
+        metrics_dir = os.path.join(base_directory, model_folder, "metrics")
+        if os.path.isdir(metrics_dir):
+            csv_paths.extend(
+                os.path.join(metrics_dir, f)
+                for f in sorted(os.listdir(metrics_dir))
+                if f.endswith(".csv")
+            )
+    return csv_paths
+
+
+def convert_tree(base_directory, force=False, workers=LOAD_WORKERS):
+    """Writes missing or stale sidecars for every metrics CSV under ``base_directory``."""
+    csv_paths = find_metrics_csvs(base_directory)
+    converted = skipped = failed = 0
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as executor:
+        for csv_path, written, error in executor.map(_convert, csv_paths, [force] * len(csv_paths)):
+            if error:
+                failed += 1
+                print(f"Error converting {csv_path}: {error}")
+            elif written:
+                converted += 1
+            else:
+                skipped += 1
+    return converted, skipped, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write columnar sidecars for every metrics CSV of a logs tree.")
+    parser.add_argument("logs_dir", nargs="?", default=BASE_DIRECTORY)
+    parser.add_argument("--force", action="store_true", help="rewrite sidecars that are already up to date")
+    parser.add_argument("--workers", type=int, default=LOAD_WORKERS)
+    args = parser.parse_args(argv)
+
+    if pa is None:
+        parser.error("pyarrow is not installed")
+    converted, skipped, failed = convert_tree(args.logs_dir, force=args.force, workers=args.workers)
+    print(f"{converted} converted, {skipped} up to date, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from app.cache import run_cache
+
+# Trailing smoothers: a smoothed point only depends on the values logged up to its epoch
+SMOOTHING_METHODS = ('ema', 'mean', 'median')
+
+
+def smooth_values(values, method, window):
+    """Smoothed copy of a Series of logged values, over ``window`` points."""
+    if method == 'ema':
+        return values.ewm(span=window).mean()
+    rolling = values.rolling(window, min_periods=1)
+    return rolling.median() if method == 'median' else rolling.mean()
+
+
+def smooth_metric(metrics_df, metric, method, window):
+    """``metric`` of one run smoothed in epoch order, as a float array aligned with its rows.
+
+    Rows where the metric was not logged stay NaN and are skipped by the window.
+    """
+    values = metrics_df[metric].to_numpy(dtype=float)
+    logged = np.flatnonzero(~np.isnan(values))
+    epochs = metrics_df['epoch'].to_numpy()[logged]
+    if len(epochs) > 1 and (np.diff(epochs) < 0).any():
+        logged = logged[np.argsort(epochs, kind='stable')]
+    smoothed = np.full(len(values), np.nan)
+    smoothed[logged] = smooth_values(pd.Series(values[logged]), method, window).to_numpy()
+    return smoothed
+
+
+def smooth_run(data, metric, method, window):
+    """Epochs and smoothed ``metric`` of a loaded run (see ``load_runs``), to plot or aggregate.
+
+    Smoothed series are cached per run, metric, method and window, and per version of the
+    loaded rows. Runs are expected to hold every logged row rather than a pyramid level,
+    whose envelope would smooth differently at each zoom (see ``load_runs``).
+    """
+    metrics_df = data['metrics']
+    if metric not in metrics_df.columns or not pd.api.types.is_numeric_dtype(metrics_df[metric]):
+        return metrics_df
+    epochs = metrics_df['epoch']
+    bounds = (epochs.iloc[0].item(), epochs.iloc[-1].item()) if len(epochs) else None
+    key = (f"smoothed {data['metrics_path']} {metric} {method} {window}", data['metrics_size'], len(epochs), bounds)
+    smoothed = run_cache.get(key)
+    if smoothed is None:
+        smoothed = pd.Series(smooth_metric(metrics_df, metric, method, window), name=metric)
+        run_cache.put(key, smoothed)
+    return pd.DataFrame({'epoch': epochs.to_numpy(), metric: smoothed.to_numpy()}, index=metrics_df.index)
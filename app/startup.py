@@ -0,0 +1,101 @@
+import importlib
+import logging
+import os
+import threading
+import time
+
+from app import started_at
+from app.catalog import get_catalog_runs
+from app.config import WARMUP_RUNS
+
+# Modules pulling in pandas, numpy and plotly's figure classes; imported by the warm-up
+# thread, or on first use
+HEAVY_MODULES = (
+    "app.utils", "app.figures", "app.aggregate", "app.query", "app.downsample", "app.tail", "app.summary",
+    "app.smoothing"
+)
+
+startup_times = {}
+_warmup_thread = None
+
+
+class LazyModule:
+    """Stands for module ``name`` and imports it on the first attribute access.
+
+    Unlike importlib's LazyLoader, the import goes through the regular import lock, so
+    request threads and the warm-up thread can race to it safely.
+    """
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(importlib.import_module(self._name), attr)
+
+    def __repr__(self):
+        return f"<lazy module {self._name!r}>"
+
+
+def record_startup(name):
+    """Records how long after the first import of the app ``name`` happened."""
+    startup_times.setdefault(name, time.perf_counter() - started_at)
+    logging.info(f"Startup: {name} after {startup_times[name]:.2f}s")
+
+
+def get_startup_gauges():
+    return [(f"drl_startup_{name}_seconds", seconds) for name, seconds in startup_times.items()]
+
+
+def install_startup_timing(server):
+    """Logs the time from the first import of the app to its first response."""
+
+    @server.after_request
+    def record_first_response(response):
+        if 'first_response' not in startup_times:
+            record_startup('first_response')
+        return response
+
+
+def warm_up(base_directory, recent_runs=WARMUP_RUNS):
+    """Imports the heavy modules, refreshes the run catalog and loads the most recently modified runs."""
+    start = time.perf_counter()
+    for name in HEAVY_MODULES:
+        importlib.import_module(name)
+    record_startup('imports')
+
+    from app.archive import list_models, record_checkpoints
+    from app.query import get_run_table
+    from app.utils import get_model_folders, load_runs
+    models = get_model_folders(base_directory)
+    runs = get_catalog_runs(base_directory, models)
+    get_run_table(base_directory, models)
+    record_startup('catalog')
+
+    # Random access into gzip-compressed model archives (see app/archive.py)
+    for source in list_models(base_directory).values():
+        record_checkpoints(source)
+
+    if recent_runs > 0:
+        runs.sort(key=lambda run: run['metrics_mtime'], reverse=True)
+        load_runs([(run['model'], run['metrics_file']) for run in runs[:recent_runs]], base_directory,
+                  overview=True)
+    logging.info(f"Warm-up of {len(runs)} runs in {len(models)} models took {time.perf_counter() - start:.2f}s")
+    record_startup('warmup')
+
+
+def start_warmup(base_directory):
+    """Runs ``warm_up`` in a background thread, once per process."""
+    global _warmup_thread
+    if _warmup_thread is not None and _warmup_thread.pid == os.getpid():
+        return _warmup_thread
+
+    def run():
+        try:
+            warm_up(base_directory)
+        except Exception as e:
+            logging.error(f"Warm-up failed: {str(e)}")
+
+    _warmup_thread = threading.Thread(target=run, name="warm-up", daemon=True)
+    _warmup_thread.pid = os.getpid()
+    _warmup_thread.start()
+    return _warmup_thread
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.cache import run_cache
+from app.catalog import get_catalog_runs, get_catalog_summaries, store_catalog_summaries
+from app.archive import get_read_groups, get_run_file
+from app.config import SUMMARY_LAST_N, SUMMARY_MINIMIZE
+from app.query import normalize_column
+from app.sidecar import read_metrics
+from app.utils import get_load_executor
+from app.watcher import METRICS_SUFFIX
+
+# Scalars computed for every metric column of a run
+SUMMARY_STATS = ('final', 'best', 'best_epoch', 'auc', 'last_mean')
+
+_NON_METRIC_COLUMNS = ('epoch', 'timestamp')
+
+
+def is_minimized(metric):
+    """Whether lower values of ``metric`` are better, from its name (see SUMMARY_MINIMIZE)."""
+    name = metric.lower()
+    return any(pattern in name for pattern in SUMMARY_MINIMIZE)
+
+
+def summarize_metrics(metrics_df, last_n=SUMMARY_LAST_N):
+    """Summary scalars of every numeric metric column of one run.
+
+    Returns {metric: {stat: value}} with, over the rows where the metric is logged: the
+    last value, the best value (lowest for metrics named like losses, highest otherwise)
+    and its epoch, the area under the curve over epochs (trapezoidal) and the mean of the
+    last ``last_n`` values. All columns are summarized in one pass over a 2D array.
+    """
+    columns = [
+        col for col in metrics_df.columns
+        if col not in _NON_METRIC_COLUMNS and pd.api.types.is_numeric_dtype(metrics_df[col])
+        and not pd.api.types.is_bool_dtype(metrics_df[col])
+    ]
+    if not columns or 'epoch' not in metrics_df.columns or not len(metrics_df):
+        return {}
+    ordered = metrics_df.sort_values('epoch', kind='stable')
+    epochs = ordered['epoch'].to_numpy(dtype=float)
+    values = ordered[columns].to_numpy(dtype=float)
+    present = ~np.isnan(values)
+    counts = present.sum(axis=0)
+    rows = np.arange(len(values))[:, None]
+
+    # Last logged row of each column
+    last_row = np.where(present, rows, -1).max(axis=0)
+    final = values[np.maximum(last_row, 0), np.arange(len(columns))]
+
+    minimize = np.array([is_minimized(col) for col in columns])
+    signed = np.where(minimize, values, -values)
+    best_row = np.argmin(np.where(present, signed, np.inf), axis=0)
+    best = values[best_row, np.arange(len(columns))]
+
+    # Trapezoids between consecutive logged points of each column
+    previous_epoch = pd.DataFrame(np.where(present, epochs[:, None], np.nan)).ffill().shift().to_numpy()
+    previous_value = pd.DataFrame(np.where(present, values, np.nan)).ffill().shift().to_numpy()
+    segments = np.where(present, (epochs[:, None] - previous_epoch) * (values + previous_value) / 2, np.nan)
+    auc = np.nansum(segments, axis=0)
+
+    # Mean of the last ``last_n`` logged values: rank rows from the end among logged ones
+    from_end = np.cumsum(present[::-1], axis=0)[::-1]
+    recent = present & (from_end <= last_n)
+    last_mean = np.where(recent, values, 0).sum(axis=0) / np.maximum(recent.sum(axis=0), 1)
+
+    summary = {}
+    for i, col in enumerate(columns):
+        if not counts[i]:
+            continue
+        summary[col] = {
+            'final': final[i].item(),
+            'best': best[i].item(),
+            'best_epoch': epochs[best_row[i]].item(),
+            'auc': auc[i].item(),
+            'last_mean': last_mean[i].item(),
+        }
+    return summary
+
+
+def summarize_file(metrics_path):
+    """Summary of one metrics file, or None when it cannot be read."""
+    try:
+        return summarize_metrics(read_metrics(metrics_path))
+    except Exception as e:
+        logging.error(f"Error summarizing {metrics_path}: {e}")
+        return None
+
+
+def summarize_files(metrics_paths):
+    return [summarize_file(metrics_path) for metrics_path in metrics_paths]
+
+
+def get_run_summaries(base_directory, models):
+    """One row per catalogued run of ``models``: its flattened hyperparameters and summary scalars.
+
+    Summaries are persisted in the run catalog and recomputed only for runs whose metrics
+    file changed size or mtime since it was summarized; the full series are never kept in
+    memory. Runs are identified by "@model" and "@metrics_file" columns and summary columns
+    are named ``<metric>:<stat>``, so neither collides with hyperparameter keys.
+    """
+    runs = get_catalog_runs(base_directory, models)
+    versions = [(run['model'], run['metrics_file'], run['metrics_size'], run['metrics_mtime']) for run in runs]
+    key = (f"summaries {tuple(models)}", hashlib.sha1(repr(versions).encode()).hexdigest())
+    frame = run_cache.get(key)
+    if frame is not None:
+        return frame
+
+    summaries = get_catalog_summaries(base_directory, models)
+    missing = [run for run in runs if (run['model'], run['metrics_file']) not in summaries]
+    if missing:
+        start = time.perf_counter()
+        paths = [get_run_file(base_directory, run['model'], "metrics", f"{run['metrics_file']}{METRICS_SUFFIX}")
+                 for run in missing]
+        # Runs of a compressed archive are summarized in one pass over it (see app/archive.py)
+        groups = get_read_groups(paths)
+        computed = [None] * len(paths)
+        group_summaries = get_load_executor().map(summarize_files, [[paths[i] for i in group] for group in groups])
+        for group, summaries_of_group in zip(groups, group_summaries):
+            for i, summary in zip(group, summaries_of_group):
+                computed[i] = summary
+        store_catalog_summaries(base_directory, [
+            (run['model'], run['metrics_file'], run['metrics_size'], run['metrics_mtime'], json.dumps(summary))
+            for run, summary in zip(missing, computed) if summary is not None
+        ])
+        for run, summary in zip(missing, computed):
+            if summary is not None:
+                summaries[(run['model'], run['metrics_file'])] = summary
+        logging.info(f"Summarized {len(missing)} runs in {time.perf_counter() - start:.2f}s")
+
+    records = []
+    for run in runs:
+        record = {'@model': run['model'], '@metrics_file': run['metrics_file']}
+        record.update(run['hyperparams'] or {})
+        for metric, stats in summaries.get((run['model'], run['metrics_file']), {}).items():
+            record.update({f"{metric}:{stat}": value for stat, value in stats.items()})
+        records.append(record)
+    frame = pd.DataFrame.from_records(records)
+    # Lists and dicts compared as in the hyperparameter table
+    keys = get_summary_keys(frame)
+    frame[keys] = frame[keys].apply(normalize_column)
+    run_cache.put(key, frame)
+    return frame
+
+
+def get_summary_metrics(frame):
+    """Metrics that have summary columns in a frame of ``get_run_summaries``."""
+    metrics = []
+    for column in frame.columns:
+        metric, _, stat = column.rpartition(':')
+        if metric and stat == 'final' and metric not in metrics:
+            metrics.append(metric)
+    return metrics
+
+
+def get_summary_keys(frame):
+    """Hyperparameter keys of a frame of ``get_run_summaries``."""
+    return [column for column in frame.columns if not column.startswith('@') and ':' not in column]
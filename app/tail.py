@@ -0,0 +1,51 @@
+import io
+import logging
+import os
+
+import pandas as pd
+
+from app.archive import is_plain
+from app.instrumentation import record_io
+
+_BACKTRACK_BYTES = 64 * 1024
+
+
+def _line_start(f, offset):
+    """Moves ``offset`` back to the start of the line it falls in."""
+    start = max(0, offset - _BACKTRACK_BYTES)
+    f.seek(start)
+    newline = f.read(offset - start).rfind(b"\n")
+    return start + newline + 1 if newline >= 0 else start
+
+
+def read_appended_rows(csv_path, offset):
+    """Parses the complete rows appended to a metrics CSV after byte ``offset``.
+
+    Returns (rows, new offset); rows is None when nothing new was written. A trailing line
+    that is still being written is left for the next call. Only the header and the new
+    bytes are read, so the cost does not depend on the size of the file.
+    """
+    if not is_plain(csv_path):
+        # Compressed and archived runs are finished: nothing gets appended to them
+        return None, offset
+    size = os.path.getsize(csv_path)
+    if size == offset:
+        return None, offset
+    if size < offset:
+        # File was truncated or rewritten: the plotted rows no longer match it
+        logging.warning(f"Metrics file {csv_path} shrank from {offset} to {size} bytes, not tailing it")
+        return None, offset
+
+    with open(csv_path, "rb") as f:
+        header = f.readline()
+        offset = max(offset, len(header))
+        offset = _line_start(f, offset)
+        f.seek(offset)
+        chunk = f.read(size - offset)
+
+    end = chunk.rfind(b"\n") + 1
+    if end == 0:
+        return None, offset
+    rows = pd.read_csv(io.BytesIO(header + chunk[:end]))
+    record_io(files_read=1, bytes_parsed=end, rows_loaded=len(rows))
+    return (rows if len(rows) else None), offset + end
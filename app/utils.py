@@ -1,53 +1,184 @@
 import os
 import pandas as pd
+from app.archive import get_run_file, is_plain, list_models, open_file
+from app.catalog import get_catalog_runs
+from app.watcher import HYPERPARAMS_SUFFIX, METRICS_SUFFIX, get_watcher
 
 def get_model_folders(base_directory):
-    return [
-        folder for folder in os.listdir(base_directory)
-        if os.path.isdir(os.path.join(base_directory, folder))
-    ]
+    """Model folders of a logs tree, including the ones stored as archives (see app/archive.py)."""
+    watcher = get_watcher(base_directory)
+    if watcher is not None:
+        return watcher.models()
+    return list(list_models(base_directory))
 
 def get_metrics_files(selected_model_folders, base_directory):
     """Returns a list of metrics CSV base filenames from selected model folders."""
-    metrics_files = set()
-    for model_folder in selected_model_folders:
-        metrics_dir = os.path.join(base_directory, model_folder, "metrics")
-        if os.path.exists(metrics_dir):
-            metrics_files.update([
-                os.path.splitext(f)[0]  # Base name without extension
-                for f in os.listdir(metrics_dir)
-                if f.endswith(".csv")
-            ])
-    return sorted(list(metrics_files))
+    runs = get_catalog_runs(base_directory, selected_model_folders)
+    return sorted({run['metrics_file'] for run in runs})
 
 
 import os
+import logging
+import numpy as np
 import pandas as pd
 import json
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from app.cache import estimate_size, file_stamp, run_cache
+from app.config import DOWNCAST_METRICS, LOAD_EXECUTOR, LOAD_WORKERS, PYRAMID_MIN_BYTES
+from app.instrumentation import record_io
+from app.pyramid import Pyramid, load_pyramid
+from app.sidecar import read_metrics
+
+
+def compact_metrics(metrics_df, downcast=DOWNCAST_METRICS):
+    """Stores the columns of a parsed metrics file in the smallest types that fit them.
+
+    Timestamps left as text are parsed into datetimes. With ``downcast``, float64 columns
+    become float32 and integer columns the smallest integer type holding their values.
+    """
+    if 'timestamp' in metrics_df.columns and pd.api.types.is_string_dtype(metrics_df['timestamp'].dtype):
+        metrics_df['timestamp'] = pd.to_datetime(metrics_df['timestamp'], errors='coerce')
+    if downcast:
+        for col in metrics_df.columns:
+            if metrics_df[col].dtype == np.float64:
+                metrics_df[col] = metrics_df[col].astype(np.float32)
+            elif pd.api.types.is_integer_dtype(metrics_df[col].dtype):
+                metrics_df[col] = pd.to_numeric(metrics_df[col], downcast='integer')
+    return metrics_df
+
+
+def read_metrics_csv(metrics_path):
+    return compact_metrics(read_metrics(metrics_path))
+
+
+def get_run_identifier(model, metrics_file):
+    return f"{model} - {metrics_file}"
+
+
+def read_hyperparameters_json(hyperparams_path):
+    with open_file(hyperparams_path) as json_file:
+        return json.load(json_file)
+
+
+# Run cache entries of pyramids are keyed by their metrics file path plus this suffix
+PYRAMID_SUFFIX = "#pyramid"
+
+_executor = None
+_executor_lock = threading.Lock()
+
 
+def get_load_executor():
+    """Returns the process-wide pool used to parse run files, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            pool_class = ProcessPoolExecutor if LOAD_EXECUTOR == "process" else ThreadPoolExecutor
+            _executor = pool_class(max_workers=LOAD_WORKERS)
+        return _executor
 
-def load_and_combine_data(selected_models, selected_metrics_files, base_directory):
+
+def _resolve_file(loaded, path):
+    """Returns the parsed content of ``path``, waiting for its worker and caching it if needed."""
+    key, value = loaded[path]
+    if isinstance(value, Exception):
+        raise value
+    if isinstance(value, Future):
+        value = value.result()
+        run_cache.put(key, value)
+        loaded[path] = (key, value)
+    return value
+
+
+def load_and_combine_data(selected_models, selected_metrics_files, base_directory, overview=False):
     """Loads and combines metrics and hyperparameters data for selected models and metrics files."""
+    run_keys = [
+        (model_folder, base_name)
+        for model_folder in selected_models
+        for base_name in selected_metrics_files
+    ]
+    return load_runs(run_keys, base_directory, overview)
+
+
+def _pyramid_stamp(stamp):
+    return (f"{stamp[0]}{PYRAMID_SUFFIX}",) + stamp[1:]
+
+
+def load_runs(run_keys, base_directory, overview=False, x_range=None):
+    """Loads the metrics and hyperparameters of each (model, metrics file) in ``run_keys``.
+
+    Files missing from the run cache are parsed on the load pool; results keep the order
+    of ``run_keys``, and runs without both files are skipped.
+
+    With ``overview``, metrics files of at least ``PYRAMID_MIN_BYTES`` are not parsed: their
+    metrics are the min/max envelope of the coarsest pyramid level that still has enough
+    points to plot ``x_range`` (the whole run when None), and only fall back to the full
+    rows when no level is fine enough.
+    """
+    runs = []
+    for model_folder, base_name in run_keys:
+        # Plain, compressed or archived files (see app/archive.py)
+        try:
+            metrics_path = get_run_file(base_directory, model_folder, "metrics", f"{base_name}{METRICS_SUFFIX}")
+            hyperparams_path = get_run_file(
+                base_directory, model_folder, "hyperparameters", f"{base_name}{HYPERPARAMS_SUFFIX}"
+            )
+        except Exception as e:
+            logging.error(f"Error locating files of model {model_folder}, file {base_name}: {e}")
+            continue
+        if metrics_path is not None and hyperparams_path is not None:
+            runs.append((model_folder, base_name, metrics_path, hyperparams_path))
+
+    executor = get_load_executor() if LOAD_WORKERS > 1 and len(runs) > 1 else None
+    loaded = {}
+    for _, _, metrics_path, hyperparams_path in runs:
+        for path, reader in ((metrics_path, read_metrics_csv), (hyperparams_path, read_hyperparameters_json)):
+            try:
+                key = file_stamp(path)
+                bytes_parsed = key[2]
+                if path == metrics_path and overview and key[2] >= PYRAMID_MIN_BYTES and is_plain(path):
+                    key, reader, bytes_parsed = _pyramid_stamp(key), load_pyramid, 0
+                value = run_cache.get(key)
+                if value is None:
+                    record_io(files_read=1, bytes_parsed=bytes_parsed)
+                    value = executor.submit(reader, path) if executor else reader(path)
+                    if executor is None:
+                        run_cache.put(key, value)
+                loaded[path] = (key, value)
+            except Exception as e:
+                loaded[path] = (None, e)
+
     data_list = []
-    for model_folder in selected_models:
-        model_path = os.path.join(base_directory, model_folder)
-        for base_name in selected_metrics_files:
-            metrics_path = os.path.join(model_path, "metrics", f"{base_name}.csv")
-            hyperparams_path = os.path.join(model_path, "hyperparameters", f"{base_name}_hyperparameters.json")
-            if os.path.exists(metrics_path) and os.path.exists(hyperparams_path):
-                try:
-                    metrics_df = pd.read_csv(metrics_path)
-                    with open(hyperparams_path, 'r') as json_file:
-                        hyperparams_data = json.load(json_file)
-                    # Convert hyperparameters JSON into a DataFrame (one row per JSON file)
-                    hyperparams_df = pd.DataFrame([hyperparams_data])
-
-                    # Add model and base_name to identify data
-                    metrics_df['model'] = model_folder
-                    metrics_df['metrics_file'] = base_name
-                    data_list.append({'metrics': metrics_df, 'hyperparams': hyperparams_df, 'model': model_folder,
-                                      'metrics_file': base_name})
-                except Exception as e:
-                    print(f"Error loading data for model {model_folder}, file {base_name}: {e}")
+    total_bytes = 0
+    for model_folder, base_name, metrics_path, hyperparams_path in runs:
+        try:
+            # Parsed files are shared through the run cache: work on a shallow copy
+            metrics = _resolve_file(loaded, metrics_path)
+            metrics_size = loaded[metrics_path][0][2]
+            if isinstance(metrics, Pyramid):
+                metrics_size = metrics.offset
+                metrics = metrics.frame(x_range)
+                if metrics is None:
+                    metrics = run_cache.get_or_load(metrics_path, read_metrics_csv)
+            metrics_df = metrics.copy(deep=False)
+            hyperparams_data = _resolve_file(loaded, hyperparams_path)
+            # Convert hyperparameters JSON into a DataFrame (one row per JSON file)
+            hyperparams_df = pd.DataFrame([hyperparams_data])
+
+            # Add model and base_name to identify data, as one-category codes rather than a string per row
+            codes = np.zeros(len(metrics_df), dtype=np.int8)
+            metrics_df['model'] = pd.Categorical.from_codes(codes, categories=[model_folder])
+            metrics_df['metrics_file'] = pd.Categorical.from_codes(codes, categories=[base_name])
+            memory_bytes = estimate_size(metrics_df)
+            total_bytes += memory_bytes
+            record_io(rows_loaded=len(metrics_df), memory_bytes=memory_bytes)
+            data_list.append({'metrics': metrics_df, 'hyperparams': hyperparams_df, 'model': model_folder,
+                              'metrics_file': base_name, 'metrics_path': metrics_path,
+                              'metrics_size': metrics_size})
+        except Exception as e:
+            logging.error(f"Error loading data for model {model_folder}, file {base_name}: {e}")
+    if data_list:
+        rows = sum(len(data['metrics']) for data in data_list)
+        logging.debug(f"Loaded {len(data_list)} runs: {rows} rows, {total_bytes / 2 ** 20:.1f} MiB in memory")
     return data_list
 
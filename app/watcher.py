@@ -0,0 +1,221 @@
+import logging
+import os
+import threading
+import time
+
+from app.archive import get_archive_extension, get_file_variants, get_model_source, list_models, scan_archive
+from app.config import WATCH_POLL_INTERVAL, WATCH_RESCAN_INTERVAL
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # No inotify support: rescan the logs tree periodically instead
+    FileSystemEventHandler = object
+    Observer = None
+
+METRICS_SUFFIX = ".csv"
+HYPERPARAMS_SUFFIX = "_hyperparameters.json"
+_WATCHED_DIRS = {"metrics": METRICS_SUFFIX, "hyperparameters": HYPERPARAMS_SUFFIX}
+
+# watchdog logs every inotify event at DEBUG level
+logging.getLogger("watchdog").setLevel(logging.INFO)
+
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+
+def scan_dir(directory, suffix):
+    """Maps base names of files ending with ``suffix``, or compressed copies of them, to their (size, mtime).
+
+    A plain file takes precedence over its compressed copies.
+    """
+    variants = get_file_variants(suffix)
+    entries = {}
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                variant = next((v for v in variants if entry.name.endswith(v)), None)
+                if variant is None or not entry.is_file():
+                    continue
+                base_name = entry.name[:-len(variant)]
+                if variant == suffix or base_name not in entries:
+                    stat = entry.stat()
+                    entries[base_name] = (stat.st_size, stat.st_mtime)
+    except (FileNotFoundError, NotADirectoryError):
+        pass
+    return entries
+
+
+def scan_model(base_directory, model, kind):
+    """``scan_dir`` of the ``kind`` folder of a model, which may be archived (see app/archive.py)."""
+    source = get_model_source(base_directory, model)
+    if source is None:
+        return {}
+    if os.path.isdir(source):
+        return scan_dir(os.path.join(source, kind), _WATCHED_DIRS[kind])
+    try:
+        return scan_archive(source, kind, _WATCHED_DIRS[kind])
+    except Exception as e:
+        logging.error(f"Could not index archive {source}: {str(e)}")
+        return {}
+
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        for path in (event.src_path, getattr(event, 'dest_path', '')):
+            if path:
+                self.watcher.mark_dirty(os.fsdecode(path))
+
+
+class LogsWatcher:
+    """Keeps an in-memory view of the model folders, metrics and hyperparameter files of a logs tree.
+
+    With watchdog installed, inotify (or the platform equivalent) events mark the touched
+    directories dirty and a background thread rescans just those, plus the whole tree every
+    ``rescan_interval`` seconds for changes that raise no event (network filesystems).
+    Otherwise the whole tree is rescanned every ``poll_interval`` seconds. Readers never
+    touch the disk.
+    """
+
+    def __init__(self, base_directory, poll_interval=WATCH_POLL_INTERVAL, rescan_interval=WATCH_RESCAN_INTERVAL):
+        self.base_directory = os.path.abspath(base_directory)
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self.mode = "inotify" if Observer is not None else "polling"
+        self.version = 0
+        self._models = {}
+        self._model_versions = {}
+        self._dirty = set()
+        self._dirty_event = threading.Event()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._observer = None
+        self._thread = None
+        self.pid = None
+
+    def start(self):
+        self.pid = os.getpid()
+        self._rescan_all()
+        if Observer is not None:
+            self._observer = Observer()
+            self._observer.schedule(_EventHandler(self), self.base_directory, recursive=True)
+            self._observer.daemon = True
+            self._observer.start()
+        self._thread = threading.Thread(target=self._run, name="logs-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._dirty_event.set()
+        if self._observer is not None:
+            self._observer.stop()
+
+    def mark_dirty(self, path):
+        parts = os.path.relpath(path, self.base_directory).split(os.sep)
+        if parts[0] in (os.curdir, os.pardir) or parts[0].startswith("."):
+            return
+        if len(parts) == 1:
+            # A model folder or archive was added, removed, renamed or rewritten
+            extension = get_archive_extension(parts[0])
+            dirty = (parts[0][:-len(extension)] if extension else parts[0], None)
+        elif parts[1] in _WATCHED_DIRS and len(parts) <= 3:
+            dirty = (parts[0], parts[1])
+        else:
+            return
+        with self._lock:
+            self._dirty.add(dirty)
+        self._dirty_event.set()
+
+    def _run(self):
+        next_rescan = time.monotonic() + self.rescan_interval
+        while not self._stop.is_set():
+            if self._observer is None:
+                self._stop.wait(self.poll_interval)
+                self._rescan_all()
+                continue
+            timeout = max(next_rescan - time.monotonic(), 0) if self.rescan_interval > 0 else None
+            self._dirty_event.wait(timeout)
+            # Due even while events keep coming in; dirty directories are then rescanned next round
+            if self.rescan_interval > 0 and time.monotonic() >= next_rescan:
+                self._rescan_all()
+                next_rescan = time.monotonic() + self.rescan_interval
+                continue
+            # Let bursts of events (e.g. a run appending to its CSV) settle before rescanning
+            self._stop.wait(0.5)
+            with self._lock:
+                dirty, self._dirty = self._dirty, set()
+                self._dirty_event.clear()
+            for model, kind in dirty:
+                self._rescan_model(model, kind)
+
+    def _scan_model(self, model, kind):
+        return scan_model(self.base_directory, model, kind)
+
+    def _rescan_model(self, model, kind=None):
+        if get_model_source(self.base_directory, model) is None:
+            view = None
+        elif kind is None or model not in self._models:
+            view = {k: self._scan_model(model, k) for k in _WATCHED_DIRS}
+        else:
+            view = dict(self._models[model])
+            view[kind] = self._scan_model(model, kind)
+        self._update(model, view)
+
+    def _rescan_all(self):
+        try:
+            models = set(list_models(self.base_directory))
+        except FileNotFoundError:
+            models = set()
+        for model in set(self._models) - models:
+            self._update(model, None)
+        for model in models:
+            self._update(model, {k: self._scan_model(model, k) for k in _WATCHED_DIRS})
+
+    def _update(self, model, view):
+        with self._lock:
+            if self._models.get(model) == view:
+                return
+            if view is None:
+                self._models.pop(model, None)
+            else:
+                self._models[model] = view
+            self.version += 1
+            self._model_versions[model] = self.version
+
+    def models(self):
+        return sorted(self._models)
+
+    def model_version(self, model):
+        """Changes whenever any file listed under ``model`` is added, removed or modified."""
+        return self._model_versions.get(model, 0)
+
+    def metrics_files(self, model):
+        return self._models.get(model, {}).get("metrics", {})
+
+    def hyperparameters_files(self, model):
+        return self._models.get(model, {}).get("hyperparameters", {})
+
+    def run_count(self):
+        return sum(len(view["metrics"]) for view in list(self._models.values()))
+
+
+def start_watcher(base_directory):
+    """Starts (once per process) the watcher of ``base_directory`` and returns it."""
+    key = os.path.abspath(base_directory)
+    with _watchers_lock:
+        if key not in _watchers or _watchers[key].pid != os.getpid():
+            _watchers[key] = LogsWatcher(base_directory).start()
+        return _watchers[key]
+
+
+def get_watcher(base_directory):
+    """Returns the running watcher of ``base_directory``, or None when it is not watched."""
+    watcher = _watchers.get(os.path.abspath(base_directory))
+    # Threads do not survive fork(): a watcher inherited from a parent process is stale
+    if watcher is None or watcher.pid != os.getpid():
+        return None
+    return watcher
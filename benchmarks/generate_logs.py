@@ -0,0 +1,110 @@
+"""Generates a synthetic logs tree shaped like the training logs the dashboard reads.
+
+    python -m benchmarks.generate_logs OUTPUT_DIR [--models 4] [--runs 50] [--rows 10000] [--metrics 4]
+                                           [--seeds 1] [--archive {gzip,tar,tar.gz}]
+"""
+import argparse
+import gzip
+import json
+import os
+import shutil
+import tarfile
+
+import numpy as np
+import pandas as pd
+
+
+def generate_run(rows, metrics, rng):
+    epochs = np.arange(rows)
+    data = {
+        'epoch': epochs,
+        'timestamp': pd.date_range("2024-01-01", periods=rows, freq="s").strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    for i in range(metrics):
+        # Noisy learning-curve-like series
+        trend = np.log1p(epochs) * rng.uniform(0.5, 2.0)
+        data[f"metric_{i}"] = trend + rng.normal(0, 1, rows).cumsum() * 0.01 + rng.normal(0, 0.5, rows)
+    return pd.DataFrame(data)
+
+
+def generate_config(rng):
+    return {
+        'alpha': float(rng.choice([0.0001, 0.001, 0.01, 0.1])),
+        'batch_size': int(rng.choice([32, 64, 128, 256])),
+        'gamma': float(rng.choice([0.9, 0.95, 0.99])),
+        'num_episodes': int(rng.choice([1000, 10000, 100000])),
+        'replay_capacity': int(rng.choice([1000, 10000, 100000])),
+        'start_epsilon': float(rng.choice([0.5, 1.0])),
+    }
+
+
+def generate_hyperparameters(rng, seed, config=None):
+    return {'hyperparameters': {**(config or generate_config(rng)), 'seed': seed}}
+
+
+def generate_tree(root, models=4, runs=50, rows=10000, metrics=4, seed=0, seeds=1):
+    """Writes ``models`` x ``runs`` metrics CSVs and hyperparameter JSONs under ``root``.
+
+    Every ``seeds`` consecutive runs share their hyperparameters apart from the seed.
+    """
+    rng = np.random.default_rng(seed)
+    for m in range(models):
+        model_path = os.path.join(root, f"model_{m}")
+        os.makedirs(os.path.join(model_path, "metrics"), exist_ok=True)
+        os.makedirs(os.path.join(model_path, "hyperparameters"), exist_ok=True)
+        config = None
+        for r in range(runs):
+            if r % seeds == 0:
+                config = generate_config(rng)
+            base_name = f"run_{r:05d}"
+            generate_run(rows, metrics, rng).to_csv(
+                os.path.join(model_path, "metrics", f"{base_name}.csv"), index=False
+            )
+            with open(os.path.join(model_path, "hyperparameters", f"{base_name}_hyperparameters.json"), 'w') as f:
+                json.dump(generate_hyperparameters(rng, r, config), f)
+
+
+ARCHIVE_LAYOUTS = ("gzip", "tar", "tar.gz")
+
+
+def archive_tree(root, layout):
+    """Rewrites the model folders under ``root`` the way finished sweeps are archived.
+
+    "gzip" compresses every run file in place, "tar" packs each model folder into a
+    ``<model>.tar`` of gzip-compressed run files, and "tar.gz" into a ``<model>.tar.gz``.
+    """
+    for model in sorted(os.listdir(root)):
+        model_path = os.path.join(root, model)
+        if model.startswith(".") or not os.path.isdir(model_path):
+            continue
+        if layout != "tar.gz":
+            for kind in ("metrics", "hyperparameters"):
+                for name in sorted(os.listdir(os.path.join(model_path, kind))):
+                    path = os.path.join(model_path, kind, name)
+                    with open(path, 'rb') as src, gzip.open(f"{path}.gz", 'wb') as dst:
+                        shutil.copyfileobj(src, dst)
+                    os.remove(path)
+        if layout != "gzip":
+            with tarfile.open(os.path.join(root, f"{model}.{layout}"), "w:gz" if layout == "tar.gz" else "w") as tar:
+                tar.add(model_path, arcname=model)
+            shutil.rmtree(model_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic logs tree.")
+    parser.add_argument("output_dir")
+    parser.add_argument("--models", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=50, help="runs per model")
+    parser.add_argument("--rows", type=int, default=10000, help="rows per metrics CSV")
+    parser.add_argument("--metrics", type=int, default=4, help="metric columns per CSV")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--seeds", type=int, default=1, help="consecutive runs sharing their hyperparameters")
+    parser.add_argument("--archive", choices=ARCHIVE_LAYOUTS, help="store the generated runs compressed or archived")
+    args = parser.parse_args(argv)
+    generate_tree(args.output_dir, args.models, args.runs, args.rows, args.metrics, args.seed, args.seeds)
+    if args.archive:
+        archive_tree(args.output_dir, args.archive)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,470 @@
+"""Times the dashboard's hot paths on a synthetic logs tree and records the results as JSON.
+
+    python -m benchmarks.run_benchmarks [--models 4] [--runs 50] [--rows 10000] [--metrics 4]
+                                        [--seeds 5] [--select 20] [--repeat 5] [--output bench_results.json]
+                                        [--baseline previous.json]
+
+Callbacks are timed end to end through the Flask test client, so the timings include
+Dash's request handling and JSON serialization, and the response sizes are what a
+browser would download.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.generate_logs import ARCHIVE_LAYOUTS, archive_tree, generate_tree
+
+_REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _timed(func, repeat, setup=None):
+    """Runs ``func`` ``repeat`` times and returns (timing summary, last result)."""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        result = func()
+        durations.append(time.perf_counter() - start)
+    summary = {
+        'repeat': repeat,
+        'min_s': min(durations),
+        'median_s': statistics.median(durations),
+        'mean_s': statistics.fmean(durations),
+    }
+    return summary, result
+
+
+def _callback_output_key(outputs):
+    if len(outputs) == 1:
+        return f"{outputs[0]['id']}.{outputs[0]['property']}"
+    return ".." + "...".join(f"{o['id']}.{o['property']}" for o in outputs) + ".."
+
+
+def find_callback(app, output_prefix):
+    """Registered key of the callback whose outputs start with ``output_prefix``.
+
+    Pattern-matching callbacks are keyed by their wildcard ids (and a hash when they
+    use duplicate outputs), which is what the browser sends instead of concrete ids.
+    """
+    return next(key for key in app.callback_map if key.startswith(output_prefix))
+
+
+def post_callback(client, outputs, inputs, state=(), changed=None, output_key=None, headers=None):
+    """Calls a Dash callback over HTTP; returns (status code, response body as bytes)."""
+    body = {
+        'output': output_key or _callback_output_key(outputs),
+        'outputs': outputs[0] if len(outputs) == 1 else outputs,
+        'inputs': inputs,
+        'state': list(state),
+        'changedPropIds': changed if changed is not None else [f"{inputs[0]['id']}.{inputs[0]['property']}"],
+    }
+    response = client.post("/_dash-update-component", json=body, headers=headers)
+    return response.status_code, response.get_data()
+
+
+def _selection_inputs(models, metrics_files):
+    return [
+        {'id': 'model-folder-selector', 'property': 'value', 'value': models},
+        {'id': 'metrics-file-selector', 'property': 'value', 'value': metrics_files},
+    ]
+
+
+def _render_call(client, output_key, plot_state, metric, aggregate_mode='runs', headers=None,
+                 smoothing=('none', 0)):
+    """First render of a mounted metric graph, as the browser triggers it.
+
+    ``smoothing`` is the (method, slider position) of the smoothing controls.
+    """
+    graph_id = {'type': 'metric-graph', 'metric': metric}
+    traces_id = {'type': 'metric-traces', 'metric': metric}
+    outputs = [_output(graph_id, 'figure'), _output(traces_id, 'data')]
+    inputs = [
+        {'id': graph_id, 'property': 'relayoutData', 'value': None},
+        {'id': 'smoothing-method', 'property': 'value', 'value': smoothing[0]},
+        {'id': 'smoothing-window', 'property': 'value', 'value': smoothing[1]},
+    ]
+    state = [
+        {'id': graph_id, 'property': 'id', 'value': graph_id},
+        {'id': traces_id, 'property': 'data', 'value': None},
+        {'id': 'plot-state', 'property': 'data', 'value': plot_state},
+        {'id': 'tail-offsets', 'property': 'data', 'value': None},
+        {'id': 'aggregate-mode', 'property': 'value', 'value': aggregate_mode},
+    ]
+    return post_callback(client, outputs, inputs, state, changed=[], output_key=output_key, headers=headers)
+
+
+def _output(component_id, prop):
+    return {'id': component_id, 'property': prop}
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=_REPO_DIR,
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _import_app(logs_dir):
+    """Imports the WSGI entry point in a fresh interpreter (no warm-up), as a new server process would."""
+    env = dict(os.environ, DRL_LOGS_DIR=logs_dir, DRL_WARMUP="0", DRL_WATCH_LOGS="0")
+    subprocess.run([sys.executable, "-c", "import wsgi"], cwd=_REPO_DIR, env=env, check=True)
+
+
+def _tree_bytes(root):
+    return sum(
+        os.path.getsize(os.path.join(directory, name)) for directory, _, names in os.walk(root) for name in names
+    )
+
+
+def run_benchmarks(logs_dir, select, repeat):
+    # Interpreter start and app import of a new server process, before this one imports the app
+    startup_import, _ = _timed(lambda: _import_app(logs_dir), repeat)
+
+    # Configuration is read from the environment when the app modules are imported
+    os.environ["DRL_LOGS_DIR"] = logs_dir
+    # Cold timings below must not race the startup warm-up
+    os.environ["DRL_WARMUP"] = "0"
+    import dash
+    import pandas as pd
+    import plotly
+    import plotly.io
+
+    from app import app
+    from app import figures
+    from app.cache import estimate_size, figure_cache, run_cache
+    from app import catalog
+    from app.catalog import get_catalog_path
+    from app.compression import get_encodings
+    from app.config import BINARY_ARRAYS
+    from app.callbacks import register_callbacks
+    from app.layout import layout
+    from app.query import get_run_table
+    from app.utils import get_metrics_files, get_model_folders, load_and_combine_data
+
+    app.layout = layout
+    register_callbacks(app)
+    client = app.server.test_client()
+    results = {'startup_import': startup_import}
+
+    results['get_model_folders'], models = _timed(lambda: get_model_folders(logs_dir), repeat)
+    models = sorted(models)
+
+    def drop_catalog():
+        if os.path.exists(get_catalog_path(logs_dir)):
+            os.remove(get_catalog_path(logs_dir))
+        # Forget which models were refreshed so the next listing rebuilds the catalog from scratch
+        catalog._last_refresh.clear()
+
+    results['get_metrics_files_cold'], _ = _timed(lambda: get_metrics_files(models, logs_dir), 1, setup=drop_catalog)
+    results['get_metrics_files'], metrics_files = _timed(lambda: get_metrics_files(models, logs_dir), repeat)
+
+    selected_models = models[:1]
+    selected_files = metrics_files[:select]
+    results['load_and_combine_data_cold'], data_list = _timed(
+        lambda: load_and_combine_data(selected_models, selected_files, logs_dir), repeat, setup=run_cache.clear
+    )
+    results['load_and_combine_data_cold']['rows_loaded'] = sum(len(data['metrics']) for data in data_list)
+    results['load_and_combine_data_cold']['memory_bytes'] = sum(estimate_size(data['metrics']) for data in data_list)
+    results['load_and_combine_data_cold']['disk_bytes'] = _tree_bytes(os.path.join(logs_dir, selected_models[0]))
+    results['load_and_combine_data'], _ = _timed(
+        lambda: load_and_combine_data(selected_models, selected_files, logs_dir), repeat
+    )
+
+    # Filter callback: restrict one numeric key, leave the other controls empty
+    summary = get_run_table(logs_dir, models).describe()
+    numeric_keys = [entry['key'] for entry in summary if entry['kind'] == 'numeric']
+    categorical_keys = [entry['key'] for entry in summary if entry['kind'] != 'numeric']
+    filtered = next((entry for entry in summary if entry['kind'] == 'numeric'), None)
+    range_ids = [{'type': 'hp-filter-min', 'key': key} for key in numeric_keys]
+    value_ids = [{'type': 'hp-filter-values', 'key': key} for key in categorical_keys]
+    filter_state = [
+        [{'id': i, 'property': 'value', 'value': None} for i in range_ids],
+        [{'id': {'type': 'hp-filter-max', 'key': i['key']}, 'property': 'value',
+          'value': filtered['min'] if filtered and i['key'] == filtered['key'] else None} for i in range_ids],
+        [{'id': i, 'property': 'id', 'value': i} for i in range_ids],
+        [{'id': i, 'property': 'value', 'value': None} for i in value_ids],
+        [{'id': i, 'property': 'id', 'value': i} for i in value_ids],
+        {'id': 'hp-missing-policy', 'property': 'value', 'value': 'exclude'},
+    ]
+    filter_inputs = [
+        {'id': 'model-folder-selector', 'property': 'value', 'value': models},
+        {'id': 'apply-filters-button', 'property': 'n_clicks', 'value': 1},
+    ]
+    results['filter_callback'], (status, body) = _timed(
+        lambda: post_callback(client, [_output('metrics-file-selector', 'options')], filter_inputs, filter_state,
+                              changed=['apply-filters-button.n_clicks']),
+        repeat
+    )
+    results['filter_callback'].update(status=status, response_bytes=len(body))
+
+    # Sweep overview of every run of the listed models: first with no stored summaries, then from the catalog
+    sweep_outputs = [_output('sweep-graph', 'figure'), _output('sweep-metric', 'options'),
+                     _output('sweep-metric', 'value'), _output('sweep-x', 'options'), _output('sweep-x', 'value')]
+    sweep_inputs = [
+        {'id': 'sweep-collapse', 'property': 'is_open', 'value': True},
+        {'id': 'model-folder-selector', 'property': 'value', 'value': models},
+        {'id': 'sweep-metric', 'property': 'value', 'value': None},
+        {'id': 'sweep-stat', 'property': 'value', 'value': 'best'},
+        {'id': 'sweep-view', 'property': 'value', 'value': 'parcoords'},
+        {'id': 'sweep-x', 'property': 'value', 'value': None},
+    ]
+
+    def drop_summaries():
+        run_cache.clear()
+        with sqlite3.connect(get_catalog_path(logs_dir)) as conn:
+            conn.execute("DELETE FROM summaries")
+
+    sweep_passes = (('sweep_view_cold', 1, drop_summaries), ('sweep_view_catalog', repeat, run_cache.clear),
+                    ('sweep_view', repeat, None))
+    for name, repeats, setup in sweep_passes:
+        results[name], (status, body) = _timed(
+            lambda: post_callback(client, sweep_outputs, sweep_inputs, changed=['sweep-collapse.is_open']),
+            repeats, setup
+        )
+        results[name].update(status=status, response_bytes=len(body))
+
+    # update_output, full rebuild and then adding a single run to the plotted selection
+    output_spec = [
+        _output('hyperparameters-container', 'children'),
+        _output('plot-state', 'data'),
+        _output('metric-selector', 'options'),
+        _output('metric-selector', 'value'),
+    ]
+    no_state = [
+        {'id': 'plot-state', 'property': 'data', 'value': None},
+        {'id': 'metric-selector', 'property': 'value', 'value': None},
+    ]
+    results['update_output_cold'], (status, body) = _timed(
+        lambda: post_callback(client, output_spec, _selection_inputs(selected_models, selected_files), no_state),
+        1, setup=run_cache.clear
+    )
+    results['update_output_cold'].update(status=status, response_bytes=len(body))
+    results['update_output'], (status, body) = _timed(
+        lambda: post_callback(client, output_spec, _selection_inputs(selected_models, selected_files), no_state),
+        repeat
+    )
+    results['update_output'].update(status=status, response_bytes=len(body))
+    response = json.loads(body)['response']
+    plot_state = response['plot-state']['data']
+    picked = response['metric-selector']['value']
+
+    if len(metrics_files) > len(selected_files):
+        grown = selected_files + [metrics_files[len(selected_files)]]
+        state = [
+            {'id': 'plot-state', 'property': 'data', 'value': plot_state},
+            {'id': 'metric-selector', 'property': 'value', 'value': picked},
+        ]
+        results['update_output_add_one_run'], (status, body) = _timed(
+            lambda: post_callback(client, output_spec, _selection_inputs(selected_models, grown), state), repeat
+        )
+        results['update_output_add_one_run'].update(status=status, response_bytes=len(body))
+
+    # Hyperparameter table: first page of the new runs, then a page sorted by a hyperparameter
+    table_outputs = [_output('hyperparameters-table', prop) for prop in (
+        'data', 'columns', 'page_current', 'page_count', 'style_header_conditional', 'style_data_conditional')]
+
+    def table_inputs(sort_by):
+        return [
+            {'id': 'plot-state', 'property': 'data', 'value': plot_state},
+            {'id': 'hyperparameters-table', 'property': 'page_current', 'value': 0},
+            {'id': 'hyperparameters-table', 'property': 'page_size', 'value': 25},
+            {'id': 'hyperparameters-table', 'property': 'sort_by', 'value': sort_by},
+            {'id': 'hyperparameters-table', 'property': 'filter_query', 'value': ''},
+        ]
+
+    results['hyperparameters_table'], (status, body) = _timed(
+        lambda: post_callback(client, table_outputs, table_inputs([])), repeat
+    )
+    results['hyperparameters_table'].update(status=status, response_bytes=len(body))
+    sort_by = [{'column_id': numeric_keys[0], 'direction': 'desc'}] if numeric_keys else []
+    results['hyperparameters_table_sorted_page'], (status, body) = _timed(
+        lambda: post_callback(client, table_outputs, table_inputs(sort_by), changed=['hyperparameters-table.sort_by']),
+        repeat
+    )
+    results['hyperparameters_table_sorted_page'].update(status=status, response_bytes=len(body))
+
+    # Empty graphs of the picked metrics, then the render of each one (the first is the time to first plot)
+    # No graph is mounted yet: the wildcard outputs match no component
+    plots_outputs = [_output('plots-container', 'children'), [], []]
+    plots_key = find_callback(app, '..plots-container.children...')
+    render_key = find_callback(app, '..{"metric":["MATCH"],"type":"metric-graph"}.figure')
+    plots_inputs = [
+        {'id': 'plot-state', 'property': 'data', 'value': plot_state},
+        {'id': 'metric-selector', 'property': 'value', 'value': picked},
+        {'id': 'aggregate-mode', 'property': 'value', 'value': 'runs'},
+    ]
+    results['update_plots'], (status, body) = _timed(
+        lambda: post_callback(client, plots_outputs, plots_inputs, [[], []], output_key=plots_key), repeat
+    )
+    results['update_plots'].update(status=status, response_bytes=len(body))
+    for name, repeats, setup in (('render_metric_plot_cold', 1, figure_cache.clear),
+                                 ('render_metric_plot', repeat, None)):
+        results[name], (status, body) = _timed(
+            lambda: _render_call(client, render_key, plot_state, picked[0]), repeats, setup
+        )
+        results[name].update(status=status, response_bytes=len(body))
+    results['render_picked_plots'], responses = _timed(
+        lambda: [_render_call(client, render_key, plot_state, metric) for metric in picked], 1, setup=figure_cache.clear
+    )
+    results['render_picked_plots'].update(metrics=len(picked), response_bytes=sum(len(b) for _, b in responses))
+
+    # Response pipeline of one figure: number lists or typed arrays, json or orjson encoder, and
+    # content encoding. Figures are rendered once per array format, the timings then cover
+    # serialization and compression only
+    engines = ['json', 'orjson'] if importlib.util.find_spec('orjson') else ['json']
+    variants = [('lists', 'json', 'identity'), ('binary', 'json', 'identity')]
+    variants += [('binary', engines[-1], encoding) for encoding in ['identity'] + get_encodings()]
+    default_engine = plotly.io.json.config.default_engine
+    try:
+        for arrays, engine, encoding in variants:
+            figures.BINARY_ARRAYS = arrays == 'binary'
+            plotly.io.json.config.default_engine = engine
+            headers = {'Accept-Encoding': encoding}
+            figure_cache.clear()
+            _render_call(client, render_key, plot_state, picked[0])
+            name = f"render_{arrays}_{engine}_{encoding}"
+            results[name], (status, body) = _timed(
+                lambda: _render_call(client, render_key, plot_state, picked[0], headers=headers), repeat
+            )
+            results[name].update(status=status, response_bytes=len(body))
+    finally:
+        figures.BINARY_ARRAYS = BINARY_ARRAYS
+        plotly.io.json.config.default_engine = default_engine
+        figure_cache.clear()
+
+    # Same plots drawn as one band per group of seeds; the second pass reuses cached aggregates
+    for name, repeats in (('render_aggregated_plots_cold', 1), ('render_aggregated_plots', repeat)):
+        results[name], responses = _timed(
+            lambda: [_render_call(client, render_key, plot_state, metric, 'std') for metric in picked], repeats,
+            setup=figure_cache.clear
+        )
+        results[name].update(metrics=len(picked), response_bytes=sum(len(b) for _, b in responses))
+
+    # Same plots smoothed per run (EMA over 20 points): the cold pass smooths every run, later
+    # passes only decimate the cached smoothed series again
+    for name, repeats in (('render_smoothed_plots_cold', 1), ('render_smoothed_plots', repeat)):
+        results[name], responses = _timed(
+            lambda: [_render_call(client, render_key, plot_state, metric, smoothing=('ema', 3)) for metric in picked],
+            repeats, setup=figure_cache.clear
+        )
+        results[name].update(metrics=len(picked), response_bytes=sum(len(b) for _, b in responses))
+
+    results['run_cache'] = run_cache.stats()
+
+    # The same runs archived: size on disk, first listing (which indexes archives) and cold load
+    archived_dir = tempfile.mkdtemp(prefix="drl_bench_archived_")
+    try:
+        for archive_layout in ARCHIVE_LAYOUTS:
+            root = os.path.join(archived_dir, archive_layout)
+            shutil.copytree(os.path.join(logs_dir, selected_models[0]), os.path.join(root, selected_models[0]))
+            archive_tree(root, archive_layout)
+            name = f"archived_{archive_layout.replace('.', '_')}"
+            disk_bytes = _tree_bytes(root)
+            results[f"{name}_list"], _ = _timed(lambda: get_metrics_files(selected_models, root), 1)
+            results[f"{name}_load_cold"], _ = _timed(
+                lambda: load_and_combine_data(selected_models, selected_files, root), repeat, setup=run_cache.clear
+            )
+            results[f"{name}_load_cold"]['disk_bytes'] = disk_bytes
+    finally:
+        shutil.rmtree(archived_dir, ignore_errors=True)
+
+    # Headless HTML report of the selected runs, built by a process pool with cold caches
+    from app.report import export_report, select_runs
+    report_runs = [run for run in select_runs(logs_dir, selected_models) if run['metrics_file'] in selected_files]
+    report_dir = tempfile.mkdtemp(prefix="drl_bench_report_")
+    try:
+        report_path = os.path.join(report_dir, "report.html")
+        for aggregate_mode in ("runs", "std"):
+            name = f"export_report_{aggregate_mode}"
+            results[name], figure_count = _timed(
+                lambda: export_report(logs_dir, report_runs, report_path, aggregate_mode=aggregate_mode), repeat
+            )
+            results[name].update(runs=len(report_runs), figures=figure_count,
+                                 output_bytes=os.path.getsize(report_path))
+    finally:
+        shutil.rmtree(report_dir, ignore_errors=True)
+
+    versions = {
+        'python': platform.python_version(),
+        'dash': dash.__version__,
+        'plotly': plotly.__version__,
+        'pandas': pd.__version__,
+    }
+    return results, versions
+
+
+def compare(results, baseline):
+    """Prints the median time of each benchmark next to the one recorded in ``baseline``."""
+    print(f"{'benchmark':32} {'baseline':>12} {'current':>12} {'ratio':>8}")
+    for name, current in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if 'median_s' not in current or not previous or 'median_s' not in previous:
+            continue
+        ratio = current['median_s'] / previous['median_s'] if previous['median_s'] else float('nan')
+        print(f"{name:32} {previous['median_s']:12.4f} {current['median_s']:12.4f} {ratio:8.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard on a synthetic logs tree.")
+    parser.add_argument("--models", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=50, help="runs per model")
+    parser.add_argument("--rows", type=int, default=10000, help="rows per metrics CSV")
+    parser.add_argument("--metrics", type=int, default=4, help="metric columns per CSV")
+    parser.add_argument("--seeds", type=int, default=5, help="consecutive runs sharing their hyperparameters")
+    parser.add_argument("--select", type=int, default=20, help="runs plotted by update_output")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--logs-dir", help="reuse (or keep) the generated tree in this directory")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="results file of a previous version to compare against")
+    args = parser.parse_args(argv)
+
+    scale = {'models': args.models, 'runs': args.runs, 'rows': args.rows, 'metrics': args.metrics,
+             'seeds': args.seeds, 'select': args.select}
+    logs_dir = args.logs_dir or tempfile.mkdtemp(prefix="drl_bench_logs_")
+    try:
+        if not os.path.isdir(logs_dir) or not os.listdir(logs_dir):
+            start = time.perf_counter()
+            generate_tree(logs_dir, args.models, args.runs, args.rows, args.metrics, seeds=args.seeds)
+            print(f"Generated {args.models * args.runs} runs in {time.perf_counter() - start:.1f}s under {logs_dir}")
+        results, versions = run_benchmarks(logs_dir, args.select, args.repeat)
+    finally:
+        if not args.logs_dir:
+            shutil.rmtree(logs_dir, ignore_errors=True)
+
+    report = {
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        'commit': _git_commit(),
+        'versions': versions,
+        'scale': scale,
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    for name, result in results.items():
+        if 'median_s' in result:
+            size = f"  {result['response_bytes'] / 1024:.0f} KiB" if 'response_bytes' in result else ""
+            print(f"{name:32} {result['median_s'] * 1000:10.1f} ms{size}")
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
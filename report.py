@@ -0,0 +1,8 @@
+"""Command line export of comparison reports, without starting the server (see app/report.py).
+
+    python report.py [logs_dir] [--models ...] [--runs ...] [--query QUERY] [--format html|png|svg|pdf]
+"""
+from app.report import main
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Lets ``pytest`` import the app package when run from anywhere in the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Importing app.callbacks configures the app's log file
+os.environ.setdefault("DRL_LOG_FILE", os.devnull)
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import aggregate as aggregate_module
+from app.aggregate import aggregate_metric, align_runs, get_group_aggregates, group_catalog_runs, group_runs
+from app.cache import run_cache
+
+
+def _runs():
+    rng = np.random.default_rng(0)
+    frames = []
+    for run in range(5):
+        epochs = np.sort(rng.choice(200, size=150, replace=False))
+        reward = rng.normal(size=len(epochs))
+        reward[rng.random(len(epochs)) < 0.1] = np.nan
+        frames.append(pd.DataFrame({'epoch': epochs, 'reward': reward}))
+    return frames
+
+
+def _by_epoch(frames):
+    """One column per run, one row per epoch any run logged."""
+    return pd.concat([frame.set_index('epoch')['reward'].dropna() for frame in frames], axis=1)
+
+
+def test_align_runs_on_the_union_of_epochs():
+    frames = [pd.DataFrame({'epoch': [0, 2], 'reward': [1.0, 2.0]}), pd.DataFrame({'epoch': [1, 2], 'reward': [3.0, 4.0]})]
+    epochs, values = align_runs(frames, 'reward')
+    assert epochs.tolist() == [0, 1, 2]
+    np.testing.assert_array_equal(values, [[1.0, np.nan, 2.0], [np.nan, 3.0, 4.0]])
+
+
+def test_aggregate_matches_pandas():
+    frames = _runs()
+    aggregate = aggregate_metric(frames, 'reward', quantiles=[0.1, 0.5, 0.75])
+    expected = _by_epoch(frames).sort_index()
+    np.testing.assert_array_equal(aggregate['epoch'], expected.index.to_numpy(dtype=float))
+    np.testing.assert_array_equal(aggregate['count'], expected.count(axis=1))
+    np.testing.assert_allclose(aggregate['mean'], expected.mean(axis=1))
+    # A single run has no spread
+    np.testing.assert_allclose(aggregate['std'], expected.std(axis=1).fillna(0.0))
+    for q in (0.1, 0.5, 0.75):
+        np.testing.assert_allclose(aggregate[f"q{q:g}"], expected.quantile(q, axis=1))
+
+
+def test_aggregate_skips_runs_without_the_metric():
+    frames = [pd.DataFrame({'epoch': [0, 1], 'loss': [1.0, 2.0]}), pd.DataFrame({'epoch': [0], 'name': ['a']})]
+    assert aggregate_metric(frames, 'reward') is None
+    assert aggregate_metric(frames, 'name') is None
+    assert aggregate_metric(frames, 'loss')['count'].tolist() == [1, 1]
+
+
+@pytest.mark.parametrize("seed_key", ["seed", "env.random_seed"])
+def test_groups_ignore_seeds_and_name_differing_keys(seed_key):
+    hyperparams = [{'lr': 0.1, seed_key: 0}, {'lr': 0.1, seed_key: 1}, {'lr': 0.2, seed_key: 0}]
+    runs = [{'model': 'ppo', 'metrics_file': f"run_{i}", 'hyperparams': hp} for i, hp in enumerate(hyperparams)]
+    groups = group_catalog_runs(runs)
+    assert [label for _, label, _ in groups] == ["ppo (2 runs) lr=0.1", "ppo (1 run) lr=0.2"]
+    assert [[run['metrics_file'] for run in members] for _, _, members in groups] == [['run_0', 'run_1'], ['run_2']]
+
+
+def test_loaded_and_catalog_runs_group_alike():
+    nested = [{'opt': {'lr': 0.1}, 'seed': 0}, {'opt': {'lr': 0.1}, 'seed': 1}, {'opt': {'lr': 0.3}, 'seed': 2}]
+    loaded = [{'model': 'dqn', 'hyperparams': pd.DataFrame([{'hyperparameters': hp}])} for hp in nested]
+    catalog = [{'model': 'dqn', 'hyperparams': {'opt.lr': hp['opt']['lr'], 'seed': hp['seed']}} for hp in nested]
+    assert [(signature, label) for signature, label, _ in group_runs(loaded)] == \
+        [(signature, label) for signature, label, _ in group_catalog_runs(catalog)]
+
+
+def test_group_aggregates_are_cached_per_version_of_the_runs(monkeypatch):
+    run_cache.clear()
+    data_list = [
+        {'model': 'ppo', 'metrics_path': f"ppo/metrics/run_{i}.csv", 'metrics_size': 100, 'metrics': frame,
+         'hyperparams': pd.DataFrame([{'hyperparameters': {'lr': 0.1, 'seed': i}}])}
+        for i, frame in enumerate(_runs())
+    ]
+    calls = []
+
+    def counted(frames, metric):
+        calls.append(metric)
+        return aggregate_metric(frames, metric)
+
+    monkeypatch.setattr(aggregate_module, "aggregate_metric", counted)
+    first = get_group_aggregates(group_runs(data_list), 'reward')
+    assert get_group_aggregates(group_runs(data_list), 'reward')[0][1] is first[0][1]
+    assert len(calls) == 1
+    data_list[0]['metrics_size'] = 120
+    get_group_aggregates(group_runs(data_list), 'reward')
+    assert len(calls) == 2
+    run_cache.clear()
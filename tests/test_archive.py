@@ -0,0 +1,103 @@
+import io
+import os
+import random
+import tarfile
+import zlib
+
+import pytest
+
+from app import archive
+from app.archive import _InflateStream, get_archive_index, read_member, record_checkpoints
+
+
+@pytest.fixture
+def gzip_archive(tmp_path, monkeypatch):
+    """A .tar.gz of 40 runs, about 1.6 MB once decompressed, with a checkpoint every 128 KiB."""
+    monkeypatch.setattr(archive, "CHECKPOINT_INTERVAL", 128 * 1024)
+    rng = random.Random(0)
+    contents = {}
+    path = tmp_path / "ppo.tar.gz"
+    with tarfile.open(path, "w:gz") as tar:
+        for i in range(40):
+            rows = "".join(f"{epoch},{rng.random():.6f}\n" for epoch in range(2000))
+            contents[f"ppo/metrics/run_{i}.csv"] = ("epoch,reward\n" + rows).encode()
+        for name, data in contents.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    yield str(path), contents
+    archive._checkpoints.clear()
+    archive._streams.clear()
+    archive._indexes.clear()
+
+
+def _decompressed(path):
+    with open(path, "rb") as f:
+        return zlib.decompress(f.read(), 31)
+
+
+def test_streams_resume_from_any_checkpoint(gzip_archive):
+    path, _ = gzip_archive
+    stamp = archive._get_index(path)[0]
+    checkpoints = archive._checkpoints[path][1]
+    assert len(checkpoints) > 5
+    assert all(b[1] - a[1] >= archive.CHECKPOINT_INTERVAL for a, b in zip(checkpoints, checkpoints[1:]))
+
+    data = _decompressed(path)
+    for checkpoint in checkpoints:
+        stream = _InflateStream(path, stamp, checkpoint)
+        try:
+            assert stream.tell() == checkpoint[1]
+            stream.seek(checkpoint[1] + 1000)
+            assert stream.read(5000) == data[checkpoint[1] + 1000:checkpoint[1] + 6000]
+        finally:
+            stream.close()
+    # A checkpoint is reused as is: resuming from it again gives the same bytes
+    stream = _InflateStream(path, stamp, checkpoints[2])
+    try:
+        assert stream.read(100) == data[checkpoints[2][1]:checkpoints[2][1] + 100]
+    finally:
+        stream.close()
+
+
+def test_members_read_in_any_order_match_the_archive(gzip_archive):
+    path, contents = gzip_archive
+    names = list(contents)
+    random.Random(1).shuffle(names)
+    assert all(read_member(path, name) == contents[name] for name in names)
+
+
+def test_cold_reads_start_from_the_closest_checkpoint(gzip_archive, monkeypatch):
+    path, contents = gzip_archive
+    index = get_archive_index(path)
+    # A process that loads the stored index has no checkpoints until it records them
+    archive._checkpoints.clear()
+    archive._indexes.clear()
+    record_checkpoints(path)
+    assert archive._checkpoints[path][1]
+
+    started = []
+
+    def opener(archive_path, stamp, checkpoint):
+        started.append(checkpoint[1] if checkpoint else 0)
+        return _InflateStream(archive_path, stamp, checkpoint)
+
+    monkeypatch.setitem(archive._STREAM_OPENERS, ".tar.gz", opener)
+    archive._streams.clear()
+    last = max(index, key=lambda name: index[name][0])
+    assert read_member(path, last) == contents[last]
+    offset = index[last][0]
+    assert started == [max(checkpoint[1] for checkpoint in archive._checkpoints[path][1] if checkpoint[1] <= offset)]
+    assert started[0] > 0
+
+
+def test_rewritten_archive_drops_its_checkpoints(gzip_archive):
+    path, contents = gzip_archive
+    name = "ppo/metrics/run_39.csv"
+    assert read_member(path, name) == contents[name]
+    with tarfile.open(path, "w:gz") as tar:
+        info = tarfile.TarInfo(name)
+        info.size = 6
+        tar.addfile(info, io.BytesIO(b"epoch\n"))
+    os.utime(path, ns=(os.stat(path).st_mtime_ns + 10 ** 9,) * 2)
+    assert read_member(path, name) == b"epoch\n"
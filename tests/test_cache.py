@@ -0,0 +1,78 @@
+import pandas as pd
+
+from app import cache
+from app.cache import FileCache
+
+
+def test_evicts_least_recently_used_entries_past_the_budget():
+    files = FileCache(max_bytes=300)
+    for name in ("a", "b", "c"):
+        files.put((name, 1, 100), name, size=100)
+    assert files.get(("a", 1, 100)) == "a"
+    files.put(("d", 1, 100), "d", size=100)
+    assert files.get(("b", 1, 100)) is None
+    assert [files.get((name, 1, 100)) for name in ("a", "c", "d")] == ["a", "c", "d"]
+    stats = files.stats()
+    assert stats['entries'] == 3 and stats['bytes'] == 300 and stats['evictions'] == 1
+    # Values larger than the whole budget are not kept
+    files.put(("e", 1, 1000), "e", size=1000)
+    assert files.get(("e", 1, 1000)) is None and files.stats()['bytes'] == 300
+
+
+def test_newer_version_of_a_file_replaces_the_stale_one():
+    files = FileCache(max_bytes=1000)
+    files.put(("run.csv", 1, 10), "old", size=10)
+    files.put(("other.csv", 1, 10), "other", size=10)
+    files.put(("run.csv", 2, 20), "new", size=20)
+    assert files.get(("run.csv", 1, 10)) is None
+    assert files.get(("run.csv", 2, 20)) == "new"
+    assert files.stats()['bytes'] == 30
+    files.put(("run.csv", 2, 20), "again", size=20)
+    assert files.get(("run.csv", 2, 20)) == "again" and files.stats()['bytes'] == 30
+
+
+def test_plain_lru_keeps_variants_of_one_value():
+    figures = FileCache(max_bytes=1000, replace_versions=False)
+    figures.put(("figure reward", "v1", None), "whole run", size=10)
+    figures.put(("figure reward", "v1", (0, 10)), "zoomed", size=10)
+    assert figures.get(("figure reward", "v1", None)) == "whole run"
+    assert figures.get(("figure reward", "v1", (0, 10))) == "zoomed"
+    figures.put(("figure reward", "v1", None), "again", size=10)
+    assert figures.stats()['bytes'] == 20 and figures.stats()['entries'] == 2
+
+
+def test_get_or_load_parses_again_once_the_file_changes(tmp_path):
+    path = tmp_path / "run.csv"
+    path.write_text("epoch,reward\n0,1\n")
+    files = FileCache(max_bytes=1 << 20)
+    loads = []
+
+    def loader(path):
+        loads.append(path)
+        return pd.read_csv(path)
+
+    assert len(files.get_or_load(str(path), loader)) == 1
+    assert len(files.get_or_load(str(path), loader)) == 1
+    with open(path, "a") as f:
+        f.write("1,2\n")
+    assert len(files.get_or_load(str(path), loader)) == 2
+    assert len(loads) == 2 and files.stats()['entries'] == 1
+
+
+def test_shared_tier_serves_other_processes_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "SHARED_CACHE_DIR", str(tmp_path / "shared"))
+    monkeypatch.setattr(cache, "_shared_store", None)
+    frame = pd.DataFrame({'epoch': [0, 1], 'reward': [0.5, 1.5]})
+    writer = FileCache(max_bytes=1 << 20, shared_namespace="runs")
+    writer.put(("run.csv", 1, 10), frame)
+    # Not shared: only DataFrames and JSON-like values are
+    writer.put(("pyramid", 1, 10), object())
+
+    reader = FileCache(max_bytes=1 << 20, shared_namespace="runs")
+    pd.testing.assert_frame_equal(reader.get(("run.csv", 1, 10)), frame)
+    assert reader.get(("pyramid", 1, 10)) is None
+    stats = reader.stats()
+    assert stats['shared_hits'] == 1 and stats['entries'] == 1
+    # Namespaces keep the caches apart
+    assert FileCache(max_bytes=1 << 20, shared_namespace="figures").get(("run.csv", 1, 10)) is None
+    cache.get_shared_store().close()
@@ -0,0 +1,117 @@
+import json
+import os
+
+import pytest
+
+from app import catalog
+from app.catalog import flatten_hyperparameters, get_catalog_generation, get_catalog_runs, refresh_catalog
+from app.query import get_run_table
+
+
+def write_run(base_directory, model, name, hyperparams, rows=3):
+    metrics_dir = base_directory / model / "metrics"
+    hyperparams_dir = base_directory / model / "hyperparameters"
+    metrics_dir.mkdir(parents=True, exist_ok=True)
+    hyperparams_dir.mkdir(parents=True, exist_ok=True)
+    (metrics_dir / f"{name}.csv").write_text("epoch,reward\n" + "".join(f"{i},{i / 2}\n" for i in range(rows)))
+    (hyperparams_dir / f"{name}_hyperparameters.json").write_text(json.dumps({'hyperparameters': hyperparams}))
+
+
+@pytest.fixture
+def logs(tmp_path, monkeypatch):
+    # Every lookup rescans the model folders
+    monkeypatch.setattr(catalog, "CATALOG_REFRESH_INTERVAL", 0)
+    write_run(tmp_path, "ppo", "run_0", {'lr': 0.1})
+    write_run(tmp_path, "ppo", "run_1", {'lr': 0.2})
+    write_run(tmp_path, "dqn", "run_0", {'lr': 0.3})
+    return tmp_path
+
+
+def test_generation_ignores_growing_metrics_files(logs):
+    base = str(logs)
+    generation = get_catalog_generation(base, ["ppo", "dqn"])
+    with open(logs / "ppo" / "metrics" / "run_0.csv", "a") as f:
+        f.write("3,1.5\n")
+    assert get_catalog_generation(base, ["ppo", "dqn"]) == generation
+
+
+@pytest.mark.parametrize("change", ["hyperparameters", "added", "removed", "renamed"])
+def test_generation_follows_run_changes(logs, change):
+    base = str(logs)
+    before = get_catalog_generation(base, ["ppo", "dqn"])
+    if change == "hyperparameters":
+        write_run(logs, "ppo", "run_1", {'lr': 0.25})
+    elif change == "added":
+        write_run(logs, "ppo", "run_2", {'lr': 0.3})
+    elif change == "removed":
+        os.remove(logs / "ppo" / "metrics" / "run_1.csv")
+    else:
+        # Same sizes and mtimes, other name
+        for kind, suffix in (("metrics", ".csv"), ("hyperparameters", "_hyperparameters.json")):
+            os.rename(logs / "ppo" / kind / f"run_1{suffix}", logs / "ppo" / kind / f"renamed{suffix}")
+    after = get_catalog_generation(base, ["ppo", "dqn"])
+    assert after[0] != before[0] and after[1] == before[1]
+
+
+def test_run_table_is_rebuilt_only_when_its_models_change(logs):
+    base = str(logs)
+    table = get_run_table(base, ["ppo"])
+    assert get_run_table(base, ["ppo"]) is table
+    write_run(logs, "dqn", "run_1", {'lr': 0.4})
+    assert get_run_table(base, ["ppo"]) is table
+    write_run(logs, "ppo", "run_2", {'lr': 0.5})
+    rebuilt = get_run_table(base, ["ppo"])
+    assert rebuilt is not table
+    assert len(rebuilt.rows([("ppo", "run_2")])[0]) == 1
+
+
+def test_flatten_hyperparameters():
+    assert flatten_hyperparameters({'lr': 0.1, 'opt': {'name': 'adam', 'betas': {'b1': 0.9}}, 'layers': [64]}) == \
+        {'lr': 0.1, 'opt.name': 'adam', 'opt.betas.b1': 0.9, 'layers': [64]}
+
+
+def test_catalog_lists_runs_with_their_hyperparameters(logs):
+    (logs / "ppo" / "metrics" / "orphan.csv").write_text("epoch,reward\n0,1\n")
+    (logs / "ppo" / "hyperparameters" / "run_1_hyperparameters.json").write_text("{not json")
+    runs = get_catalog_runs(str(logs), ["ppo", "dqn"])
+    assert [(run['model'], run['metrics_file']) for run in runs] == \
+        [("dqn", "run_0"), ("ppo", "orphan"), ("ppo", "run_0"), ("ppo", "run_1")]
+    by_name = {(run['model'], run['metrics_file']): run for run in runs}
+    assert by_name[("dqn", "run_0")]['hyperparams'] == {'lr': 0.3}
+    assert by_name[("ppo", "orphan")]['hyperparams'] is None and by_name[("ppo", "orphan")]['hyperparams_error'] is None
+    assert by_name[("ppo", "run_1")]['hyperparams'] is None and by_name[("ppo", "run_1")]['hyperparams_error']
+    assert by_name[("ppo", "run_0")]['metrics_size'] == (logs / "ppo" / "metrics" / "run_0.csv").stat().st_size
+
+
+def test_refresh_reads_only_changed_hyperparameters(logs, monkeypatch):
+    base = str(logs)
+    get_catalog_runs(base, ["ppo", "dqn"])
+    read = []
+    original = catalog._read_hyperparameters
+
+    def counted(path):
+        read.append(path)
+        return original(path)
+
+    monkeypatch.setattr(catalog, "_read_hyperparameters", counted)
+
+    with open(logs / "ppo" / "metrics" / "run_0.csv", "a") as f:
+        f.write("3,1.5\n")
+    runs = get_catalog_runs(base, ["ppo", "dqn"])
+    assert read == []
+    assert runs[1]['metrics_size'] == (logs / "ppo" / "metrics" / "run_0.csv").stat().st_size
+
+    write_run(logs, "ppo", "run_1", {'lr': 0.25})
+    runs = get_catalog_runs(base, ["ppo", "dqn"])
+    assert len(read) == 1 and read[0].endswith("run_1_hyperparameters.json")
+    assert runs[2]['hyperparams'] == {'lr': 0.25}
+
+
+def test_refresh_waits_for_the_interval_unless_forced(logs, monkeypatch):
+    base = str(logs)
+    monkeypatch.setattr(catalog, "CATALOG_REFRESH_INTERVAL", 3600)
+    assert len(get_catalog_runs(base, ["ppo"])) == 2
+    write_run(logs, "ppo", "run_2", {'lr': 0.5})
+    assert len(get_catalog_runs(base, ["ppo"])) == 2
+    refresh_catalog(base, ["ppo"], force=True)
+    assert len(get_catalog_runs(base, ["ppo"])) == 3
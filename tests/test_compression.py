@@ -0,0 +1,58 @@
+import gzip
+import json
+
+import plotly.io
+from flask import Flask, Response
+
+from app.compression import choose_encoding, install_compression, install_json_engine
+
+
+def make_server(min_bytes=100):
+    server = Flask(__name__)
+
+    @server.route("/data")
+    def data():
+        return Response(json.dumps({"values": list(range(200))}), mimetype="application/json")
+
+    @server.route("/small")
+    def small():
+        return Response("{}", mimetype="application/json")
+
+    @server.route("/image")
+    def image():
+        return Response(b"\x89PNG" * 100, mimetype="image/png")
+
+    install_compression(server, min_bytes=min_bytes)
+    return server.test_client()
+
+
+def test_choose_encoding_follows_accept_encoding():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, deflate") is None
+    assert choose_encoding("*") in ("br", "gzip")
+    assert choose_encoding("identity") is None
+    assert choose_encoding(None) is None
+
+
+def test_compresses_large_json_responses():
+    client = make_server()
+    response = client.get("/data", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert json.loads(gzip.decompress(response.data)) == {"values": list(range(200))}
+
+
+def test_leaves_other_responses_alone():
+    client = make_server()
+    assert "Content-Encoding" not in client.get("/data").headers
+    assert "Content-Encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "Content-Encoding" not in client.get("/image", headers={"Accept-Encoding": "gzip"}).headers
+
+
+def test_json_engine_is_set_without_compression():
+    default_engine = plotly.io.json.config.default_engine
+    try:
+        install_json_engine("json")
+        assert plotly.io.json.config.default_engine == "json"
+    finally:
+        plotly.io.json.config.default_engine = default_engine
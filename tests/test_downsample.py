@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from app.downsample import lttb_indices, minmax_indices, parse_x_range, sample_run
+
+
+def test_minmax_keeps_the_extremes_of_every_bucket():
+    y = np.random.default_rng(0).normal(size=10_003).cumsum()
+    indices = minmax_indices(y, 200)
+    assert indices[0] == 0 and indices[-1] == len(y) - 1
+    assert (np.diff(indices) > 0).all()
+    assert len(indices) <= 200 + 2
+    size = -(-len(y) // 100)
+    for start in range(0, len(y), size):
+        bucket = y[start:start + size]
+        assert start + bucket.argmin() in indices and start + bucket.argmax() in indices
+
+
+def test_minmax_keeps_short_series():
+    assert minmax_indices(np.arange(10.0), 20).tolist() == list(range(10))
+
+
+def test_lttb_keeps_endpoints_and_point_count():
+    x = np.arange(5000)
+    y = np.sin(x / 50.0)
+    indices = lttb_indices(x, y, 300)
+    assert len(indices) == 300
+    assert indices[0] == 0 and indices[-1] == len(x) - 1
+    assert (np.diff(indices) > 0).all()
+
+
+def test_sample_run_keeps_one_point_past_each_edge_of_the_range():
+    frame = pd.DataFrame({'epoch': np.arange(1000), 'reward': np.arange(1000.0)})
+    points = sample_run(frame, 'reward', x_range=(100.5, 200.5), max_points=2000)
+    assert points['epoch'].iloc[0] == 100 and points['epoch'].iloc[-1] == 201
+
+
+def test_sample_run_sorts_and_drops_unlogged_rows():
+    frame = pd.DataFrame({'epoch': [3, 1, 2, 4], 'reward': [3.0, 1.0, np.nan, 4.0]})
+    points = sample_run(frame, 'reward', max_points=2000)
+    assert points['epoch'].tolist() == [1, 3, 4]
+
+
+def test_sample_run_decimates_long_runs():
+    frame = pd.DataFrame({'epoch': np.arange(100_000), 'reward': np.random.default_rng(1).normal(size=100_000)})
+    points = sample_run(frame, 'reward', max_points=1000, method="minmax")
+    assert len(points) <= 1002
+    assert points['reward'].max() == frame['reward'].max() and points['reward'].min() == frame['reward'].min()
+
+
+def test_parse_x_range():
+    assert parse_x_range(None) is False
+    assert parse_x_range({'xaxis.autorange': True}) is None
+    assert parse_x_range({'xaxis.range[0]': 1, 'xaxis.range[1]': 5}) == (1, 5)
+    assert parse_x_range({'xaxis.range': [2, 3]}) == (2, 3)
+    assert parse_x_range({'yaxis.range[0]': 0}) is False
@@ -0,0 +1,210 @@
+import fcntl
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.pyramid import (
+    FACTORS, Pyramid, _fold, _locked, _raw_records, _stat_columns, build_pyramid, load_pyramid, pyramid_dir
+)
+from app.sidecar import read_metrics
+
+
+def _series(n, n_metrics=2, seed=0):
+    rng = np.random.default_rng(seed)
+    epoch = np.arange(n, dtype=float)
+    values = rng.normal(size=(n, n_metrics)).cumsum(axis=0)
+    # Metrics are not logged on every row
+    values[rng.random(values.shape) < 0.2] = np.nan
+    return epoch, values
+
+
+def _stat(records, stat, n_metrics):
+    return records[:, _stat_columns(stat, n_metrics)]
+
+
+def _assert_same_pyramid(a, b):
+    for level_a, level_b in zip(a.levels, b.levels):
+        np.testing.assert_array_equal(np.asarray(level_a), np.asarray(level_b))
+    np.testing.assert_array_equal(a.pending, b.pending)
+
+
+def test_fold_matches_bucket_statistics():
+    epoch, values = _series(16 * 10 + 5)
+    folded = _fold(_raw_records(epoch, values), 16, 2)
+    assert len(folded) == 10
+    for bucket, record in enumerate(folded):
+        rows = slice(bucket * 16, (bucket + 1) * 16)
+        chunk = pd.DataFrame(values[rows])
+        assert record[0] == epoch[rows][0] and record[1] == epoch[rows][-1]
+        np.testing.assert_array_equal(_stat(record[None], 'count', 2)[0], chunk.count().to_numpy())
+        np.testing.assert_allclose(_stat(record[None], 'sum', 2)[0], chunk.sum().to_numpy())
+        np.testing.assert_array_equal(_stat(record[None], 'min', 2)[0], chunk.min().to_numpy())
+        np.testing.assert_array_equal(_stat(record[None], 'max', 2)[0], chunk.max().to_numpy())
+        np.testing.assert_array_equal(_stat(record[None], 'min_epoch', 2)[0], epoch[rows][chunk.idxmin().to_numpy()])
+        np.testing.assert_array_equal(_stat(record[None], 'max_epoch', 2)[0], epoch[rows][chunk.idxmax().to_numpy()])
+        np.testing.assert_array_equal(_stat(record[None], 'last', 2)[0], chunk.ffill().iloc[-1].to_numpy())
+
+
+def test_fold_of_empty_buckets_is_nan():
+    epoch = np.arange(32, dtype=float)
+    values = np.full((32, 1), np.nan)
+    values[20] = 1.5
+    folded = _fold(_raw_records(epoch, values), 16, 1)
+    assert _stat(folded, 'count', 1).tolist() == [[0], [1]]
+    assert np.isnan(_stat(folded, 'min', 1)[0, 0]) and np.isnan(_stat(folded, 'last', 1)[0, 0])
+    assert _stat(folded, 'last', 1)[1, 0] == 1.5 and _stat(folded, 'max_epoch', 1)[1, 0] == 20
+
+
+def test_coarser_levels_fold_finer_ones():
+    epoch, values = _series(FACTORS[-1] * 2 + 100)
+    pyramid = Pyramid("run.csv", ['a', 'b'])
+    pyramid.append(epoch, values)
+    raw = _raw_records(epoch, values)
+    for level, factor in enumerate(FACTORS):
+        # Sums of sums only differ by rounding
+        np.testing.assert_allclose(pyramid.levels[level], _fold(raw, factor, 2), rtol=1e-12)
+    assert pyramid.row_count == len(epoch)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_incremental_appends_match_a_full_build(seed):
+    epoch, values = _series(9000, seed=seed)
+    full = Pyramid("run.csv", ['a', 'b'])
+    full.append(epoch, values)
+
+    incremental = Pyramid("run.csv", ['a', 'b'])
+    cuts = np.sort(np.random.default_rng(seed).choice(np.arange(1, len(epoch)), size=40, replace=False))
+    for start, end in zip(np.concatenate([[0], cuts]), np.concatenate([cuts, [len(epoch)]])):
+        incremental.append(epoch[start:end], values[start:end])
+    _assert_same_pyramid(full, incremental)
+
+
+def test_tail_records_cover_every_row_once():
+    epoch, values = _series(FACTORS[-1] + 3 * FACTORS[1] + 2 * FACTORS[0] + 7)
+    pyramid = Pyramid("run.csv", ['a', 'b'])
+    pyramid.append(epoch, values)
+    for level in range(len(FACTORS)):
+        records = pyramid._tail_records(level)
+        np.testing.assert_array_equal(_stat(records, 'count', 2).sum(axis=0), (~np.isnan(values)).sum(axis=0))
+        assert records[0, 0] == epoch[0] and records[-1, 1] == epoch[-1]
+        assert (np.diff(records[:, 0]) > 0).all()
+
+
+def test_envelope_keeps_extremes_in_the_order_they_were_reached():
+    epoch = np.arange(FACTORS[0] * 64, dtype=float)
+    values = np.sin(epoch / 37.0)[:, None]
+    pyramid = Pyramid("run.csv", ['m'])
+    pyramid.append(epoch, values)
+
+    envelope = pyramid.frame(max_points=64)
+    assert len(envelope) == 2 * 64
+    for bucket in range(64):
+        chunk = values[bucket * FACTORS[0]:(bucket + 1) * FACTORS[0], 0]
+        first, second = envelope['m'].iloc[2 * bucket:2 * bucket + 2]
+        expected = (chunk.min(), chunk.max()) if chunk.argmin() <= chunk.argmax() else (chunk.max(), chunk.min())
+        assert (first, second) == expected
+        assert envelope['epoch'].iloc[2 * bucket] == bucket * FACTORS[0]
+
+
+def test_frame_falls_back_to_raw_rows_when_too_short():
+    epoch, values = _series(100)
+    pyramid = Pyramid("run.csv", ['a', 'b'])
+    pyramid.append(epoch, values)
+    assert pyramid.frame(max_points=2000) is None
+
+
+def test_load_pyramid_folds_rows_appended_to_the_csv(tmp_path, monkeypatch):
+    epoch, values = _series(6000, n_metrics=1)
+    path = tmp_path / "run.csv"
+    frame = pd.DataFrame({'epoch': epoch.astype(int), 'reward': values[:, 0]})
+    frame.iloc[:5000].to_csv(path, index=False)
+    build_pyramid(str(path))
+    with open(path, "a") as f:
+        frame.iloc[5000:].to_csv(f, index=False, header=False)
+    monkeypatch.setattr("app.pyramid.build_pyramid", lambda csv_path: pytest.fail("pyramid was rebuilt"))
+
+    loaded = load_pyramid(str(path))
+    parsed = read_metrics(str(path))
+    expected = Pyramid(str(path), ['reward'])
+    expected.append(parsed['epoch'].to_numpy(dtype=float), parsed[['reward']].to_numpy(dtype=float))
+    _assert_same_pyramid(loaded, expected)
+    assert loaded.offset == path.stat().st_size
+
+
+def _write_run(path, n, seed=0):
+    epoch, values = _series(n, n_metrics=1, seed=seed)
+    pd.DataFrame({'epoch': epoch.astype(int), 'reward': values[:, 0]}).to_csv(path, index=False)
+
+
+def _expected_pyramid(path):
+    parsed = read_metrics(str(path))
+    expected = Pyramid(str(path), ['reward'])
+    expected.append(parsed['epoch'].to_numpy(dtype=float), parsed[['reward']].to_numpy(dtype=float))
+    return expected
+
+
+def _set_mtime(path, mtime_ns):
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.mark.parametrize("grown", [False, True])
+def test_load_pyramid_rebuilds_rewritten_csv(tmp_path, grown):
+    path = tmp_path / "run.csv"
+    _write_run(path, 5000)
+    mtime_ns = path.stat().st_mtime_ns
+    size = path.stat().st_size
+    build_pyramid(str(path))
+    # Same bytes count, other values: only the mtime tells the files apart
+    header, *lines = path.read_text().splitlines()
+    swap = str.maketrans("12", "21")
+    lines = [f"{epoch},{reward.translate(swap)}" for epoch, reward in (line.split(",") for line in lines)]
+    if grown:
+        lines.extend(f"{epoch},0.5" for epoch in range(5000, 5700))
+    path.write_text("\n".join([header] + lines) + "\n")
+    _set_mtime(path, mtime_ns + 10 ** 9)
+    assert (path.stat().st_size == size) != grown
+
+    loaded = load_pyramid(str(path))
+    _assert_same_pyramid(loaded, _expected_pyramid(path))
+    assert loaded.offset == path.stat().st_size
+
+
+def test_load_pyramid_keeps_a_touched_csv(tmp_path, monkeypatch):
+    path = tmp_path / "run.csv"
+    _write_run(path, 5000)
+    build_pyramid(str(path))
+    _set_mtime(path, path.stat().st_mtime_ns + 10 ** 9)
+    monkeypatch.setattr("app.pyramid.build_pyramid", lambda csv_path: pytest.fail("pyramid was rebuilt"))
+    loaded = load_pyramid(str(path))
+    assert loaded.mtime_ns == path.stat().st_mtime_ns
+    # The new mtime is saved: the next load does not hash the file again
+    assert Pyramid.open(str(path)).mtime_ns == loaded.mtime_ns
+
+
+def test_rebuild_replaces_level_files_still_mapped_elsewhere(tmp_path):
+    path = tmp_path / "run.csv"
+    _write_run(path, 9000)
+    old = load_pyramid(str(path))
+    old_level = np.array(old.levels[0])
+    level_path = os.path.join(pyramid_dir(str(path)), f"L{FACTORS[0]}.f8")
+    inode = os.stat(level_path).st_ino
+
+    _write_run(path, 3000, seed=1)
+    new = load_pyramid(str(path))
+    assert os.stat(level_path).st_ino != inode
+    _assert_same_pyramid(new, _expected_pyramid(path))
+    # Pages of the replaced file stay readable by whoever mapped them
+    np.testing.assert_array_equal(np.asarray(old.levels[0]), old_level)
+
+
+def test_updates_hold_a_lock_other_processes_see(tmp_path):
+    path = tmp_path / "run.csv"
+    _write_run(path, 100)
+    with _locked(str(path)):
+        with open(os.path.join(pyramid_dir(str(path)), "lock"), "a") as other:
+            with pytest.raises(BlockingIOError):
+                fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    with open(os.path.join(pyramid_dir(str(path)), "lock"), "a") as other:
+        fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+
+from app.query import RunTable, filter_frame, normalize_column, parse_filter_query, sort_frame
+
+
+@pytest.mark.parametrize("query, clauses", [
+    ("{lr} s< 0.01", [('lr', 'lt', '0.01')]),
+    ("{lr} >= 1e-3 && {env} contains cart", [('lr', 'ge', '1e-3'), ('env', 'contains', 'cart')]),
+    ("{env} icontains Cart", [('env', 'contains', 'Cart')]),
+    ('{env} = "Cart Pole"', [('env', 'eq', 'Cart Pole')]),
+    ("{name} ceq 'it\\'s'", [('name', 'eq', "it's")]),
+    ("{opt.name} != adam", [('opt.name', 'ne', 'adam')]),
+    ("{gamma} is blank", [('gamma', 'is blank', '')]),
+    ("{date} datestartswith 2024", [('date', 'datestartswith', '2024')]),
+    ("", []),
+    ("not a clause", []),
+])
+def test_parse_filter_query(query, clauses):
+    assert parse_filter_query(query) == clauses
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        'lr': [0.1, 0.01, None, 0.001],
+        'env': ['CartPole', 'Pendulum', 'cartpole-v1', None],
+        'layers': normalize_column(pd.Series([[64, 64], [32], [64, 64], None], dtype=object)),
+    })
+
+
+@pytest.mark.parametrize("query, rows", [
+    ("{lr} < 0.05", [1, 3]),
+    ("{lr} = 0.1", [0]),
+    ("{env} contains cart", [0, 2]),
+    ("{env} = Pendulum", [1]),
+    ("{lr} is blank", [2]),
+    ("{lr} > 0.005 && {env} contains pole", [0]),
+    ("{layers} = [64, 64]", [0, 2]),
+    ("{missing} > 1", []),
+])
+def test_filter_frame(frame, query, rows):
+    assert filter_frame(frame, parse_filter_query(query)).index.tolist() == rows
+
+
+def test_normalize_column():
+    assert normalize_column(pd.Series([1, 2.5, None], dtype=object)).dtype.kind == 'f'
+    assert normalize_column(pd.Series([{'a': 1}, [1, 2]], dtype=object)).tolist() == ["{'a': 1}", "[1, 2]"]
+    assert normalize_column(pd.Series([True, 3], dtype=object)).dtype == object
+
+
+def test_sort_frame_puts_missing_values_last(frame):
+    sort_by = [{'column_id': 'lr', 'direction': 'desc'}]
+    assert sort_frame(frame, sort_by).index.tolist() == [0, 1, 3, 2]
+
+
+def test_run_table_masks_and_rows():
+    runs = [
+        {'model': 'ppo', 'metrics_file': 'a', 'hyperparams': {'lr': 0.1, 'env': 'cart'}},
+        {'model': 'ppo', 'metrics_file': 'b', 'hyperparams': {'lr': 0.2, 'env': 'cart'}},
+        {'model': 'dqn', 'metrics_file': 'c', 'hyperparams': {'lr': 0.3}},
+        {'model': 'dqn', 'metrics_file': 'd', 'hyperparams': None},
+    ]
+    table = RunTable(runs)
+    assert table.mask([{'key': 'lr', 'op': 'range', 'min': 0.15}]).tolist() == [False, True, True, False]
+    assert table.mask([{'key': 'env', 'op': 'eq', 'value': 'cart', 'missing': 'include'}]).tolist() == \
+        [True, True, True, False]
+    rows, differing = table.rows([('dqn', 'c'), ('ppo', 'a')])
+    assert rows['@metrics_file'].tolist() == ['c', 'a']
+    assert differing == ['lr', 'env']
@@ -0,0 +1,53 @@
+import os
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from app.sidecar import is_sidecar_fresh, read_metrics, sidecar_path, write_sidecar  # noqa: E402
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "ppo" / "metrics" / "run.csv"
+    path.parent.mkdir(parents=True)
+    pd.DataFrame({
+        'epoch': range(5),
+        'reward': [0.5, None, 1.5, 2.0, 2.5],
+        'timestamp': pd.date_range("2024-01-01", periods=5, freq="min").astype(str),
+        'phase': ['warmup', 'warmup', 'train', 'train', 'train'],
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+def test_sidecar_round_trip_keeps_typed_columns(csv_path):
+    written = write_sidecar(csv_path)
+    assert os.path.exists(sidecar_path(csv_path)) and is_sidecar_fresh(csv_path)
+    loaded = read_metrics(csv_path)
+    pd.testing.assert_frame_equal(loaded, written)
+    assert pd.api.types.is_datetime64_any_dtype(loaded['timestamp'])
+    assert loaded['reward'].isna().tolist() == [False, True, False, False, False]
+
+
+def test_without_sidecar_the_csv_is_parsed(csv_path):
+    pd.testing.assert_frame_equal(read_metrics(csv_path), pd.read_csv(csv_path))
+    assert not is_sidecar_fresh(csv_path)
+
+
+def test_stale_sidecar_is_regenerated(csv_path):
+    write_sidecar(csv_path)
+    with open(csv_path, "a") as f:
+        f.write("5,3.0,2024-01-01 00:05:00,train\n")
+    assert not is_sidecar_fresh(csv_path)
+    loaded = read_metrics(csv_path)
+    assert len(loaded) == 6 and loaded['reward'].iloc[-1] == 3.0
+    assert is_sidecar_fresh(csv_path)
+
+
+def test_unreadable_sidecar_is_ignored(csv_path):
+    write_sidecar(csv_path)
+    with open(sidecar_path(csv_path), "wb") as f:
+        f.write(b"not an arrow file")
+    pd.testing.assert_frame_equal(read_metrics(csv_path), pd.read_csv(csv_path))
+    assert not is_sidecar_fresh(csv_path)
@@ -0,0 +1,49 @@
+import base64
+import json
+
+import numpy as np
+import pandas as pd
+
+from app import callbacks, utils
+from app.cache import figure_cache, run_cache
+from app.smoothing import smooth_metric
+
+
+def _decode(values):
+    if isinstance(values, dict):
+        return np.frombuffer(base64.b64decode(values['bdata']), dtype=np.dtype(values['dtype']).newbyteorder('<'))
+    return np.asarray(values)
+
+
+def _plotted(x_range, smooth):
+    data_list = callbacks.load_plot_runs([('ppo', 'run')], x_range, smooth)
+    figure = callbacks.build_metric_plot(
+        data_list, callbacks.get_plot_runs(data_list), 'reward', 'runs', x_range, smooth
+    )
+    trace = figure['data'][0]
+    return pd.Series(_decode(trace['y']), index=_decode(trace['x']))
+
+
+def test_smoothed_curve_does_not_change_with_zoom(tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    n = 50000
+    frame = pd.DataFrame({'epoch': np.arange(n), 'reward': rng.normal(size=n).cumsum()})
+    (tmp_path / "ppo" / "metrics").mkdir(parents=True)
+    (tmp_path / "ppo" / "hyperparameters").mkdir()
+    frame.to_csv(tmp_path / "ppo" / "metrics" / "run.csv", index=False)
+    (tmp_path / "ppo" / "hyperparameters" / "run_hyperparameters.json").write_text(json.dumps({'lr': 0.1}))
+    monkeypatch.setattr(callbacks, "BASE_DIRECTORY", str(tmp_path))
+    # Every run is read from its pyramid when not smoothed
+    monkeypatch.setattr(utils, "PYRAMID_MIN_BYTES", 0)
+    run_cache.clear()
+    figure_cache.clear()
+
+    zoom = (20000.0, 21000.0)
+    assert len(callbacks.load_plot_runs([('ppo', 'run')])[0]['metrics']) < n
+    smooth = ['ema', 50]
+    expected = pd.Series(smooth_metric(frame, 'reward', *smooth), index=frame['epoch'].to_numpy(dtype=float))
+    for x_range in (None, zoom, (20400.0, 20500.0), None):
+        plotted = _plotted(x_range, smooth)
+        np.testing.assert_allclose(plotted.to_numpy(), expected.loc[plotted.index].to_numpy())
+    run_cache.clear()
+    figure_cache.clear()
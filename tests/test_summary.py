@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from app.summary import summarize_metrics
+
+
+def test_summary_matches_reference_computations():
+    rng = np.random.default_rng(0)
+    epochs = rng.permutation(np.arange(0, 500, 5))
+    reward = rng.normal(size=len(epochs)).cumsum()
+    loss = rng.random(len(epochs))
+    reward[rng.random(len(epochs)) < 0.2] = np.nan
+    frame = pd.DataFrame({'epoch': epochs, 'reward': reward, 'train_loss': loss, 'note': 'x'})
+
+    summary = summarize_metrics(frame, last_n=7)
+    assert set(summary) == {'reward', 'train_loss'}
+    for metric in ('reward', 'train_loss'):
+        logged = frame[['epoch', metric]].dropna().sort_values('epoch')
+        stats = summary[metric]
+        assert stats['final'] == logged[metric].iloc[-1]
+        np.testing.assert_allclose(stats['auc'], np.trapezoid(logged[metric], logged['epoch']))
+        np.testing.assert_allclose(stats['last_mean'], logged[metric].iloc[-7:].mean())
+    # Loss-like metrics are minimized, everything else maximized
+    reward_logged = frame.dropna(subset=['reward'])
+    assert summary['reward']['best'] == reward_logged['reward'].max()
+    assert summary['reward']['best_epoch'] == reward_logged.loc[reward_logged['reward'].idxmax(), 'epoch']
+    assert summary['train_loss']['best'] == frame['train_loss'].min()
+
+
+def test_summary_of_unlogged_metric_and_empty_run():
+    frame = pd.DataFrame({'epoch': [0, 1], 'reward': [np.nan, np.nan], 'loss': [1.0, 0.5]})
+    assert set(summarize_metrics(frame)) == {'loss'}
+    assert summarize_metrics(frame.iloc[:0]) == {}
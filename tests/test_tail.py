@@ -0,0 +1,115 @@
+import json
+
+import pytest
+from dash import Dash, html
+
+from app import callbacks
+from app.tail import read_appended_rows
+
+HEADER = "epoch,reward\n"
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "run.csv"
+    path.write_text(HEADER + "0,0.5\n1,1.0\n2,1.5\n")
+    return path
+
+
+def append(path, text):
+    with open(path, "a") as f:
+        f.write(text)
+
+
+def test_reads_only_complete_appended_rows(csv_path):
+    offset = csv_path.stat().st_size
+    assert read_appended_rows(str(csv_path), offset) == (None, offset)
+
+    append(csv_path, "3,2.0\n4,2.5\n5,")
+    rows, new_offset = read_appended_rows(str(csv_path), offset)
+    assert rows.to_dict('list') == {'epoch': [3, 4], 'reward': [2.0, 2.5]}
+    assert new_offset == csv_path.stat().st_size - len("5,")
+
+    append(csv_path, "3.0\n")
+    rows, last_offset = read_appended_rows(str(csv_path), new_offset)
+    assert rows.to_dict('list') == {'epoch': [5], 'reward': [3.0]}
+    assert last_offset == csv_path.stat().st_size
+
+
+def test_offsets_inside_a_line_or_the_header_start_at_a_row(csv_path):
+    rows, _ = read_appended_rows(str(csv_path), len(HEADER) + 2)
+    assert rows['epoch'].tolist() == [0, 1, 2]
+    rows, _ = read_appended_rows(str(csv_path), 0)
+    assert rows['epoch'].tolist() == [0, 1, 2]
+
+
+def test_shrunk_file_is_not_tailed(csv_path):
+    offset = csv_path.stat().st_size + 100
+    assert read_appended_rows(str(csv_path), offset) == (None, offset)
+
+
+@pytest.fixture(scope="module")
+def client():
+    app = Dash(__name__, suppress_callback_exceptions=True)
+    app.layout = html.Div()
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(callbacks, "WATCH_LOGS", False)
+        patch.setattr(callbacks, "WARMUP", False)
+        callbacks.register_callbacks(app)
+    key = next(
+        key for key in app.callback_map if key.startswith('..{"metric":["ALL"],"type":"metric-graph"}.extendData')
+    )
+    test_client = app.server.test_client()
+
+    def extend(rendered, plot_state, tail_offsets):
+        graph_ids = [{'type': 'metric-graph', 'metric': traces['metric']} for traces in rendered]
+        body = {
+            'output': key,
+            'outputs': [[{'id': graph_id, 'property': 'extendData'} for graph_id in graph_ids],
+                        {'id': 'tail-offsets', 'property': 'data'}],
+            'inputs': [{'id': 'live-interval', 'property': 'n_intervals', 'value': 1}],
+            'state': [
+                [{'id': {'type': 'metric-traces', 'metric': traces['metric']}, 'property': 'data', 'value': traces}
+                 for traces in rendered],
+                {'id': 'plot-state', 'property': 'data', 'value': plot_state},
+                {'id': 'tail-offsets', 'property': 'data', 'value': tail_offsets},
+            ],
+            'changedPropIds': ['live-interval.n_intervals'],
+        }
+        response = test_client.post("/_dash-update-component", json=body)
+        assert response.status_code == 200
+        return json.loads(response.get_data())['response']
+
+    return extend
+
+
+def graph_key(metric):
+    return json.dumps({'metric': metric, 'type': 'metric-graph'}, separators=(',', ':'))
+
+
+def test_live_updates_append_new_rows_to_plotted_traces(csv_path, client):
+    plot_state = {
+        'token': 'plot',
+        'runs': [{'identifier': 'ppo/run', 'model': 'ppo', 'metrics_file': 'run', 'path': str(csv_path),
+                  'offset': csv_path.stat().st_size, 'last_epoch': 2, 'metrics': ['reward', 'loss']}],
+        'metrics': ['reward', 'loss'],
+    }
+    rendered = [
+        {'metric': 'reward', 'token': 'plot', 'aggregate': 'runs', 'traces': ['ppo/run'], 'smoothing': None},
+        # Smoothed graphs are only recomputed on the next full render
+        {'metric': 'loss', 'token': 'plot', 'aggregate': 'runs', 'traces': ['ppo/run'], 'smoothing': ['ema', 5]},
+    ]
+    append(csv_path, "3,2.0\n4,2.5\n5,")
+    response = client(rendered, plot_state, None)
+    assert response[graph_key('reward')]['extendData'] == [{'x': [[3, 4]], 'y': [[2.0, 2.5]]}, [0]]
+    assert graph_key('loss') not in response
+    tail_offsets = response['tail-offsets']['data']
+    assert tail_offsets == {'token': 'plot',
+                            'positions': {str(csv_path): [csv_path.stat().st_size - len("5,"), 4]}}
+
+    append(csv_path, "3.0\n")
+    response = client(rendered, plot_state, tail_offsets)
+    assert response[graph_key('reward')]['extendData'] == [{'x': [[5]], 'y': [[3.0]]}, [0]]
+    # Offsets of an older plot state are ignored
+    response = client(rendered, {**plot_state, 'token': 'other'}, response['tail-offsets']['data'])
+    assert response[graph_key('reward')]['extendData'] == [{'x': [[3, 4, 5]], 'y': [[2.0, 2.5, 3.0]]}, [0]]
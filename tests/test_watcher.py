@@ -0,0 +1,63 @@
+import time
+
+from app import watcher as watcher_module
+from app.watcher import LogsWatcher
+
+
+class SilentObserver:
+    """Observer of a filesystem that raises no events, like NFS writes from another host."""
+
+    daemon = False
+
+    def schedule(self, handler, path, recursive=False):
+        pass
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+def write_run(base_directory, model, name):
+    for kind, suffix, content in (("metrics", ".csv", "epoch,reward\n0,1\n"),
+                                  ("hyperparameters", "_hyperparameters.json", "{}")):
+        directory = base_directory / model / kind
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"{name}{suffix}").write_text(content)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+def test_events_rescan_the_touched_model(tmp_path):
+    write_run(tmp_path, "ppo", "run_0")
+    watcher = LogsWatcher(str(tmp_path), rescan_interval=0).start()
+    try:
+        assert watcher.models() == ["ppo"] and set(watcher.metrics_files("ppo")) == {"run_0"}
+        version = watcher.model_version("ppo")
+        write_run(tmp_path, "ppo", "run_1")
+        assert wait_for(lambda: set(watcher.metrics_files("ppo")) == {"run_0", "run_1"})
+        assert watcher.model_version("ppo") > version
+    finally:
+        watcher.stop()
+
+
+def test_inotify_mode_still_rescans_the_whole_tree(tmp_path, monkeypatch):
+    monkeypatch.setattr(watcher_module, "Observer", SilentObserver)
+    write_run(tmp_path, "ppo", "run_0")
+    watcher = LogsWatcher(str(tmp_path), rescan_interval=0.1).start()
+    try:
+        assert watcher.mode == "inotify"
+        write_run(tmp_path, "ppo", "run_1")
+        write_run(tmp_path, "dqn", "run_0")
+        assert wait_for(lambda: watcher.models() == ["dqn", "ppo"] and len(watcher.metrics_files("ppo")) == 2)
+        assert watcher.run_count() == 3
+    finally:
+        watcher.stop()
@@ -0,0 +1,17 @@
+"""Production entry point: exposes the dashboard's Flask server to a WSGI server.
+
+    gunicorn --workers 4 --threads 4 --bind 0.0.0.0:8050 wsgi:server
+
+Each worker keeps its own in-memory caches. Point ``DRL_SHARED_CACHE_DIR`` at a local
+directory to share parsed runs and rendered figures between workers, and set
+``DRL_BACKGROUND_CALLBACKS=1`` to run full plot updates and metric plot renders as
+background jobs queued in that directory. Start workers without ``--preload`` so that each one watches the logs tree.
+"""
+from app import app
+from app.callbacks import register_callbacks
+from app.layout import layout
+
+app.layout = layout
+register_callbacks(app)
+
+server = app.server